@@ -0,0 +1,139 @@
+import hashlib
+import time
+
+from .aspects import ASPECTS, SENTIMENT_CODES, SENTIMENT_LABELS
+from .normalize import normalize_text
+
+MAX_ANALYZE_TEXTS = 100
+MAX_ANALYZE_TEXT_CHARS = 10000  # Mô hình chỉ đọc max_length token đầu, văn bản dài hơn chỉ tốn tiền xử lý
+ANALYZE_BUDGET_SECONDS = 2.0
+
+SAVE_TEXT_PREDICTIONS_QUERY = """
+INSERT INTO text_aspect_predictions (text_hash, model_version, aspect, sentiment, confidence, scored_at)
+VALUES %s
+ON CONFLICT (text_hash, model_version, aspect) DO NOTHING
+"""
+TEXT_PREDICTION_TEMPLATE = "(%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)"
+
+def text_hash(text):
+    # Văn bản chỉ khác nhau về hoa/thường hay khoảng trắng cho cùng đầu vào mô hình sau tiền xử lý
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+def decode_text_predictions(rows):
+    """Turn text_aspect_predictions rows into {text_hash: {aspect: (sentiment, confidence)}}."""
+    predictions = {}
+    for row in rows:
+        predictions.setdefault(row["text_hash"], {})[row["aspect"]] = (SENTIMENT_LABELS[row["sentiment"]], row["confidence"])
+    return predictions
+
+def text_prediction_rows(predictions, model_version):
+    return [
+        (hash_, model_version, aspect, SENTIMENT_CODES[sentiment], confidence)
+        for hash_, aspect_predictions in sorted(predictions.items())
+        for aspect, (sentiment, confidence) in sorted(aspect_predictions.items())
+    ]
+
+def parse_analyze_request(data):
+    """
+    Read the body of /api/analyze.
+
+    Returns:
+        dict: {"texts", "aspects", "mentioned_only", "budget"} with budget in seconds.
+
+    Raises:
+        ValueError: If texts is not a list of strings, an aspect is unknown or budget_ms is not a positive number.
+    """
+    texts = data.get("texts", None)
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        raise ValueError("texts must be a non-empty list of strings")
+    aspects = data.get("aspects", None) or ASPECTS
+    if isinstance(aspects, str):
+        aspects = aspects.split(",")
+    aspects = [str(aspect).strip().lower() for aspect in aspects]
+    if set(aspects) - set(ASPECTS):
+        raise ValueError(f"aspects must be among {', '.join(ASPECTS)}")
+    budget_ms = data.get("budget_ms", None)
+    budget = float(budget_ms) / 1000 if budget_ms is not None else ANALYZE_BUDGET_SECONDS
+    if budget <= 0:
+        raise ValueError("budget_ms must be a positive number")
+    return {
+        "texts": texts,
+        # Giữ thứ tự của ASPECTS, bỏ khía cạnh trùng
+        "aspects": [aspect for aspect in ASPECTS if aspect in aspects],
+        "mentioned_only": data.get("mentioned_only", True) not in (False, "false", "0"),
+        # Client chỉ được rút ngắn ngân sách, không được kéo dài quá mặc định của server
+        "budget": min(budget, ANALYZE_BUDGET_SECONDS),
+    }
+
+def mentioned_aspects(processor, text, aspects):
+    """Aspects of the lexicon mentioned in a text, or all requested aspects if none is mentioned."""
+    mentioned = {aspect.lower() for aspect in processor.extract_aspects(text)}
+    return [aspect for aspect in aspects if aspect in mentioned] or list(aspects)
+
+def analyze_texts(store, processor, texts, aspects=ASPECTS, mentioned_only=True, budget=ANALYZE_BUDGET_SECONDS,
+                  batch_size=32, model_version=None):
+    """
+    Score raw review texts per aspect, reusing stored predictions for identical texts.
+
+    Texts are identified by text_hash, so duplicates within a request and texts analyzed
+    before are not run through the model again. The remaining (text, aspect) pairs are
+    sorted by length and scored batch_size pairs per forward pass; no new pass is started
+    once the next one would overrun `budget` seconds, and the pairs left are reported as pending.
+    New predictions are saved with store.save_text_predictions; the caller commits.
+
+    Returns:
+        dict: {"results": [one {"text_hash", "aspects", "pending_aspects"} per text, in input order],
+            "complete", "cached_pairs", "scored_pairs", "forward_passes"}.
+    """
+    started = time.monotonic()
+    hashes = [text_hash(text) for text in texts]
+    unique_texts = dict(zip(hashes, texts))
+    wanted = {
+        hash_: mentioned_aspects(processor, text, aspects) if mentioned_only else list(aspects)
+        for hash_, text in unique_texts.items()
+    }
+
+    predictions = store.text_predictions(list(unique_texts), model_version)
+    pairs = [
+        (hash_, aspect) for hash_, hash_aspects in wanted.items()
+        for aspect in hash_aspects if aspect not in predictions.get(hash_, {})
+    ]
+    cached_pairs = sum(len(hash_aspects) for hash_aspects in wanted.values()) - len(pairs)
+    # Văn bản ngắn trước: batch ít padding hơn, và hết ngân sách thì đã xong được nhiều văn bản nhất
+    pairs.sort(key=lambda pair: len(unique_texts[pair[0]]))
+
+    new_predictions = {}
+    forward_passes = 0
+    slowest_pass = 0.0
+    for start in range(0, len(pairs), batch_size):
+        if time.monotonic() - started + slowest_pass > budget:
+            break
+        pass_started = time.monotonic()
+        batch = pairs[start:start + batch_size]
+        results = processor.predict_pairs([(unique_texts[hash_], aspect) for hash_, aspect in batch], batch_size=batch_size)
+        for (hash_, aspect), prediction in zip(batch, results):
+            new_predictions.setdefault(hash_, {})[aspect] = prediction
+            predictions.setdefault(hash_, {})[aspect] = prediction
+        forward_passes += 1
+        slowest_pass = max(slowest_pass, time.monotonic() - pass_started)
+    store.save_text_predictions(new_predictions, model_version)
+
+    results = []
+    for hash_ in hashes:
+        scored = predictions.get(hash_, {})
+        results.append({
+            "text_hash": hash_,
+            "aspects": {
+                aspect: {"sentiment": scored[aspect][0], "confidence": round(scored[aspect][1], 4)}
+                for aspect in wanted[hash_] if aspect in scored
+            },
+            "pending_aspects": [aspect for aspect in wanted[hash_] if aspect not in scored],
+        })
+    scored_pairs = sum(len(aspect_predictions) for aspect_predictions in new_predictions.values())
+    return {
+        "results": results,
+        "complete": scored_pairs == len(pairs),
+        "cached_pairs": cached_pairs,
+        "scored_pairs": scored_pairs,
+        "forward_passes": forward_passes,
+    }
@@ -0,0 +1,212 @@
+from collections import Counter
+from psycopg2.extras import execute_values
+
+ASPECTS = ["direction", "acting", "plot", "overall", "visuals", "themes", "pacing"]  # Danh sách khía cạnh
+SENTIMENTS = ["Positive", "Neutral", "Negative"]
+
+# Mỗi review một dòng trong review_aspect_scores, mỗi khía cạnh một cột smallint
+# (cùng mã nhãn với ABSAProcessor.label_mapping); NULL là khía cạnh chưa chấm.
+SENTIMENT_CODES = {"Negative": 0, "Neutral": 1, "Positive": 2}
+SENTIMENT_LABELS = {code: sentiment for sentiment, code in SENTIMENT_CODES.items()}
+
+SUMMARY_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS movie_aspect_summary (
+    movie_id INTEGER NOT NULL REFERENCES movies(movie_id) ON DELETE CASCADE,
+    aspect VARCHAR(32) NOT NULL,
+    sentiment VARCHAR(16) NOT NULL,
+    source VARCHAR(32) NOT NULL,
+    role VARCHAR(16) NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (movie_id, aspect, sentiment, source, role)
+)
+"""
+
+ASPECT_SENTIMENTS_QUERY = f"""
+SELECT review_id, {", ".join(ASPECTS)}, confidence
+FROM review_aspect_scores
+WHERE review_id = ANY(%s)
+"""
+
+SAVE_ASPECT_SCORES_QUERY = f"""
+INSERT INTO review_aspect_scores (review_id, {", ".join(ASPECTS)}, confidence, model_version, scored_at)
+VALUES %s
+ON CONFLICT (review_id) DO NOTHING
+RETURNING review_id
+"""
+# Một dòng của SAVE_ASPECT_SCORES_QUERY: các giá trị của aspect_score_rows rồi thời điểm chấm
+SCORE_ROW_TEMPLATE = f"({', '.join(['%s'] * (len(ASPECTS) + 3))}, CURRENT_TIMESTAMP)"
+
+ADD_TO_SUMMARY_QUERY = """
+INSERT INTO movie_aspect_summary (movie_id, aspect, sentiment, source, role, review_count)
+VALUES %s
+ON CONFLICT (movie_id, aspect, sentiment, source, role) DO UPDATE
+SET review_count = movie_aspect_summary.review_count + EXCLUDED.review_count
+"""
+
+SUMMARY_QUERY = """
+SELECT aspect, sentiment, source, role, review_count
+FROM movie_aspect_summary
+WHERE movie_id = %s
+"""
+
+def store_aspect_sentiments(cursor, movie_id, scored_reviews, model_version=None):
+    """
+    Store aspect sentiments of newly scored reviews as one wide row each and add them to movie_aspect_summary.
+
+    Only reviews whose row was actually inserted are counted in the summary: a review another
+    writer already scored is left alone (ON CONFLICT DO NOTHING) and not counted twice.
+
+    Args:
+        cursor: Open RealDictCursor; the caller commits.
+        movie_id (int): Movie the reviews belong to.
+        scored_reviews (list): (review_id, source, role, {aspect: sentiment}, confidence) tuples;
+            confidence is the lowest per-aspect probability, or None.
+        model_version (str): Model that produced the sentiments.
+    """
+    score_rows = aspect_score_rows(scored_reviews, model_version)
+    if not score_rows:
+        return
+
+    inserted = execute_values(cursor, SAVE_ASPECT_SCORES_QUERY, score_rows, template=SCORE_ROW_TEMPLATE, fetch=True)
+    summary_rows = aspect_summary_rows(scored_reviews, movie_id, {row["review_id"] for row in inserted})
+    if summary_rows:
+        execute_values(cursor, ADD_TO_SUMMARY_QUERY, summary_rows)
+
+def fetch_aspect_summary(cursor, movie_id, source=None, role=None):
+    """
+    Read the pre-aggregated aspect counts of a movie through a RealDictCursor.
+
+    Returns:
+        dict: {"aspects": {...}, "breakdown": [...]} ready to be serialized.
+    """
+    query = SUMMARY_QUERY
+    params = [movie_id]
+    if source:
+        query += " AND source = %s"
+        params.append(source)
+    if role:
+        query += " AND role = %s"
+        params.append(role)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+
+    totals = {}
+    breakdown = []
+    for row in rows:
+        totals.setdefault(row["aspect"], Counter())[row["sentiment"]] += row["review_count"]
+        breakdown.append({
+            "aspect": row["aspect"],
+            "sentiment": row["sentiment"],
+            "source": row["source"],
+            "role": row["role"],
+            "count": row["review_count"],
+        })
+
+    aspects = {}
+    for aspect, counts in totals.items():
+        total = sum(counts.values())
+        aspects[aspect] = {
+            "total": total,
+            "counts": {sentiment: counts.get(sentiment, 0) for sentiment in SENTIMENTS},
+            "percentages": {
+                sentiment: round(100.0 * counts.get(sentiment, 0) / total, 1) if total else 0.0
+                for sentiment in SENTIMENTS
+            },
+        }
+    return {"aspects": aspects, "breakdown": breakdown}
+
+def rebuild_aspect_summary(cursor):
+    """Recompute movie_aspect_summary from review_aspect_scores in one set-based pass."""
+    aspect_columns = ", ".join(f"('{aspect}', s.{aspect})" for aspect in ASPECTS)
+    label = " ".join(f"WHEN {code} THEN '{sentiment}'" for code, sentiment in SENTIMENT_LABELS.items())
+    cursor.execute(SUMMARY_TABLE_DDL)
+    cursor.execute("TRUNCATE movie_aspect_summary")
+    cursor.execute(f"""
+    INSERT INTO movie_aspect_summary (movie_id, aspect, sentiment, source, role, review_count)
+    SELECT r.movie_id, v.aspect, CASE v.code {label} END, r.source, COALESCE(r.role, 'user'), COUNT(*)
+    FROM review_aspect_scores s
+    JOIN reviews r ON r.review_id = s.review_id
+    CROSS JOIN LATERAL (VALUES {aspect_columns}) AS v(aspect, code)
+    WHERE v.code IS NOT NULL
+    GROUP BY r.movie_id, v.aspect, v.code, r.source, COALESCE(r.role, 'user')
+    """)
+    return cursor.rowcount
+
+def decode_aspect_scores(row):
+    """Turn a review_aspect_scores row into ({aspect: {"sentiment": ...}}, confidence)."""
+    sentiments = {
+        aspect: {"sentiment": SENTIMENT_LABELS[row[aspect]]}
+        for aspect in ASPECTS
+        if row[aspect] is not None
+    }
+    return sentiments, row["confidence"]
+
+def aspect_score_rows(scored_reviews, model_version=None):
+    """
+    Turn scored reviews into review_aspect_scores rows; reviews without sentiments are left out.
+
+    Returns:
+        list: (review_id, *codes in ASPECTS order, confidence, model_version) tuples.
+    """
+    score_rows = []
+    for review_id, _, _, sentiments, confidence in scored_reviews:
+        if not sentiments:
+            continue
+        codes = [SENTIMENT_CODES.get(sentiments[aspect]) if aspect in sentiments else None for aspect in ASPECTS]
+        score_rows.append((review_id, *codes, confidence, model_version))
+    return score_rows
+
+def aspect_summary_rows(scored_reviews, movie_id, review_ids):
+    """
+    movie_aspect_summary increments of the scored reviews in review_ids (those just inserted).
+
+    Returns:
+        list: [(movie_id, aspect, sentiment, source, role, count)] in key order.
+    """
+    summary_counts = Counter()
+    for review_id, source, role, sentiments, _ in scored_reviews:
+        if review_id not in review_ids:
+            continue
+        for aspect, sentiment in sentiments.items():
+            summary_counts[(movie_id, aspect, sentiment, source, role or "user")] += 1
+    # Sắp xếp khóa để các transaction cập nhật song song luôn khóa theo cùng thứ tự
+    return [key + (count,) for key, count in sorted(summary_counts.items())]
+
+def fetch_aspect_sentiments(cursor, review_ids):
+    """
+    Read stored aspect sentiments for a batch of reviews in one query through a RealDictCursor.
+
+    Returns:
+        dict: {review_id: ({aspect: {"sentiment": ...}}, confidence)}; unscored reviews are absent.
+    """
+    if not review_ids:
+        return {}
+    cursor.execute(ASPECT_SENTIMENTS_QUERY, (list(review_ids),))
+    return {row["review_id"]: decode_aspect_scores(row) for row in cursor.fetchall()}
+
+def score_review_aspects(store, processor, reviews, batch_size=32):
+    """
+    Return the aspect sentiments of reviews, running the ABSA model only on reviews without stored ones.
+
+    All unscored reviews go through processor.predict_batch together, batch_size
+    (review, aspect) pairs per forward pass.
+
+    Args:
+        reviews (list): Rows with review_id, review, source and role.
+
+    Returns:
+        tuple: ({review_id: (aspect sentiments, confidence)}, newly scored reviews to pass to
+            store.save_aspect_sentiments)
+    """
+    sentiments = store.aspect_sentiments([review["review_id"] for review in reviews])
+    unscored = [review for review in reviews if not sentiments.get(review["review_id"], (None, None))[0]]
+    scored_reviews = []
+    if unscored:
+        predictions = processor.predict_batch([review["review"] for review in unscored], ASPECTS, batch_size=batch_size)
+        for review, aspect_predictions in zip(unscored, predictions):
+            labels = {aspect: sentiment for aspect, (sentiment, _) in aspect_predictions.items()}
+            # Độ tin cậy của review là độ tin cậy thấp nhất trong các khía cạnh
+            confidence = min(aspect_confidence for _, aspect_confidence in aspect_predictions.values())
+            sentiments[review["review_id"]] = ({aspect: {"sentiment": label} for aspect, label in labels.items()}, confidence)
+            scored_reviews.append((review["review_id"], review["source"], review["role"], labels, confidence))
+    return sentiments, scored_reviews
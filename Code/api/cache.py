@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.http import HttpResponse
+from rest_framework import status
+
+
+CacheEntry = namedtuple("CacheEntry", ["version", "etag", "body"])
+
+
+class ReviewResponseCache:
+    """
+    Two-tier cache for rendered /api/reviews payloads, keyed by movie link.
+
+    Entries are tagged with the movie's data_version; a lookup with a different
+    version is a miss and drops the stale entry, so nothing has to be purged
+    explicitly when reviews or aspect rows change.
+    """
+
+    def __init__(self, max_entries=256, cache_dir=None):
+        """
+        Args:
+            max_entries (int): Number of payloads kept in the in-process LRU.
+            cache_dir (str): Optional directory for the file-backed tier.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key, version):
+        """Return the CacheEntry for key if it was stored at this version, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version == version:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+
+        entry = self._read_file(key)
+        if entry is None:
+            return None
+        if entry.version != version:
+            self._remove_file(key)
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def set(self, key, version, body):
+        """Store a rendered body (bytes) for key at version and return its CacheEntry."""
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        entry = CacheEntry(version, etag, body)
+        self._remember(key, entry)
+        self._write_file(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def _read_file(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                header = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if header.get("key") != key:
+            return None
+        return CacheEntry(header["version"], header["etag"], body)
+
+    def _write_file(self, key, entry):
+        if not self.cache_dir:
+            return
+        header = json.dumps({"key": key, "version": entry.version, "etag": entry.etag})
+        # Ghi ra file tạm rồi đổi tên để không process nào đọc được file ghi dở
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header.encode("utf-8") + b"\n")
+                f.write(entry.body)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing review cache file: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _remove_file(self, key):
+        if not self.cache_dir:
+            return
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(request, entry, content_type="application/json"):
+    """Response for a CacheEntry: 304 if the request's If-None-Match matches its ETag, else the body."""
+    if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(entry.body, content_type=content_type, status=status.HTTP_200_OK)
+    response["ETag"] = entry.etag
+    return response
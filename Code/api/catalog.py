@@ -0,0 +1,200 @@
+import base64
+import bisect
+import json
+import re
+from array import array
+from collections import Counter
+
+CATALOG_PAGE_SIZE = 50
+MAX_CATALOG_PAGE_SIZE = 200
+FUZZY_THRESHOLD = 0.3  # Giống giá trị mặc định pg_trgm.similarity_threshold
+
+SORT_COLUMNS = {
+    "name": "lower(movie_name)",
+    "review_count": "review_count",
+    "last_crawled": "last_crawled_at",
+}
+
+def encode_cursor(sort_value, movie_id):
+    raw = json.dumps([sort_value, movie_id], default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor):
+    """
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor.
+    """
+    try:
+        sort_value, movie_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("malformed cursor")
+    return sort_value, int(movie_id)
+
+def parse_catalog_filters(query_params):
+    """
+    Read search, sort and pagination parameters of /api/films.
+
+    Raises:
+        ValueError: If a parameter has an unsupported value.
+    """
+    limit = query_params.get("limit", None)
+    filters = {
+        "q": (query_params.get("q", None) or "").strip() or None,
+        "match": query_params.get("match", "prefix"),
+        "sort": query_params.get("sort", "name"),
+        "limit": min(int(limit), MAX_CATALOG_PAGE_SIZE) if limit else CATALOG_PAGE_SIZE,
+        "after": decode_cursor(query_params["after"]) if query_params.get("after") else None,
+    }
+    if filters["match"] not in ("prefix", "fuzzy"):
+        raise ValueError("match must be 'prefix' or 'fuzzy'")
+    if filters["sort"] not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if filters["limit"] < 1:
+        raise ValueError("limit must be a positive integer")
+    return filters
+
+def build_catalog_query(filters, vendor="postgresql"):
+    """
+    Build the keyset-paginated catalog query.
+
+    Prefix search uses the lower(movie_name) text_pattern_ops index, fuzzy search the
+    pg_trgm GIN index and is always ranked by similarity. With vendor="sqlite" only the
+    prefix/sort queries are supported (fuzzy search there goes through TitleIndex).
+
+    Returns:
+        tuple: (sql, params); every row carries its keyset value as sort_value.
+    """
+    select = "SELECT movie_id, movie_name, link, review_count, last_crawled_at"
+    params = []
+    conditions = []
+
+    if filters["q"] and filters["match"] == "fuzzy":
+        select += ", similarity(lower(movie_name), lower(%s)) AS sort_value"
+        params.append(filters["q"])
+        conditions.append("lower(movie_name) %% lower(%s)")
+        params.append(filters["q"])
+        if filters["after"]:
+            conditions.append("(similarity(lower(movie_name), lower(%s)), movie_id) < (%s, %s)")
+            params.extend([filters["q"], *filters["after"]])
+        order = "sort_value DESC, movie_id DESC"
+    else:
+        column = SORT_COLUMNS[filters["sort"]]
+        select += f", {column} AS sort_value"
+        if filters["q"]:
+            escaped = re.sub(r"([\\%_])", r"\\\1", filters["q"].lower())
+            conditions.append("lower(movie_name) LIKE %s ESCAPE '\\'")
+            params.append(escaped + "%")
+        if filters["sort"] == "name":
+            if filters["after"]:
+                conditions.append(f"({column}, movie_id) > (%s, %s)")
+                params.extend(filters["after"])
+            order = f"{column}, movie_id"
+        else:
+            if filters["after"]:
+                cast = "::timestamptz" if filters["sort"] == "last_crawled" and vendor == "postgresql" else ""
+                conditions.append(f"({column}, movie_id) < (%s{cast}, %s)")
+                params.extend(filters["after"])
+            order = f"{column} DESC, movie_id DESC"
+
+    query = f"{select} FROM movies"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order} LIMIT %s"
+    params.append(filters["limit"] + 1)
+    return query, params
+
+def trigrams(text):
+    """Split text into the same padded word trigrams pg_trgm uses."""
+    grams = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TitleIndex:
+    """
+    In-process title index used when there is no pg_trgm (e.g. the SQLite stand-in).
+
+    Prefix lookups bisect a sorted array of lowercased titles; fuzzy lookups count shared
+    trigrams through an inverted index and rank by pg_trgm-style similarity.
+    """
+
+    def __init__(self):
+        self._titles = []
+        self._ids = array("q")
+        self._names = {}
+        self._trigram_counts = {}
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    @classmethod
+    def build(cls, movies):
+        """Build an index from (movie_id, movie_name) pairs in one pass."""
+        index = cls()
+        entries = sorted((name.lower(), movie_id) for movie_id, name in movies)
+        index._titles = [title for title, _ in entries]
+        index._ids = array("q", (movie_id for _, movie_id in entries))
+        for movie_id, name in movies:
+            index._add_trigrams(movie_id, name)
+        return index
+
+    def add(self, movie_id, movie_name):
+        """Insert a single title, keeping the prefix array sorted."""
+        key = (movie_name.lower(), movie_id)
+        position = self._position(key)
+        self._titles.insert(position, key[0])
+        self._ids.insert(position, movie_id)
+        self._add_trigrams(movie_id, movie_name)
+
+    def _position(self, key):
+        position = bisect.bisect_left(self._titles, key[0])
+        while position < len(self._titles) and self._titles[position] == key[0] and self._ids[position] < key[1]:
+            position += 1
+        return position
+
+    def _add_trigrams(self, movie_id, movie_name):
+        self._names[movie_id] = movie_name
+        grams = trigrams(movie_name)
+        self._trigram_counts[movie_id] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, array("q")).append(movie_id)
+
+    def prefix(self, query, limit, after=None):
+        """
+        Return up to limit (movie_id, movie_name) pairs whose title starts with query,
+        ordered by title then id, resuming after the (title, movie_id) cursor if given.
+        """
+        query = query.lower()
+        if after:
+            position = self._position((after[0], after[1] + 1))
+        else:
+            position = bisect.bisect_left(self._titles, query)
+        results = []
+        while position < len(self._titles) and len(results) < limit:
+            title = self._titles[position]
+            if not title.startswith(query):
+                break
+            movie_id = self._ids[position]
+            results.append((movie_id, self._names[movie_id]))
+            position += 1
+        return results
+
+    def fuzzy(self, query, limit, threshold=FUZZY_THRESHOLD):
+        """Return up to limit (movie_id, movie_name, similarity) triples, best match first."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for movie_id, common in shared.items():
+            similarity = common / (len(query_grams) + self._trigram_counts[movie_id] - common)
+            if similarity >= threshold:
+                scored.append((-similarity, movie_id))
+        scored.sort()
+        return [(movie_id, self._names[movie_id], -negative) for negative, movie_id in scored[:limit]]
@@ -0,0 +1,177 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from movie_crawler.browser_pool import DEFAULT_POOL_SIZE
+
+# Task nào cũng có thể cần browser: worker nhiều hơn pool chỉ ngồi chờ lease rồi hết thời gian
+DEFAULT_WORKERS = DEFAULT_POOL_SIZE
+DEFAULT_DOMAIN_CONCURRENCY = 2
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 120.0
+DASHBOARD_SECONDS = 15.0
+
+
+class CrawlTask:
+    """
+    One unit of crawl work on a source, e.g. a film list or the reviews of one film.
+
+    run() may return a list of CrawlTask (follow-up work, e.g. one task per film of a list)
+    or the {"new", "updated", "skipped"} counts of refresh_movie_reviews.
+    """
+
+    def __init__(self, source, label, run):
+        self.source = source
+        self.label = label
+        self.run = run
+        self.attempts = 0
+        self.not_before = 0.0  # Thời điểm (monotonic) được chạy lại sau backoff
+        self.started = 0.0
+
+
+def backoff_delay(attempt, base=BACKOFF_SECONDS, maximum=MAX_BACKOFF_SECONDS) -> float:
+    """Exponential backoff with jitter: base * 2^(attempt - 1), capped, times a random factor in [0.5, 1.5)."""
+    return min(maximum, base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+class CrawlOrchestrator:
+    """
+    Run crawl tasks concurrently across sources and films on a thread pool.
+
+    At most domain_concurrency[source] (default DEFAULT_DOMAIN_CONCURRENCY) tasks of a source
+    run at once, so one site never takes every worker and the others keep moving; how fast
+    pages are requested from each site is capped separately by the crawlers' DomainRateLimiter.
+    A failed task is retried up to max_attempts times after a jittered exponential backoff.
+    While running, a dashboard line per source is printed every dashboard_seconds.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, domain_concurrency=None, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF_SECONDS, dashboard_seconds=DASHBOARD_SECONDS):
+        self.max_workers = max_workers
+        self.domain_concurrency = domain_concurrency or {}
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.dashboard_seconds = dashboard_seconds
+        self._cond = threading.Condition()
+        self._queued = {}
+        self._running = {}
+        self._stats = {}
+        self._started = None
+
+    def _source_stats(self, source):
+        return self._stats.setdefault(source, {
+            "done": 0, "failed": 0, "retries": 0, "new": 0, "updated": 0, "skipped": 0, "task_seconds": 0.0,
+        })
+
+    def add(self, task: CrawlTask):
+        with self._cond:
+            self._queued.setdefault(task.source, deque()).append(task)
+            self._running.setdefault(task.source, 0)
+            self._source_stats(task.source)
+            self._cond.notify_all()
+
+    def _limit(self, source):
+        return self.domain_concurrency.get(source, DEFAULT_DOMAIN_CONCURRENCY)
+
+    def _next_ready(self, now):
+        """Pop a task whose source has a free slot and whose backoff is over, taking sources in turn."""
+        for source in sorted(self._queued, key=lambda source: self._running[source]):
+            if self._running[source] >= self._limit(source):
+                continue
+            queue = self._queued[source]
+            for _ in range(len(queue)):
+                task = queue.popleft()
+                if task.not_before <= now:
+                    return task
+                queue.append(task)
+        return None
+
+    def _next_wakeup(self, now):
+        due = [task.not_before for queue in self._queued.values() for task in queue if task.not_before > now]
+        return min(due) - now if due else None
+
+    def _execute(self, task):
+        error = result = None
+        try:
+            result = task.run()
+        except Exception as e:
+            error = e
+        with self._cond:
+            self._running[task.source] -= 1
+            stats = self._source_stats(task.source)
+            stats["task_seconds"] += time.monotonic() - task.started
+            if error is not None:
+                task.attempts += 1
+                if task.attempts < self.max_attempts:
+                    delay = backoff_delay(task.attempts, self.backoff)
+                    print(f"[{task.source}] {task.label} failed ({error}), retry {task.attempts} in {delay:.1f}s")
+                    task.not_before = time.monotonic() + delay
+                    stats["retries"] += 1
+                    self._queued[task.source].append(task)
+                else:
+                    print(f"[{task.source}] {task.label} failed after {task.attempts} attempts: {error}")
+                    stats["failed"] += 1
+            else:
+                stats["done"] += 1
+                if isinstance(result, list):
+                    for follow_up in result:
+                        self.add(follow_up)
+                elif isinstance(result, dict):
+                    for key in ("new", "updated", "skipped"):
+                        stats[key] += result.get(key, 0)
+            self._cond.notify_all()
+
+    def _pending(self):
+        return any(self._queued.values()) or any(self._running.values())
+
+    def run(self, tasks=()):
+        """Run tasks and every follow-up task until all are done or have failed; returns the per-source stats."""
+        for task in tasks:
+            self.add(task)
+        self._started = time.monotonic()
+        next_dashboard = self._started + self.dashboard_seconds
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawl") as executor:
+            with self._cond:
+                while self._pending():
+                    now = time.monotonic()
+                    running = sum(self._running.values())
+                    task = self._next_ready(now) if running < self.max_workers else None
+                    if task is not None:
+                        self._running[task.source] += 1
+                        task.started = now
+                        executor.submit(self._execute, task)
+                        continue
+                    if now >= next_dashboard:
+                        print(self.dashboard())
+                        next_dashboard = now + self.dashboard_seconds
+                    wakeups = [next_dashboard - now, self._next_wakeup(now)]
+                    self._cond.wait(timeout=min(wakeup for wakeup in wakeups if wakeup is not None))
+        print(self.dashboard())
+        return self.stats()
+
+    def stats(self):
+        with self._cond:
+            return {source: dict(stats) for source, stats in self._stats.items()}
+
+    def dashboard(self) -> str:
+        """One progress line per source, plus saved reviews per minute over the whole run."""
+        with self._cond:
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            lines = [f"--- crawl progress after {elapsed:.0f}s ---"]
+            saved = 0
+            for source, stats in sorted(self._stats.items()):
+                queue = self._queued.get(source, ())
+                waiting = sum(1 for task in queue if task.not_before > time.monotonic())
+                saved += stats["new"] + stats["updated"]
+                lines.append(
+                    f"{source:<12} running {self._running.get(source, 0)}/{self._limit(source)}"
+                    f"  queued {len(queue) - waiting}  backing off {waiting}"
+                    f"  done {stats['done']}  failed {stats['failed']}  retries {stats['retries']}"
+                    f"  reviews new {stats['new']} updated {stats['updated']} skipped {stats['skipped']}"
+                )
+            rate = saved / (elapsed / 60) if elapsed > 0 else 0.0
+            lines.append(f"{saved} reviews saved, {rate:.1f} reviews/minute")
+            return "\n".join(lines)
@@ -1,209 +1,386 @@
-import psycopg2
-from psycopg2.extras import execute_values
+import argparse
+import functools
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from movie_crawler.imdb_crawler import IMDBCrawler
 from movie_crawler.metacritic_crawler import MetacriticCrawler
 from movie_crawler.rotten_crawler import RottenTomatoesCrawler
+from movie_crawler.browser_pool import shared_browser_pool
+from movie_crawler.http_fetch import shared_page_fetcher
+from movie_crawler.rate_limit import shared_rate_limiter
+from movie_crawler.seen_set import LINK, REVIEW, REVIEW_KEY_VERSION, SeenSet, canonical_url, review_key
+from .crawl_orchestrator import DEFAULT_DOMAIN_CONCURRENCY, CrawlOrchestrator, CrawlTask
+from .normalize import normalize_review
+from .pipeline import ReviewPipeline
+from .storage import get_review_store
 
 load_dotenv()
 
-def get_existing_links():
-    conn = None
-    cursor = None
+CRAWLERS = {
+    "rotten": RottenTomatoesCrawler,
+    "imdb": IMDBCrawler,
+    "metacritic": MetacriticCrawler,
+}
+
+# Các danh sách review của mỗi nguồn
+SOURCE_ROLES = {
+    "rotten": ["critic", "user"],
+    "imdb": ["user"],
+    "metacritic": ["critic", "user"],
+}
+
+# Tập link và review đã crawl, giữ trên đĩa giữa các lần chạy
+SEEN_SET_PATH = os.getenv("CRAWL_SEEN_SET", "crawl_seen.sqlite3")
+SEEN_SYNC_BATCH_SIZE = 10000
+
+def sync_seen_set(seen, store, batch_size=SEEN_SYNC_BATCH_SIZE):
+    """Add the movies and reviews saved since the last sync to seen; returns how many keys were added."""
+    if seen.get_meta("review_key_version") != REVIEW_KEY_VERSION:
+        if seen.count:
+            # Key review cũ không có score: dựng lại cả set từ đầu
+            print(f"Seen set {seen.path}: review keys changed, rebuilding it from the review store")
+            seen.clear()
+        seen.set_meta("review_key_version", REVIEW_KEY_VERSION)
+    added = 0
+    movie_id = seen.get_meta("movies_synced_id")
+    while True:
+        rows = store.movie_links_after(movie_id, batch_size)
+        if not rows:
+            break
+        added += seen.add(LINK, [canonical_url(row["link"]) for row in rows])
+        movie_id = rows[-1]["movie_id"]
+        seen.set_meta("movies_synced_id", movie_id)
+    review_id = seen.get_meta("reviews_synced_id")
+    while True:
+        rows = store.review_keys_after(review_id, batch_size)
+        if not rows:
+            break
+        added += seen.add(REVIEW, [review_key(row["link"], row["fingerprint"], row["score"]) for row in rows])
+        review_id = rows[-1]["review_id"]
+        seen.set_meta("reviews_synced_id", review_id)
+    return added
+
+def open_seen_set(path=SEEN_SET_PATH):
+    """
+    The SeenSet of the crawl, brought up to date with what was saved since the last run.
+
+    Only rows added since then are read, so startup does not load every link of the database.
+    The file belongs to one database; delete it (and its .bloom) when pointing the crawl at another.
+    """
+    seen = SeenSet(path)
+    store = None
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("POSTGRES_DATABASE"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST"),
-            port=os.getenv("DB_PORT", "5432"),
-        )
-        cursor = conn.cursor()
-        cursor.execute("SELECT link FROM movies")
-        links = {row[0] for row in cursor.fetchall()}
-        return links
+        store = get_review_store()
+        added = sync_seen_set(seen, store)
+        print(f"Seen set {path}: {seen.count} links and reviews ({added} new since the last run)")
     except Exception as e:
-        print(f"Error fetching existing links: {e}")
-        return set()
+        print(f"Error syncing the seen set: {e}")
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-def normalize_review(review, source: str):
-    if not isinstance(review, dict):
-        print(f"Skipping invalid review item: {review} (type: {type(review)})")
-        return None
-    role = review.get("role", "user")  # Lấy role từ review, mặc định là "user"
-    if source == "imdb":
-        return {
-            "review": review.get("review", "No Review"),
-            "score": review.get("score", "No Score"),
-            "author_name": review.get("author_name", "No Author"),
-            "review_date": review.get("review_date", None),
-            "link": review.get("link", None),
-            "role": role,
+        if store:
+            store.close()
+    return seen
+
+def skip_seen_reviews(reviews, source: str, role: str, movie_link: str, seen):
+    """
+    Yield the crawled reviews of one listing that are not in seen yet with the same score.
+
+    The first review is always passed on: it is the newest of the listing and becomes its watermark.
+    A review whose score changed is passed on too, so save_reviews can update it.
+    """
+    reviews = iter(reviews)
+    try:
+        for position, review in enumerate(reviews):
+            if position:
+                normalized = normalize_review(dict(review, role=role), source)
+                if normalized is not None and seen.contains(REVIEW, review_key(movie_link, normalized["fingerprint"], normalized["score"])):
+                    continue
+            yield review
+    finally:
+        # Đóng generator của crawler để trả browser về pool
+        if hasattr(reviews, "close"):
+            reviews.close()
+
+def iter_movie_reviews(crawler, source: str, movie_link: str, known_fingerprints=None, seen=None):
+    """
+    The review listings of a movie on one source, newest first where the site allows.
+
+    Args:
+        known_fingerprints (dict): {role: set of fingerprints}; a listing stops loading as soon
+            as one of these reviews shows up.
+        seen (SeenSet): Reviews already in it are not passed on (see skip_seen_reviews).
+
+    Returns:
+        dict: {role: generator of raw reviews}; nothing is loaded until a listing is iterated.
+    """
+    known_fingerprints = known_fingerprints or {}
+
+    def stop_at(role):
+        known = known_fingerprints.get(role)
+        if not known:
+            return None
+        return lambda review: normalize_review(dict(review, role=role), source)["fingerprint"] in known
+
+    if source == "rotten":
+        listings = {
+            "critic": crawler.iter_reviews(f"{movie_link}/reviews", role="critic", stop_when=stop_at("critic")),
+            "user": crawler.iter_reviews(f"{movie_link}/reviews?type=user", role="user", stop_when=stop_at("user")),
         }
-    elif source == "rotten":
-        sentiment = review.get("sentiment", "N/A")
-        score = {
-            "POSITIVE": "Positive",
-            "NEGATIVE": "Negative",
-            "NEUTRAL": "Neutral",
-            "N/A": "No Score",
-        }.get(sentiment, "No Score")
-        return {
-            "review": review.get("review", "No Review"),
-            "score": score,
-            "author_name": review.get("author", "N/A"),
-            "review_date": review.get("review_date", None),
-            "link": review.get("link", None),
-            "role": role,
+    elif source == "imdb":
+        review_url = crawler.convert_to_review_url(movie_link, newest_first=True)
+        listings = {"user": crawler.iter_reviews(review_url, stop_when=stop_at("user"))}
+    else:
+        listings = {
+            role: crawler.iter_reviews(
+                crawler.newest_first_url(f"{movie_link}{role}-reviews/", role), role=role, stop_when=stop_at(role)
+            )
+            for role in SOURCE_ROLES["metacritic"]
         }
-    elif source == "metacritic":
-        return {
-            "review": review.get("review", "No Review"),
-            "score": review.get("score", "No Score"),
-            "author_name": review.get("author_name", "No Author"),
-            "review_date": review.get("review_date", None),
-            "link": review.get("link", None),
-            "role": role,
+    if seen is not None:
+        listings = {
+            role: skip_seen_reviews(reviews, source, role, movie_link, seen) for role, reviews in listings.items()
         }
-    return None
+    return listings
+
+def crawl_movie_reviews(crawler, source: str, movie_link: str, known_fingerprints=None):
+    """
+    Crawl every review listing of a movie on one source into memory (see iter_movie_reviews).
+
+    Returns:
+        dict: {role: [raw reviews]} for every listing of the source, newest first.
+    """
+    listings = iter_movie_reviews(crawler, source, movie_link, known_fingerprints)
+    return {role: list(reviews) for role, reviews in listings.items()}
+
+def refresh_movie_reviews(movie_link: str, source: str, crawler=None, movie_name: str = None, processor=None,
+                          checkpoint=None, seen=None):
+    """
+    Crawl only the reviews posted since the last crawl of a movie on one source and save them.
+
+    Reviews are streamed through a ReviewPipeline and saved in batches while the crawl goes on;
+    with an ABSA processor they are scored as well. A movie that is not in the database yet
+    is crawled in full. With a CrawlCheckpoint, review listings it marks as done are skipped
+    and the progress of the others is recorded in it. With a SeenSet, reviews already in it
+    are dropped before they reach the pipeline, saved ones are added as they are committed,
+    and the movie's link is added once saved.
+
+    Returns:
+        dict: {"new", "updated", "skipped"} counts, or None if nothing could be saved.
+    """
+    store = get_review_store()
+    try:
+        movie = store.get_movie(movie_link)
+        # Chỉ dừng ở review mới nhất của lần crawl trọn vẹn trước: nếu lần trước bị ngắt giữa chừng,
+        # các review mới đã lưu không được chặn việc tải những review cũ hơn chưa lưu
+        known = store.watermark_fingerprints(movie["movie_id"], source) if movie else {}
+        if movie:
+            movie_name = movie["movie_name"]
+    finally:
+        store.close()
+
+    crawler = crawler or CRAWLERS[source]()
+    listings = iter_movie_reviews(crawler, source, movie_link, known, seen)
+    on_progress = None
+    if checkpoint is not None:
+        done_roles = checkpoint.done_roles(movie_link)
+        listings = {role: reviews for role, reviews in listings.items() if role not in done_roles}
+        on_progress = functools.partial(checkpoint.update_film, movie_link)
 
-def save_reviews_to_postgres(reviews, movie_name: str, source: str, movie_link: str = None):
-    conn = None
-    cursor = None
+    pipeline = ReviewPipeline(processor=processor, model_version=os.getenv("ABSA_MODEL_VERSION", "absa_model"), seen=seen)
+    counts = pipeline.run(movie_link, source, listings, movie_name, on_progress=on_progress)
+    if checkpoint is not None:
+        checkpoint.finish_film(movie_link)
+    if counts.pop("movie_id") is None:
+        print(f"No {source} reviews for {movie_name or movie_link}")
+        return None
+    if seen is not None:
+        seen.add(LINK, [canonical_url(movie_link)])
+    print(
+        f"Saved {source} reviews for {pipeline.movie_name}: "
+        f"{counts['new']} new, {counts['updated']} updated, {counts['skipped']} skipped"
+    )
+    return counts
+
+def save_reviews(reviews, movie_name: str, source: str, movie_link: str = None, crawled_roles=None):
+    """Normalize crawled reviews and upsert them with the configured review store (see api.storage)."""
+    # Đảm bảo movie_name không phải None
+    if not movie_name:
+        movie_name = "Unknown Movie"
+
+    if not isinstance(reviews, list):
+        print(f"Reviews is not a list: {reviews} (type: {type(reviews)})")
+        return
+
+    # Chuẩn hóa đánh giá
+    normalized_reviews = [normalize_review(r, source) for r in reviews]
+    normalized_reviews = [r for r in normalized_reviews if r is not None]
+    if not normalized_reviews:
+        print(f"No valid reviews to save for {movie_name}")
+        return
+
+    # Bỏ các review trùng fingerprint trong cùng một lần crawl (ON CONFLICT không cho cập nhật một dòng hai lần)
+    unique_reviews = {}
+    for r in normalized_reviews:
+        unique_reviews.setdefault(r["fingerprint"], r)
+
+    store = None
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv("POSTGRES_DATABASE"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST"),
-            port=os.getenv("DB_PORT", "5432"),
+        store = get_review_store()
+        counts = store.save_reviews(
+            movie_name, movie_link, source, list(unique_reviews.values()), crawled_roles=crawled_roles or ()
         )
-        cursor = conn.cursor()
-
-        # Đảm bảo movie_name không phải None
-        if not movie_name:
-            movie_name = "Unknown Movie"
-
-        # Lưu phim vào bảng movies
-        query = """
-        INSERT INTO movies (movie_name, link)
-        VALUES (%s, %s)
-        ON CONFLICT (movie_name, link) DO UPDATE
-        SET movie_name = EXCLUDED.movie_name
-        RETURNING movie_id
-        """
-        cursor.execute(query, (movie_name, movie_link))
-        movie_id = cursor.fetchone()[0]
-
-        if not isinstance(reviews, list):
-            print(f"Reviews is not a list: {reviews} (type: {type(reviews)})")
-            return
-
-        # Chuẩn hóa đánh giá
-        normalized_reviews = [normalize_review(r, source) for r in reviews]
-        normalized_reviews = [r for r in normalized_reviews if r is not None]
-        if not normalized_reviews:
-            print(f"No valid reviews to save for {movie_name}")
-            return
-
-        # Lưu đánh giá vào bảng reviews, bao gồm trường role
-        query = """
-        INSERT INTO reviews (movie_id, review, score, author_name, review_date, source, role)
-        VALUES %s
-        """
-        values = [
-            (movie_id, r["review"], r["score"], r["author_name"], r["review_date"], source, r["role"])
-            for r in normalized_reviews
-        ]
-        execute_values(cursor, query, values)
-
-        conn.commit()
-        print(f"Saved {len(normalized_reviews)} {source} reviews for {movie_name}")
+        store.commit()
+        counts["skipped"] += len(normalized_reviews) - len(unique_reviews)
+        print(
+            f"Saved {source} reviews for {movie_name}: "
+            f"{counts['new']} new, {counts['updated']} updated, {counts['skipped']} skipped"
+        )
+        return counts
 
     except Exception as e:
         print(f"Error saving reviews to database: {e}")
-        if conn:
-            conn.rollback()
+        if store:
+            store.rollback()
         raise  # Ném lỗi để ReviewsAPIView có thể bắt
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-            
+        if store:
+            store.close()
+
+
+
+class CrawlQueue:
+    """
+    Crawl movies that are not in the database yet on a few background threads.
+
+    A link already waiting or being crawled is not queued twice; once its crawl is saved
+    it shows up in the review store like any other movie.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl-queue")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, movie_link, source):
+        """Queue a crawl of movie_link; returns False if it is already queued."""
+        with self._lock:
+            if movie_link in self._pending:
+                return False
+            self._pending.add(movie_link)
+        self._executor.submit(self._crawl, movie_link, source)
+        return True
+
+    def is_pending(self, movie_link):
+        with self._lock:
+            return movie_link in self._pending
+
+    def _crawl(self, movie_link, source):
+        try:
+            refresh_movie_reviews(movie_link, source)
+        except Exception as e:
+            print(f"Error crawling queued movie {movie_link}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(movie_link)
+
 
 if __name__ == "__main__":
-    existing_links = get_existing_links()
-    
-    # Initialize crawlers
-    imdb_crawler = IMDBCrawler()
-    metacritic_crawler = MetacriticCrawler()
-    rotten_crawler = RottenTomatoesCrawler()
+    parser = argparse.ArgumentParser(description="Crawl films and their reviews into the review store (Postgres or SQLite).")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-crawl films already in the database, fetching only reviews newer than their watermark",
+    )
+    parser.add_argument("--films", type=int, default=10, help="Number of films to crawl per source")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("CRAWL_WORKERS") or shared_browser_pool().size),
+        help="Crawl tasks running at once over all sources (default: the browser pool size)",
+    )
+    parser.add_argument(
+        "--per-domain", type=int, default=int(os.getenv("CRAWL_DOMAIN_CONCURRENCY", str(DEFAULT_DOMAIN_CONCURRENCY))),
+        help="Crawl tasks running at once on each source",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Pick up an interrupted crawl from the crawlers' state files, skipping film lists and films already done",
+    )
+    parser.add_argument(
+        "--score", action="store_true",
+        help="Also score the aspect sentiments of new reviews with the ABSA model while crawling",
+    )
+    args = parser.parse_args()
+
+    seen = open_seen_set()
+
+    processor = None
+    if args.score:
+        from model.model import ABSAProcessor
+
+        processor = ABSAProcessor(
+            model_name="yangheng/deberta-v3-base-absa-v1.1", max_length=128, test_size=0.2, random_state=42
+        )
+        processor.load_model(load_path="./absa_model")
+
+    # Initialize crawlers; mỗi crawler ghi tiến độ vào state_file của nó
+    imdb_crawler = IMDBCrawler(resume=args.resume)
+    metacritic_crawler = MetacriticCrawler(resume=args.resume)
+    rotten_crawler = RottenTomatoesCrawler(resume=args.resume)
 
     # Number of films to crawl
-    target_films = 10
+    target_films = args.films
+
+    def film_tasks(crawler, film_list, source, label):
+        """One task per film of a list; runs as the follow-up of the list task."""
+        print(f"Total films from {label}: {len(film_list)}")
+        tasks = []
+        for link, title in list(film_list.items())[:target_films]:
+            if crawler.checkpoint.film_done(link):
+                print(f"Skipping {title} ({label}) - Already crawled by the interrupted run")
+                continue
+            # Hỏi seen set trước khi mở trang review của phim
+            if not args.refresh and seen.contains(LINK, canonical_url(link)):
+                print(f"Skipping {title} ({label}) - Already in database")
+                continue
+            tasks.append(CrawlTask(
+                source, title,
+                functools.partial(
+                    refresh_movie_reviews, link, source, crawler=crawler, movie_name=title, processor=processor,
+                    checkpoint=crawler.checkpoint, seen=seen,
+                ),
+            ))
+        return tasks
 
-    # 1. Rotten Tomatoes
-    print("Crawling films from Rotten Tomatoes...")
     rotten_base_url = "https://www.rottentomatoes.com/browse/movies_at_home/"
-    rotten_film_list = rotten_crawler.get_film_list(rotten_base_url, target_films=target_films)
-    print(f"Total films from Rotten Tomatoes: {len(rotten_film_list)}")
-
-    # Get reviews for each film
-    for title, link in list(rotten_film_list.items())[:target_films]:
-        if link in existing_links:
-            print(f"Skipping {title} (Rotten Tomatoes) - Already in database")
-            continue
-        
-        print(f"Crawling reviews for {title} (Rotten Tomatoes)...")
-        rotten_critic_reviews = rotten_crawler.get_reviews(f"{link}/reviews", role="critic")
-        rotten_user_reviews = rotten_crawler.get_reviews(f"{link}/reviews?type=user", role="user")
-        rotten_reviews = rotten_critic_reviews + rotten_user_reviews
-        save_reviews_to_postgres(rotten_reviews, title, "rotten", link)
-
-    # 2. Metacritic
-    print("\nCrawling films from Metacritic...")
     metacritic_base_url = "https://www.metacritic.com/browse/movie/all/all/all-time/new/?releaseYearMin=1910&releaseYearMax=2025&page="
-    metacritic_film_list = {}
-
-    metacritic_film_list = metacritic_crawler.get_movie_list(metacritic_base_url, min_movies=target_films)
-
-    print(f"Total films from Metacritic: {len(metacritic_film_list)}")
-
-    # Get reviews for each film
-    for title, link in metacritic_film_list.items():
-        if link in existing_links:
-            print(f"Skipping {title} (Metacritic) - Already in database")
-            continue
-        print(f"Crawling reviews for {title} (Metacritic)...")
-        critic_review_url = f"{link}critic-reviews/"
-        user_review_url = f"{link}user-reviews/"
-        
-        meta_reviews = metacritic_crawler.get_reviews(critic_review_url, role="critic")
-        meta_reviews += metacritic_crawler.get_reviews(user_review_url, role="user")
-        
-        save_reviews_to_postgres(meta_reviews, title, "metacritic", link)
-
-    # 3. IMDb
-    print("\nCrawling films from IMDb...")
     imdb_base_url = "https://www.imdb.com/search/title/?title_type=feature&sort=num_votes,desc"
-    imdb_film_list = imdb_crawler.get_film_list(imdb_base_url, target_films=target_films)
-    print(f"Total films from IMDb: {len(imdb_film_list)}")
-
-    # Get reviews for each film
-    for title, link in list(imdb_film_list.items())[:target_films]:
-        if link in existing_links:
-            print(f"Skipping {title} (IMDB) - Already in database")
-            continue
-        print(f"Crawling reviews for {title} (IMDb)...")
-        review_url = imdb_crawler.convert_to_review_url(link)
-        imdb_reviews = imdb_crawler.get_reviews(review_url)
-        save_reviews_to_postgres(imdb_reviews, title, "imdb", link)
-
-    print("Finished crawling and saving films and reviews to database.")
\ No newline at end of file
+
+    # Ba nguồn chạy song song; mỗi danh sách phim sinh ra các task crawl review cho từng phim
+    orchestrator = CrawlOrchestrator(
+        max_workers=args.workers,
+        domain_concurrency={source: args.per_domain for source in CRAWLERS},
+    )
+    orchestrator.run([
+        CrawlTask("rotten", "film list", lambda: film_tasks(
+            rotten_crawler, rotten_crawler.get_film_list(rotten_base_url, target_films=target_films),
+            "rotten", "Rotten Tomatoes",
+        )),
+        CrawlTask("metacritic", "film list", lambda: film_tasks(
+            metacritic_crawler, metacritic_crawler.get_movie_list(metacritic_base_url, min_movies=target_films),
+            "metacritic", "Metacritic",
+        )),
+        CrawlTask("imdb", "film list", lambda: film_tasks(
+            imdb_crawler, imdb_crawler.get_film_list(imdb_base_url, target_films=target_films),
+            "imdb", "IMDB",
+        )),
+    ])
+
+    for crawler in (rotten_crawler, metacritic_crawler, imdb_crawler):
+        crawler.checkpoint.save(force=True)
+    print("Finished crawling and saving films and reviews to database.")
+    print(f"Plain HTTP fetches: {shared_page_fetcher().metrics()}")
+    print(f"Browser pool: {shared_browser_pool().metrics()}")
+    print(f"Seconds waited for rate limits: {shared_rate_limiter().metrics()}")
+    print(f"Seen set: {seen.metrics()}")
+    seen.close()
+    shared_browser_pool().close()
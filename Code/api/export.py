@@ -0,0 +1,344 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .aspects import ASPECTS, SENTIMENT_LABELS
+
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_ROW_GROUP_SIZE = 100000
+STATE_FILE = "_export_state.json"
+
+UTC_TIMESTAMP = pa.timestamp("us", tz="UTC")
+EPOCH = "1970-01-01 00:00:00"
+# Id và thời điểm được cấp lúc ghi chứ không phải lúc commit: một transaction commit muộn có thể
+# thêm dòng dưới watermark đã chốt. Export tăng dần đọc lại khoảng này bên dưới watermark trước.
+EXPORT_ID_OVERLAP = 10000
+EXPORT_TIME_OVERLAP = timedelta(minutes=30)
+
+# Mỗi bảng: câu SELECT, khóa chính, cột watermark cho export tăng dần (và watermark khi bảng còn rỗng),
+# khoảng đọc lại bên dưới watermark, cột chia partition và schema Parquet.
+# Review và aspect được chia theo source (thư mục source=imdb/, ...), movies nằm trong một thư mục.
+EXPORT_TABLES = {
+    "movies": {
+        "query": """
+        SELECT movie_id, movie_name, link, review_count, data_version, last_crawled_at
+        FROM movies m
+        WHERE true{conditions}
+        ORDER BY movie_id
+        """,
+        "key": "movie_id",
+        "watermark": "m.last_crawled_at",
+        "first_watermark": EPOCH,
+        "overlap": EXPORT_TIME_OVERLAP,
+        "partition": None,
+        "schema": pa.schema([
+            ("movie_id", pa.int64()),
+            ("movie_name", pa.string()),
+            ("link", pa.string()),
+            ("review_count", pa.int32()),
+            ("data_version", pa.int32()),
+            ("last_crawled_at", UTC_TIMESTAMP),
+        ]),
+    },
+    "reviews": {
+        "query": """
+        SELECT r.review_id, r.movie_id, r.review, r.score, r.score_value, r.author_name, r.review_date, r.published_on,
+               r.source, COALESCE(r.role, 'user') AS role, r.fingerprint
+        FROM reviews r
+        WHERE true{conditions}
+        ORDER BY r.review_id
+        """,
+        "key": "review_id",
+        "watermark": "r.review_id",
+        "first_watermark": 0,
+        "overlap": EXPORT_ID_OVERLAP,
+        "partition": "source",
+        "schema": pa.schema([
+            ("review_id", pa.int64()),
+            ("movie_id", pa.int64()),
+            ("review", pa.string()),
+            ("score", pa.string()),
+            ("score_value", pa.float64()),
+            ("author_name", pa.string()),
+            ("review_date", pa.string()),
+            ("published_on", pa.date32()),
+            ("source", pa.string()),
+            ("role", pa.string()),
+            ("fingerprint", pa.string()),
+        ]),
+    },
+    "aspect_sentiments": {
+        "query": f"""
+        SELECT s.review_id, r.movie_id, r.source, COALESCE(r.role, 'user') AS role,
+               {", ".join(f"s.{aspect}" for aspect in ASPECTS)}, s.confidence, s.model_version, s.scored_at
+        FROM review_aspect_scores s
+        JOIN reviews r ON r.review_id = s.review_id
+        WHERE true{{conditions}}
+        ORDER BY s.review_id
+        """,
+        "key": "review_id",
+        "watermark": "s.scored_at",
+        "first_watermark": EPOCH,
+        "overlap": EXPORT_TIME_OVERLAP,
+        "partition": "source",
+        "schema": pa.schema(
+            [("review_id", pa.int64()), ("movie_id", pa.int64()), ("source", pa.string()), ("role", pa.string())]
+            + [(aspect, pa.string()) for aspect in ASPECTS]
+            + [("confidence", pa.float64()), ("model_version", pa.string()), ("scored_at", UTC_TIMESTAMP)]
+        ),
+    },
+}
+
+def export_bounds(store, table):
+    """Return the current maximum watermark of a table; rows written later wait for the next export."""
+    column = EXPORT_TABLES[table]["watermark"]
+    alias = column.split(".")[0]
+    from_clause = {"m": "movies m", "r": "reviews r", "s": "review_aspect_scores s"}[alias]
+    row = store.fetch_one(f"SELECT MAX({column}) AS max_value FROM {from_clause}")
+    return row["max_value"]
+
+def overlap_start(table, watermark):
+    """
+    Lower bound that re-reads the table's overlap below a watermark (a value of its watermark
+    column, or its text form from _export_state.json or an `after` parameter).
+
+    Raises:
+        ValueError: If a timestamp watermark can't be parsed.
+    """
+    overlap = EXPORT_TABLES[table]["overlap"]
+    if isinstance(overlap, timedelta):
+        if not isinstance(watermark, datetime):
+            watermark = datetime.fromisoformat(str(watermark))
+        if watermark.tzinfo is None:
+            watermark = watermark.replace(tzinfo=timezone.utc)
+    return watermark - overlap
+
+def export_key(table, row):
+    """(primary key, watermark) of an exported row; the same pair is never exported twice."""
+    spec = EXPORT_TABLES[table]
+    value = row[spec["watermark"].split(".")[1]]
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc).isoformat()
+    return (row[spec["key"]], value)
+
+def export_rows(store, table, after=None, upper=None, source=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the rows of one export table in chunks, read through the store's streaming cursor.
+
+    Args:
+        after: Only rows whose watermark column is greater (incremental export).
+        upper: Only rows whose watermark column is at most this value (from export_bounds);
+            rows without a watermark, e.g. aspect scores migrated from aspect_sentiment,
+            are only part of a full export.
+        source: Only rows of this source.
+    """
+    spec = EXPORT_TABLES[table]
+    column = spec["watermark"]
+    alias = column.split(".")[0]
+    conditions = ""
+    params = []
+    if after is not None:
+        conditions += f" AND {column} > %s"
+        params.append(after)
+    if upper is not None:
+        conditions += f" AND ({column} <= %s OR {column} IS NULL)"
+        params.append(upper)
+    if source:
+        conditions += f" AND {'r' if alias == 's' else alias}.source = %s"
+        params.append(source)
+    query = spec["query"].format(conditions=conditions)
+    for rows in store.iter_query(query, params, chunk_size):
+        if table == "aspect_sentiments":
+            # Parquet mã hóa dictionary cho cột chuỗi, nên lưu nhãn thay vì mã smallint
+            rows = [
+                {**row, **{aspect: SENTIMENT_LABELS.get(row[aspect]) for aspect in ASPECTS}}
+                for row in rows
+            ]
+        yield rows
+
+def to_record_batch(rows, schema):
+    return pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+class PartitionedParquetWriter:
+    """
+    Write rows of one table into Parquet files, one per partition value, in row groups.
+
+    Rows are buffered per partition until row_group_size is reached, so memory stays
+    bounded by the number of partitions times the row group size. Files are written
+    under a temporary name and renamed on close, so a failed export leaves no partial part.
+    As usual for hive-style partitions, the partition column is kept in the directory name only.
+    """
+
+    def __init__(self, directory, schema, partition=None, part_name="part", row_group_size=EXPORT_ROW_GROUP_SIZE):
+        self.directory = directory
+        self.schema = schema.remove(schema.get_field_index(partition)) if partition else schema
+        self.partition = partition
+        self.part_name = part_name
+        self.row_group_size = row_group_size
+        self.row_count = 0
+        self._writers = {}
+        self._pending = {}
+
+    def _path(self, value):
+        directory = self.directory
+        if self.partition:
+            directory = os.path.join(directory, f"{self.partition}={value}")
+        return os.path.join(directory, f"{self.part_name}.parquet")
+
+    def write_rows(self, rows):
+        for row in rows:
+            value = row[self.partition] if self.partition else None
+            pending = self._pending.setdefault(value, [])
+            pending.append(row)
+            if len(pending) >= self.row_group_size:
+                self._flush(value)
+        self.row_count += len(rows)
+
+    def _flush(self, value):
+        rows = self._pending.pop(value, None)
+        if not rows:
+            return
+        writer = self._writers.get(value)
+        if writer is None:
+            path = self._path(value)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = pq.ParquetWriter(path + ".tmp", self.schema, compression="zstd")
+            self._writers[value] = writer
+        writer.write_batch(to_record_batch(rows, self.schema), row_group_size=self.row_group_size)
+
+    def close(self):
+        """Flush the remaining rows and publish the files; returns their paths."""
+        for value in list(self._pending):
+            self._flush(value)
+        paths = []
+        for value, writer in self._writers.items():
+            writer.close()
+            path = self._path(value)
+            os.replace(path + ".tmp", path)
+            paths.append(path)
+        return paths
+
+    def abort(self):
+        for value, writer in self._writers.items():
+            writer.close()
+            os.remove(self._path(value) + ".tmp")
+
+
+def read_export_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_export_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+
+def export_parquet(store, output_dir, tables=None, incremental=False, chunk_size=EXPORT_CHUNK_SIZE,
+                   row_group_size=EXPORT_ROW_GROUP_SIZE):
+    """
+    Export movies, reviews and aspect sentiments into partitioned Parquet files under output_dir.
+
+    Each run writes new part files named after the run time, e.g.
+    reviews/source=imdb/part-20250101T000000Z-1a2b3c4d.parquet. With incremental=True only rows
+    whose watermark (last_crawled_at, review_id, scored_at) is newer than the one recorded
+    by the previous run are exported; the new watermarks are saved in _export_state.json.
+
+    Rows committed late can have a watermark below one already recorded, so each run re-reads
+    the table's overlap below the previous watermark. The (key, watermark) pairs exported
+    within the overlap are kept in the state as well, and rows already exported are skipped.
+
+    Returns:
+        dict: {table: {"rows", "files", "watermark"}}.
+    """
+    tables = tables or list(EXPORT_TABLES)
+    state = read_export_state(output_dir) if incremental else {}
+    run_name = f"part-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+    results = {}
+    for table in tables:
+        spec = EXPORT_TABLES[table]
+        upper = export_bounds(store, table)
+        previous = state.get(table)
+        if not isinstance(previous, dict):
+            # State của phiên bản cũ chỉ có watermark
+            previous = {"watermark": previous, "exported": []}
+        after = previous["watermark"]
+        exported = {tuple(key) for key in previous["exported"]}
+        column = spec["watermark"].split(".")[1]
+        window_start = overlap_start(table, upper) if upper is not None else None
+        recent = []
+        writer = PartitionedParquetWriter(
+            os.path.join(output_dir, table), spec["schema"], spec["partition"], run_name, row_group_size
+        )
+        try:
+            lower = overlap_start(table, after) if after is not None else None
+            for rows in export_rows(store, table, after=lower, upper=upper, chunk_size=chunk_size):
+                keys = [export_key(table, row) for row in rows]
+                writer.write_rows([row for row, key in zip(rows, keys) if key not in exported])
+                recent.extend(
+                    key for row, key in zip(rows, keys) if row[column] is not None and row[column] > window_start
+                )
+            files = writer.close()
+        except Exception:
+            writer.abort()
+            raise
+        # Bảng rỗng (hoặc chỉ có dòng không có watermark) vẫn được ghi mốc, để lần sau không xuất lại từ đầu
+        watermark = upper if upper is not None else after if after is not None else spec["first_watermark"]
+        results[table] = {"rows": writer.row_count, "files": files, "watermark": watermark, "exported": recent}
+        print(f"Exported {writer.row_count} {table} rows into {len(files)} files")
+
+    new_state = read_export_state(output_dir)
+    new_state.update({
+        table: {"watermark": result["watermark"], "exported": result.pop("exported")} for table, result in results.items()
+    })
+    write_export_state(output_dir, new_state)
+    return results
+
+
+class _StreamSink:
+    """File-like sink that hands the bytes written by ParquetWriter to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_parquet(store, table, after=None, upper=None, source=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one Parquet file of a table as bytes, one row group per chunk, for a streaming response."""
+    schema = EXPORT_TABLES[table]["schema"]
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in export_rows(store, table, after=after, upper=upper, source=source, chunk_size=chunk_size):
+            writer.write_batch(to_record_batch(rows, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,298 @@
+import csv
+import io
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+
+from .normalize import normalize_review, parse_review_date, parse_score
+
+INGEST_BATCH_SIZE = 50000
+BACKFILL_BATCH_SIZE = 5000
+
+STAGING_COLUMNS = [
+    "ord", "link", "movie_name", "review", "score", "author_name", "review_date", "source", "role", "fingerprint",
+    "score_value", "published_on",
+]
+
+STAGING_TABLE_DDL = """
+CREATE TEMP TABLE review_staging (
+    ord BIGINT NOT NULL,
+    link TEXT NOT NULL,
+    movie_name TEXT NOT NULL,
+    review TEXT NOT NULL,
+    score TEXT,
+    author_name TEXT,
+    review_date TEXT,
+    source VARCHAR(32) NOT NULL,
+    role VARCHAR(16),
+    fingerprint VARCHAR(40) NOT NULL,
+    score_value DOUBLE PRECISION,
+    published_on DATE,
+    movie_id INTEGER,
+    status VARCHAR(8) NOT NULL DEFAULT 'new'
+)
+"""
+
+# Gộp dữ liệu staging vào movies/reviews bằng vài câu SQL theo tập hợp;
+# cú pháp dùng được cho cả Postgres lẫn SQLite >= 3.39 (UPDATE ... FROM, IS DISTINCT FROM).
+MERGE_STATEMENTS = [
+    # Bỏ review trùng fingerprint trong cùng file, giữ dòng xuất hiện đầu tiên
+    """
+    DELETE FROM review_staging
+    WHERE EXISTS (
+        SELECT 1 FROM review_staging k
+        WHERE k.link = review_staging.link AND k.fingerprint = review_staging.fingerprint AND k.ord < review_staging.ord
+    )
+    """,
+    """
+    INSERT INTO movies (movie_name, link, data_version, review_count, last_crawled_at)
+    SELECT MIN(movie_name), link, 0, 0, CURRENT_TIMESTAMP FROM review_staging WHERE true GROUP BY link
+    ON CONFLICT (link) DO NOTHING
+    """,
+    """
+    UPDATE review_staging SET movie_id = movies.movie_id
+    FROM movies WHERE movies.link = review_staging.link
+    """,
+    """
+    UPDATE review_staging
+    SET status = CASE WHEN reviews.score IS DISTINCT FROM review_staging.score THEN 'updated' ELSE 'skipped' END
+    FROM reviews
+    WHERE reviews.movie_id = review_staging.movie_id AND reviews.fingerprint = review_staging.fingerprint
+    """,
+    """
+    UPDATE reviews SET score = review_staging.score, score_value = review_staging.score_value
+    FROM review_staging
+    WHERE review_staging.status = 'updated'
+      AND reviews.movie_id = review_staging.movie_id AND reviews.fingerprint = review_staging.fingerprint
+    """,
+    """
+    INSERT INTO reviews (movie_id, review, score, author_name, review_date, source, role, fingerprint, score_value, published_on)
+    SELECT movie_id, review, score, author_name, review_date, source, role, fingerprint, score_value, published_on
+    FROM review_staging WHERE status = 'new' ORDER BY ord
+    ON CONFLICT (movie_id, fingerprint) DO NOTHING
+    """,
+    # Phim có review thay đổi: tăng version để cache /api/reviews được làm mới
+    """
+    UPDATE movies
+    SET data_version = data_version + 1, review_count = review_count + changed.new_count, last_crawled_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT movie_id, SUM(CASE WHEN status = 'new' THEN 1 ELSE 0 END) AS new_count
+        FROM review_staging WHERE status <> 'skipped' GROUP BY movie_id
+    ) changed
+    WHERE movies.movie_id = changed.movie_id
+    """,
+]
+
+PRESETS = ("rotten-kaggle", "imdb-kaggle")
+
+def source_from_link(link):
+    if "rottentomatoes.com" in link:
+        return "rotten"
+    if "imdb.com" in link:
+        return "imdb"
+    if "metacritic.com" in link:
+        return "metacritic"
+    return None
+
+def read_records(path):
+    """Yield dicts from a CSV file (with header) or a JSONL file, one at a time."""
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+def rotten_kaggle_review(record):
+    """Map a row of the Kaggle rotten_tomatoes_critic_reviews.csv to a crawler-style review."""
+    slug = record["rotten_tomatoes_link"]
+    return {
+        "movie_name": slug.split("/")[-1].replace("_", " ").title(),
+        "link": f"https://www.rottentomatoes.com/{slug}",
+        "author": record.get("critic_name") or "N/A",
+        "review": record.get("review_content"),
+        "review_date": record.get("review_date") or None,
+        "sentiment": {"Fresh": "POSITIVE", "Rotten": "NEGATIVE"}.get(record.get("review_type"), "N/A"),
+        "role": "critic",
+    }
+
+def imdb_kaggle_review(record, movie_link, movie_name):
+    """Map a row of the Kaggle "IMDB Dataset.csv" (review, sentiment) to a crawler-style review."""
+    return {
+        "movie_name": movie_name,
+        "link": movie_link,
+        "review": re.sub(r"<br\s*/?>", "\n", record.get("review") or ""),
+        "score": (record.get("sentiment") or "No Score").capitalize(),
+        "author_name": "No Author",
+        "role": "user",
+    }
+
+def staging_rows(paths, preset=None, source=None, movie_link=None, movie_name=None):
+    """
+    Read crawler output or Kaggle exports and yield normalized staging rows.
+
+    Rows without a movie link or review text, or whose source can't be determined, are dropped.
+
+    Yields:
+        tuple: Values in STAGING_COLUMNS order.
+    """
+    position = 0
+    for path in paths:
+        for record in read_records(path):
+            if preset == "rotten-kaggle":
+                raw = rotten_kaggle_review(record)
+            elif preset == "imdb-kaggle":
+                raw = imdb_kaggle_review(record, movie_link, movie_name)
+            else:
+                raw = dict(record)
+                raw.setdefault("link", movie_link)
+                raw.setdefault("movie_name", movie_name)
+            link = raw.get("link")
+            review_source = source or (source_from_link(link) if link else None)
+            if not link or review_source is None or not raw.get("review"):
+                continue
+            normalized = normalize_review(raw, review_source)
+            if normalized is None:
+                continue
+            position += 1
+            yield (
+                position, link, raw.get("movie_name") or "Unknown Movie", normalized["review"], normalized["score"],
+                normalized["author_name"], normalized["review_date"], review_source, normalized["role"],
+                normalized["fingerprint"], normalized["score_value"],
+                normalized["published_on"].isoformat() if normalized["published_on"] else None,
+            )
+
+def copy_batch(cursor, batch):
+    """Stream one batch into review_staging with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY review_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def insert_batch(cursor, batch):
+    placeholders = ", ".join(["%s"] * len(STAGING_COLUMNS))
+    cursor.executemany(f"INSERT INTO review_staging ({', '.join(STAGING_COLUMNS)}) VALUES ({placeholders})", batch)
+
+def ingest_reviews(connection, rows, batch_size=INGEST_BATCH_SIZE):
+    """
+    Load staging rows and merge them into movies/reviews in one transaction.
+
+    On Postgres rows are streamed with COPY; on the SQLite stand-in they are inserted in
+    executemany batches. Everything after loading is set-based SQL.
+
+    Args:
+        connection: Django database connection (the caller wraps it in a transaction).
+        rows: Iterable of tuples from staging_rows.
+
+    Returns:
+        dict: {"rows", "new", "updated", "skipped", "seconds"}.
+    """
+    load = copy_batch if connection.vendor == "postgresql" else insert_batch
+    started = time.perf_counter()
+    staged = 0
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS review_staging")
+        cursor.execute(STAGING_TABLE_DDL)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                load(cursor, batch)
+                staged += len(batch)
+                batch = []
+        if batch:
+            load(cursor, batch)
+            staged += len(batch)
+
+        cursor.execute("CREATE INDEX review_staging_link_idx ON review_staging (link, fingerprint, ord)")
+        if connection.vendor == "postgresql":
+            cursor.execute("ANALYZE review_staging")  # Autovacuum không phân tích bảng tạm
+        for statement in MERGE_STATEMENTS:
+            cursor.execute(statement)
+
+        cursor.execute("SELECT status, COUNT(*) FROM review_staging GROUP BY status")
+        counts = {"new": 0, "updated": 0, "skipped": 0}
+        counts.update({status: count for status, count in cursor.fetchall()})
+        # Dòng trùng trong file đã bị xóa khỏi staging ở bước đầu tiên
+        counts["skipped"] = staged - counts["new"] - counts["updated"]
+        cursor.execute("DROP TABLE review_staging")
+
+    counts["rows"] = staged
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+def as_date(value):
+    """Dates come back as strings from the SQLite driver and as datetimes from psycopg2."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def backfill_review_values(connection, batch_size=BACKFILL_BATCH_SIZE, missing_only=False):
+    """
+    Recompute reviews.score_value and published_on from the raw score and review_date.
+
+    Walks reviews in review_id batches and writes each batch with a single UPDATE ... FROM
+    (VALUES ...). Relative dates are resolved against the movie's last crawl time.
+
+    Returns:
+        int: Number of reviews processed.
+    """
+    cast = "::double precision" if connection.vendor == "postgresql" else ""
+    date_cast = "::date" if connection.vendor == "postgresql" else ""
+    condition = " AND (r.score_value IS NULL OR r.published_on IS NULL)" if missing_only else ""
+    processed = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                f"""
+                SELECT r.review_id, r.score, r.source, r.role, r.review_date, m.last_crawled_at
+                FROM reviews r
+                JOIN movies m ON m.movie_id = r.movie_id
+                WHERE r.review_id > %s{condition}
+                ORDER BY r.review_id
+                LIMIT %s
+                """,
+                [last_id, batch_size],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            params = []
+            for review_id, score, source, role, review_date, crawled_at in rows:
+                published_on = parse_review_date(review_date, as_date(crawled_at))
+                params.extend([review_id, parse_score(score, source, role), published_on.isoformat() if published_on else None])
+            values = ", ".join([f"(%s, %s{cast}, %s{date_cast})"] * len(rows))
+            cursor.execute(
+                f"""
+                UPDATE reviews SET score_value = v.column2, published_on = v.column3
+                FROM (VALUES {values}) AS v
+                WHERE reviews.review_id = v.column1
+                """,
+                params,
+            )
+            processed += len(rows)
+            last_id = rows[-1][0]
+            print(f"Backfilled score/date of reviews up to id {last_id}")
+    return processed
+
+def expand_paths(paths):
+    """Replace directories by the CSV/JSONL files they contain."""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith((".csv", ".jsonl", ".ndjson"))
+            ))
+        else:
+            expanded.append(path)
+    return expanded
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.ingest import BACKFILL_BATCH_SIZE, backfill_review_values
+
+
+class Command(BaseCommand):
+    help = "Recompute the 0-1 score_value and published_on date of stored reviews from their raw score and review_date."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Reviews updated per statement")
+        parser.add_argument("--missing-only", action="store_true", help="Only fill reviews that have no score_value or published_on yet")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                processed = backfill_review_values(
+                    connection, batch_size=options["batch_size"], missing_only=options["missing_only"]
+                )
+        except Exception as e:
+            raise CommandError(f"Error backfilling review scores and dates: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {processed} reviews"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.export import EXPORT_CHUNK_SIZE, EXPORT_ROW_GROUP_SIZE, EXPORT_TABLES, export_parquet
+from api.storage import get_review_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Export movies, reviews and aspect sentiments into Parquet files partitioned by source, "
+        "reading through a streaming cursor and writing in row groups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Directory that receives <table>/source=<source>/part-*.parquet")
+        parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), help="Tables to export (default: all)")
+        parser.add_argument("--incremental", action="store_true", help="Only export rows newer than the previous export into output_dir")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched from the cursor at a time")
+        parser.add_argument("--row-group-size", type=int, default=EXPORT_ROW_GROUP_SIZE, help="Rows per Parquet row group")
+
+    def handle(self, *args, **options):
+        store = get_review_store()
+        try:
+            results = export_parquet(
+                store,
+                options["output_dir"],
+                tables=options["tables"],
+                incremental=options["incremental"],
+                chunk_size=options["chunk_size"],
+                row_group_size=options["row_group_size"],
+            )
+        except Exception as e:
+            raise CommandError(f"Error exporting Parquet files: {e}")
+        finally:
+            store.close()
+        total = sum(result["rows"] for result in results.values())
+        self.stdout.write(self.style.SUCCESS(f"Exported {total} rows into {options['output_dir']}"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.ingest import INGEST_BATCH_SIZE, PRESETS, expand_paths, ingest_reviews, staging_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load reviews from crawler output or Kaggle CSV/JSONL exports through a staging table "
+        "(COPY on Postgres) and merge them into movies/reviews without duplicates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="CSV or JSONL files, or directories containing them")
+        parser.add_argument("--preset", choices=PRESETS, help="Column layout of a Kaggle dataset")
+        parser.add_argument("--source", choices=["imdb", "rotten", "metacritic"], help="Source of every row (default: guessed from the link)")
+        parser.add_argument("--movie-link", help="Movie link for files without one, e.g. the IMDB 50k dataset")
+        parser.add_argument("--movie-name", help="Movie name to use together with --movie-link")
+        parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Rows per COPY/insert batch")
+
+    def handle(self, *args, **options):
+        if options["preset"] == "imdb-kaggle" and not (options["movie_link"] and options["movie_name"]):
+            raise CommandError("--preset imdb-kaggle needs --movie-link and --movie-name: the dataset has no movie columns")
+
+        rows = staging_rows(
+            expand_paths(options["paths"]),
+            preset=options["preset"],
+            source=options["source"] or ("imdb" if options["preset"] == "imdb-kaggle" else None),
+            movie_link=options["movie_link"],
+            movie_name=options["movie_name"],
+        )
+        try:
+            with transaction.atomic():
+                counts = ingest_reviews(connection, rows, batch_size=options["batch_size"])
+        except Exception as e:
+            raise CommandError(f"Error ingesting reviews: {e}")
+
+        rate = counts["rows"] / counts["seconds"] if counts["seconds"] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {counts['rows']} rows in {counts['seconds']:.1f}s ({rate:.0f} rows/s): "
+            f"{counts['new']} new, {counts['updated']} updated, {counts['skipped']} skipped"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.storage import get_review_store
+
+
+class Command(BaseCommand):
+    help = "Recompute movie_aspect_summary from review_aspect_scores in one set-based SQL pass."
+
+    def handle(self, *args, **options):
+        store = get_review_store()
+        try:
+            row_count = store.rebuild_aspect_summary()
+            store.commit()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt movie_aspect_summary: {row_count} rows"))
+        except Exception as e:
+            store.rollback()
+            raise CommandError(f"Error rebuilding aspect summary: {e}")
+        finally:
+            store.close()
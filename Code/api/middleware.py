@@ -0,0 +1,118 @@
+import gzip
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn; không có thì chỉ nén gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+STREAM_GZIP_LEVEL = 1  # Stream được nén lại mỗi lần, không cache được nên ưu tiên tốc độ
+BROTLI_QUALITY = 5  # Mức mặc định 11 quá chậm cho payload sinh động
+COMPRESSED_CACHE_SIZE = 64
+
+# Định dạng đã nén sẵn, nén thêm chỉ tốn CPU
+SKIP_CONTENT_TYPES = ("application/vnd.apache.parquet", "application/gzip", "application/zip", "image/")
+
+def accepted_encodings(accept_encoding):
+    """Return the content codings of an Accept-Encoding header that are not refused with q=0."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        match = re.match(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?", part)
+        if match and (match.group(2) is None or float(match.group(2)) > 0):
+            accepted.add(match.group(1).lower())
+    return accepted
+
+def choose_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def compress_stream(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            # flush để mỗi dòng NDJSON đến client ngay, không đợi hết stream
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class ResponseCompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip, following Accept-Encoding.
+
+    Bodies under COMPRESS_MIN_BYTES and already compressed formats are sent as is.
+    Compressed bodies of responses with a strong ETag (the cached /api/reviews payloads)
+    are kept in a small LRU, so a cache hit is not compressed again.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._compressed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code != 200 or response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith(SKIP_CONTENT_TYPES):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response["Content-Length"]
+        else:
+            if len(response.content) < COMPRESS_MIN_BYTES:
+                return response
+            compressed = self._compress_body(response, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # Body đã khác bản gốc nên ETag chỉ còn là weak ETag (giống GZipMiddleware của Django)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def _compress_body(self, response, encoding):
+        etag = response.get("ETag")
+        if not etag or etag.startswith("W/"):
+            return compress(response.content, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._compressed.get(key)
+            if compressed is not None:
+                self._compressed.move_to_end(key)
+                return compressed
+        compressed = compress(response.content, encoding)
+        with self._lock:
+            self._compressed[key] = compressed
+            while len(self._compressed) > COMPRESSED_CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        return compressed
@@ -0,0 +1,74 @@
+# Generated by Django 5.2 on 2026-10-19 09:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Movie',
+            fields=[
+                ('movie_id', models.AutoField(primary_key=True, serialize=False)),
+                ('movie_name', models.TextField()),
+                ('link', models.TextField()),
+                ('data_version', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('last_crawled_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'movies',
+                'unique_together': {('movie_name', 'link')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieAspectSummary',
+            fields=[
+                ('pk', models.CompositePrimaryKey('movie', 'aspect', 'sentiment', 'source', 'role', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('aspect', models.CharField(max_length=32)),
+                ('sentiment', models.CharField(max_length=16)),
+                ('source', models.CharField(max_length=32)),
+                ('role', models.CharField(max_length=16)),
+                ('review_count', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(db_column='movie_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.movie')),
+            ],
+            options={
+                'db_table': 'movie_aspect_summary',
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('review_id', models.AutoField(primary_key=True, serialize=False)),
+                ('review', models.TextField()),
+                ('score', models.TextField(null=True)),
+                ('author_name', models.TextField(null=True)),
+                ('review_date', models.TextField(null=True)),
+                ('source', models.CharField(max_length=32)),
+                ('role', models.CharField(max_length=16, null=True)),
+                ('movie', models.ForeignKey(db_column='movie_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='api.movie')),
+            ],
+            options={
+                'db_table': 'reviews',
+            },
+        ),
+        migrations.CreateModel(
+            name='AspectSentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aspect', models.CharField(max_length=32)),
+                ('sentiment', models.CharField(max_length=16)),
+                ('review', models.ForeignKey(db_column='review_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='aspect_sentiments', to='api.review')),
+            ],
+            options={
+                'db_table': 'aspect_sentiment',
+            },
+        ),
+    ]
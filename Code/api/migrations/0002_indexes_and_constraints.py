@@ -0,0 +1,140 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def merge_duplicate_movie_links(apps, schema_editor):
+    """Fold movies sharing a link into the oldest row so movies.link can be unique."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+        SELECT m.movie_id, MIN(k.movie_id)
+        FROM movies m
+        JOIN movies k ON k.link = m.link AND k.movie_id < m.movie_id
+        GROUP BY m.movie_id
+        """)
+        duplicates = cursor.fetchall()
+        for duplicate_id, keep_id in duplicates:
+            cursor.execute("UPDATE reviews SET movie_id = %s WHERE movie_id = %s", [keep_id, duplicate_id])
+            cursor.execute("DELETE FROM movie_aspect_summary WHERE movie_id = %s", [duplicate_id])
+            cursor.execute("DELETE FROM movies WHERE movie_id = %s", [duplicate_id])
+        if duplicates:
+            cursor.execute("""
+            UPDATE movies SET
+                review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.movie_id),
+                data_version = data_version + 1
+            """)
+            rebuild_summary(cursor)
+
+
+def delete_duplicate_aspect_rows(apps, schema_editor):
+    """Keep the first row per (review_id, aspect) so the pair can be unique."""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, "aspect_sentiment")}
+        # Bảng tạo trước migrations có thể không có cột id: dùng vị trí vật lý của dòng
+        if "id" in columns:
+            row_id = "id"
+        else:
+            row_id = "ctid" if connection.vendor == "postgresql" else "rowid"
+        cursor.execute(f"""
+        DELETE FROM aspect_sentiment
+        WHERE EXISTS (
+            SELECT 1 FROM aspect_sentiment b
+            WHERE b.review_id = aspect_sentiment.review_id
+              AND b.aspect = aspect_sentiment.aspect
+              AND b.{row_id} < aspect_sentiment.{row_id}
+        )
+        """)
+        if cursor.rowcount > 0:
+            rebuild_summary(cursor)
+
+
+def rebuild_summary(cursor):
+    cursor.execute("DELETE FROM movie_aspect_summary")
+    cursor.execute("""
+    INSERT INTO movie_aspect_summary (movie_id, aspect, sentiment, source, role, review_count)
+    SELECT r.movie_id, a.aspect, a.sentiment, r.source, COALESCE(r.role, 'user'), COUNT(*)
+    FROM aspect_sentiment a
+    JOIN reviews r ON r.review_id = a.review_id
+    GROUP BY r.movie_id, a.aspect, a.sentiment, r.source, COALESCE(r.role, 'user')
+    """)
+
+
+CATALOG_INDEXES = [
+    ("movies_name_prefix_idx", "CREATE INDEX IF NOT EXISTS movies_name_prefix_idx ON movies (lower(movie_name) text_pattern_ops, movie_id)"),
+    ("movies_name_sort_idx", "CREATE INDEX IF NOT EXISTS movies_name_sort_idx ON movies (lower(movie_name), movie_id)"),
+    ("movies_name_trgm_idx", "CREATE INDEX IF NOT EXISTS movies_name_trgm_idx ON movies USING gin (lower(movie_name) gin_trgm_ops)"),
+    ("movies_review_count_idx", "CREATE INDEX IF NOT EXISTS movies_review_count_idx ON movies (review_count DESC, movie_id DESC)"),
+    ("movies_last_crawled_idx", "CREATE INDEX IF NOT EXISTS movies_last_crawled_idx ON movies (last_crawled_at DESC, movie_id DESC)"),
+]
+
+
+def create_catalog_indexes(apps, schema_editor):
+    # Các index này có thể đã được tạo thủ công theo README, và chỉ có trên Postgres
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for _, sql in CATALOG_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_catalog_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in CATALOG_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_movie_links, migrations.RunPython.noop),
+        migrations.RunPython(delete_duplicate_aspect_rows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='movie',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='movie',
+            constraint=models.UniqueConstraint(fields=('link',), name='movies_link_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='aspectsentiment',
+            constraint=models.UniqueConstraint(fields=('review', 'aspect'), name='aspect_sentiment_review_aspect_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'review_id'], name='reviews_movie_review_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_catalog_indexes, drop_catalog_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='movie',
+                    index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('movie_name'), name='text_pattern_ops'), models.F('movie_id'), name='movies_name_prefix_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='movie',
+                    index=models.Index(django.db.models.functions.text.Lower('movie_name'), models.F('movie_id'), name='movies_name_sort_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='movie',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('movie_name'), name='gin_trgm_ops'), name='movies_name_trgm_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='movie',
+                    index=models.Index(models.OrderBy(models.F('review_count'), descending=True), models.OrderBy(models.F('movie_id'), descending=True), name='movies_review_count_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='movie',
+                    index=models.Index(models.OrderBy(models.F('last_crawled_at'), descending=True), models.OrderBy(models.F('movie_id'), descending=True), name='movies_last_crawled_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,112 @@
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+RELATIVE_DATE_PATTERN = re.compile(r"\b(ago|today|yesterday)\b", re.IGNORECASE)
+
+
+# Bản sao cố định của api.normalize lúc viết migration này: migration phải cho cùng kết quả
+# dù code hiện tại có đổi cách tính fingerprint về sau.
+def normalize_text(value):
+    if value is None:
+        return ""
+    value = unicodedata.normalize("NFKC", str(value)).lower()
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def review_fingerprint(source, author_name, review_date, review_text):
+    date = normalize_text(review_date)
+    if RELATIVE_DATE_PATTERN.search(date):
+        date = ""
+    parts = [normalize_text(source), normalize_text(author_name), date, normalize_text(review_text)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def fingerprint_and_deduplicate(apps, schema_editor):
+    """
+    Fingerprint existing reviews, then fold duplicates into the oldest review of each
+    (movie_id, fingerprint) group, moving over aspect rows the survivor doesn't have yet.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        last_id = 0
+        while True:
+            cursor.execute(
+                """
+                SELECT review_id, source, author_name, review_date, review
+                FROM reviews
+                WHERE review_id > %s
+                ORDER BY review_id
+                LIMIT %s
+                """,
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                "UPDATE reviews SET fingerprint = %s WHERE review_id = %s",
+                [(review_fingerprint(source, author, date, text), review_id) for review_id, source, author, date, text in rows],
+            )
+            last_id = rows[-1][0]
+
+        cursor.execute("""
+        SELECT r.review_id, MIN(k.review_id), r.movie_id
+        FROM reviews r
+        JOIN reviews k ON k.movie_id = r.movie_id AND k.fingerprint = r.fingerprint AND k.review_id < r.review_id
+        GROUP BY r.review_id, r.movie_id
+        """)
+        duplicates = cursor.fetchall()
+        for duplicate_id, keep_id, _ in duplicates:
+            cursor.execute(
+                """
+                UPDATE aspect_sentiment SET review_id = %s
+                WHERE review_id = %s
+                  AND aspect NOT IN (SELECT aspect FROM aspect_sentiment WHERE review_id = %s)
+                """,
+                [keep_id, duplicate_id, keep_id],
+            )
+            cursor.execute("DELETE FROM aspect_sentiment WHERE review_id = %s", [duplicate_id])
+            cursor.execute("DELETE FROM reviews WHERE review_id = %s", [duplicate_id])
+
+        if duplicates:
+            for movie_id in {movie_id for _, _, movie_id in duplicates}:
+                cursor.execute(
+                    """
+                    UPDATE movies SET
+                        review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.movie_id),
+                        data_version = data_version + 1
+                    WHERE movie_id = %s
+                    """,
+                    [movie_id],
+                )
+            cursor.execute("DELETE FROM movie_aspect_summary")
+            cursor.execute("""
+            INSERT INTO movie_aspect_summary (movie_id, aspect, sentiment, source, role, review_count)
+            SELECT r.movie_id, a.aspect, a.sentiment, r.source, COALESCE(r.role, 'user'), COUNT(*)
+            FROM aspect_sentiment a
+            JOIN reviews r ON r.review_id = a.review_id
+            GROUP BY r.movie_id, a.aspect, a.sentiment, r.source, COALESCE(r.role, 'user')
+            """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_indexes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='fingerprint',
+            field=models.CharField(max_length=40, null=True),
+        ),
+        migrations.RunPython(fingerprint_and_deduplicate, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('movie', 'fingerprint'), name='reviews_movie_fingerprint_uniq'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 00:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_review_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=32)),
+                ('role', models.CharField(max_length=16)),
+                ('newest_fingerprint', models.CharField(max_length=40, null=True)),
+                ('newest_review_date', models.TextField(null=True)),
+                ('last_crawled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('movie', models.ForeignKey(db_column='movie_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='crawl_watermarks', to='api.movie')),
+            ],
+            options={
+                'db_table': 'crawl_watermarks',
+                'constraints': [models.UniqueConstraint(fields=('movie', 'source', 'role'), name='crawl_watermarks_movie_source_role_uniq')],
+            },
+        ),
+    ]
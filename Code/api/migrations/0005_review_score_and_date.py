@@ -0,0 +1,151 @@
+# Generated by Django 5.2 on 2026-10-19 00:55
+
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+# Bản sao cố định của api.normalize / api.ingest lúc viết migration này: migration phải cho
+# cùng kết quả dù cách chuẩn hóa điểm và ngày trong code hiện tại có đổi về sau.
+RELATIVE_AGE_PATTERN = re.compile(r"^(\d+|an?)\s*(minute|min|m|hour|hr|h|day|d|week|wk|w|month|mo|year|yr|y)s?\b(\s+ago)?$")
+RELATIVE_AGE_DAYS = {
+    "minute": 0, "min": 0, "m": 0, "hour": 0, "hr": 0, "h": 0,
+    "day": 1, "d": 1, "week": 7, "wk": 7, "w": 7,
+    "month": 30, "mo": 30, "year": 365, "yr": 365, "y": 365,
+}
+DATE_FORMATS = ["%b %d, %Y", "%B %d, %Y", "%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y", "%b. %d, %Y"]
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.5, "negative": 0.0, "fresh": 1.0, "rotten": 0.0}
+SCORE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?$")
+
+
+def normalize_text(value):
+    if value is None:
+        return ""
+    value = unicodedata.normalize("NFKC", str(value)).lower()
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def parse_score(score, source, role=None):
+    text = normalize_text(score)
+    if text in SENTIMENT_SCORES:
+        return SENTIMENT_SCORES[text]
+    match = SCORE_PATTERN.match(text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2):
+        scale = float(match.group(2))
+    elif source == "metacritic" and (role == "critic" or value > 10):
+        scale = 100.0
+    else:
+        scale = 10.0
+    if scale <= 0 or value > scale:
+        return None
+    return round(value / scale, 4)
+
+
+def parse_review_date(review_date, reference=None):
+    text = normalize_text(review_date)
+    if not text:
+        return None
+    reference = reference or date.today()
+    if text == "today":
+        return reference
+    if text == "yesterday":
+        return reference - timedelta(days=1)
+    match = RELATIVE_AGE_PATTERN.match(text)
+    if match:
+        amount = 1 if match.group(1) in ("a", "an") else int(match.group(1))
+        return reference - timedelta(days=amount * RELATIVE_AGE_DAYS[match.group(2)])
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text)
+    cleaned = re.sub(r"\bsept\b", "sep", cleaned).title()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, date_format).date()
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text.upper()).date()
+    except ValueError:
+        return None
+
+
+def as_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def backfill(apps, schema_editor):
+    """Fill reviews.score_value and published_on in review_id batches, one UPDATE ... FROM (VALUES) per batch."""
+    connection = schema_editor.connection
+    cast = "::double precision" if connection.vendor == "postgresql" else ""
+    date_cast = "::date" if connection.vendor == "postgresql" else ""
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                """
+                SELECT r.review_id, r.score, r.source, r.role, r.review_date, m.last_crawled_at
+                FROM reviews r
+                JOIN movies m ON m.movie_id = r.movie_id
+                WHERE r.review_id > %s
+                ORDER BY r.review_id
+                LIMIT %s
+                """,
+                [last_id, BATCH_SIZE],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            params = []
+            for review_id, score, source, role, review_date, crawled_at in rows:
+                published_on = parse_review_date(review_date, as_date(crawled_at))
+                params.extend([review_id, parse_score(score, source, role), published_on.isoformat() if published_on else None])
+            values = ", ".join([f"(%s, %s{cast}, %s{date_cast})"] * len(rows))
+            cursor.execute(
+                f"""
+                UPDATE reviews SET score_value = v.column2, published_on = v.column3
+                FROM (VALUES {values}) AS v
+                WHERE reviews.review_id = v.column1
+                """,
+                params,
+            )
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_crawl_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='published_on',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='score_value',
+            field=models.FloatField(null=True),
+        ),
+        # Điền dữ liệu trước khi tạo index để không phải cập nhật index từng dòng
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'score_value'], name='reviews_movie_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'published_on'], name='reviews_movie_published_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 00:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ASPECTS = ["direction", "acting", "plot", "overall", "visuals", "themes", "pacing"]
+
+
+def copy_aspect_sentiments(apps, schema_editor):
+    """Pivot the existing aspect_sentiment rows into one review_aspect_scores row per review."""
+    code = "CASE sentiment WHEN 'Negative' THEN 0 WHEN 'Neutral' THEN 1 WHEN 'Positive' THEN 2 END"
+    columns = ", ".join(f"MAX(CASE WHEN lower(aspect) = '{aspect}' THEN {code} END)" for aspect in ASPECTS)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+        INSERT INTO review_aspect_scores (review_id, {", ".join(ASPECTS)})
+        SELECT review_id, {columns}
+        FROM aspect_sentiment
+        GROUP BY review_id
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_review_score_and_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewAspectScore',
+            fields=[
+                ('review', models.OneToOneField(db_column='review_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aspect_scores', serialize=False, to='api.review')),
+                ('direction', models.SmallIntegerField(null=True)),
+                ('acting', models.SmallIntegerField(null=True)),
+                ('plot', models.SmallIntegerField(null=True)),
+                ('overall', models.SmallIntegerField(null=True)),
+                ('visuals', models.SmallIntegerField(null=True)),
+                ('themes', models.SmallIntegerField(null=True)),
+                ('pacing', models.SmallIntegerField(null=True)),
+                ('confidence', models.FloatField(null=True)),
+                ('model_version', models.CharField(max_length=64, null=True)),
+            ],
+            options={
+                'db_table': 'review_aspect_scores',
+            },
+        ),
+        migrations.RunPython(copy_aspect_sentiments, migrations.RunPython.noop),
+    ]
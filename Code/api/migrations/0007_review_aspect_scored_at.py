@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_review_aspect_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewaspectscore',
+            name='scored_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reviewaspectscore',
+            index=models.Index(fields=['scored_at'], name='review_aspect_scored_at_idx'),
+        ),
+    ]
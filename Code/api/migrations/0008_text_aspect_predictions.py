@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 01:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_review_aspect_scored_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextAspectPrediction',
+            fields=[
+                ('pk', models.CompositePrimaryKey('text_hash', 'model_version', 'aspect', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('text_hash', models.CharField(max_length=40)),
+                ('model_version', models.CharField(max_length=64)),
+                ('aspect', models.CharField(max_length=32)),
+                ('sentiment', models.SmallIntegerField()),
+                ('confidence', models.FloatField()),
+                ('scored_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'text_aspect_predictions',
+            },
+        ),
+    ]
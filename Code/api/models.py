@@ -1,3 +1,139 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 
-# Create your models here.
+# Các bảng này được truy vấn bằng SQL thuần (xem views.py, crawl_reviews.py);
+# model chỉ dùng để khai báo schema, index và constraint qua migrations.
+
+
+class Movie(models.Model):
+    movie_id = models.AutoField(primary_key=True)
+    movie_name = models.TextField()
+    link = models.TextField()
+    data_version = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    last_crawled_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "movies"
+        constraints = [
+            models.UniqueConstraint(fields=["link"], name="movies_link_uniq"),
+        ]
+        indexes = [
+            models.Index(OpClass(Lower("movie_name"), name="text_pattern_ops"), F("movie_id"), name="movies_name_prefix_idx"),
+            models.Index(Lower("movie_name"), F("movie_id"), name="movies_name_sort_idx"),
+            GinIndex(OpClass(Lower("movie_name"), name="gin_trgm_ops"), name="movies_name_trgm_idx"),
+            models.Index(F("review_count").desc(), F("movie_id").desc(), name="movies_review_count_idx"),
+            models.Index(F("last_crawled_at").desc(), F("movie_id").desc(), name="movies_last_crawled_idx"),
+        ]
+
+    def __str__(self):
+        return self.movie_name
+
+
+class Review(models.Model):
+    review_id = models.AutoField(primary_key=True)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, db_column="movie_id", db_index=False, related_name="reviews")
+    review = models.TextField()
+    score = models.TextField(null=True)
+    # score quy về thang 0-1 và ngày đăng thật, tính từ score/review_date thô (xem normalize.py)
+    score_value = models.FloatField(null=True)
+    published_on = models.DateField(null=True)
+    author_name = models.TextField(null=True)
+    review_date = models.TextField(null=True)
+    source = models.CharField(max_length=32)
+    role = models.CharField(max_length=16, null=True)
+    # sha1 của source, tác giả, ngày và nội dung đã chuẩn hóa (xem normalize.review_fingerprint)
+    fingerprint = models.CharField(max_length=40, null=True)
+
+    class Meta:
+        db_table = "reviews"
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "fingerprint"], name="reviews_movie_fingerprint_uniq"),
+        ]
+        indexes = [
+            # Phục vụ cả lọc theo movie_id lẫn phân trang keyset theo review_id
+            models.Index(fields=["movie", "review_id"], name="reviews_movie_review_idx"),
+            models.Index(fields=["movie", "score_value"], name="reviews_movie_score_idx"),
+            models.Index(fields=["movie", "published_on"], name="reviews_movie_published_idx"),
+        ]
+
+
+class AspectSentiment(models.Model):
+    # Bố cục cũ, mỗi (review, khía cạnh) một dòng; không còn được ghi, thay bằng ReviewAspectScore
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, db_column="review_id", db_index=False, related_name="aspect_sentiments")
+    aspect = models.CharField(max_length=32)
+    sentiment = models.CharField(max_length=16)
+
+    class Meta:
+        db_table = "aspect_sentiment"
+        constraints = [
+            models.UniqueConstraint(fields=["review", "aspect"], name="aspect_sentiment_review_aspect_uniq"),
+        ]
+
+
+class ReviewAspectScore(models.Model):
+    # Mỗi review một dòng, mỗi khía cạnh một cột smallint: 0 Negative, 1 Neutral, 2 Positive, NULL chưa chấm
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True, db_column="review_id", related_name="aspect_scores")
+    direction = models.SmallIntegerField(null=True)
+    acting = models.SmallIntegerField(null=True)
+    plot = models.SmallIntegerField(null=True)
+    overall = models.SmallIntegerField(null=True)
+    visuals = models.SmallIntegerField(null=True)
+    themes = models.SmallIntegerField(null=True)
+    pacing = models.SmallIntegerField(null=True)
+    confidence = models.FloatField(null=True)
+    model_version = models.CharField(max_length=64, null=True)
+    # Thời điểm chấm, để export_parquet chỉ xuất các dòng mới; NULL với các dòng chép từ aspect_sentiment
+    scored_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = "review_aspect_scores"
+        indexes = [
+            models.Index(fields=["scored_at"], name="review_aspect_scored_at_idx"),
+        ]
+
+
+class TextAspectPrediction(models.Model):
+    # Kết quả ABSA của /api/analyze theo hash của văn bản, để văn bản giống hệt không phải chạy lại mô hình
+    pk = models.CompositePrimaryKey("text_hash", "model_version", "aspect")
+    text_hash = models.CharField(max_length=40)
+    model_version = models.CharField(max_length=64)
+    aspect = models.CharField(max_length=32)
+    sentiment = models.SmallIntegerField()
+    confidence = models.FloatField()
+    scored_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "text_aspect_predictions"
+
+
+class MovieAspectSummary(models.Model):
+    pk = models.CompositePrimaryKey("movie", "aspect", "sentiment", "source", "role")
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, db_column="movie_id", db_index=False)
+    aspect = models.CharField(max_length=32)
+    sentiment = models.CharField(max_length=16)
+    source = models.CharField(max_length=32)
+    role = models.CharField(max_length=16)
+    review_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "movie_aspect_summary"
+
+
+class CrawlWatermark(models.Model):
+    # Review mới nhất đã thấy của từng (phim, nguồn, role), để lần crawl sau dừng sớm
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, db_column="movie_id", db_index=False, related_name="crawl_watermarks")
+    source = models.CharField(max_length=32)
+    role = models.CharField(max_length=16)
+    newest_fingerprint = models.CharField(max_length=40, null=True)
+    newest_review_date = models.TextField(null=True)
+    last_crawled_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "crawl_watermarks"
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "source", "role"], name="crawl_watermarks_movie_source_role_uniq"),
+        ]
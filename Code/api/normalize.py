@@ -0,0 +1,141 @@
+import hashlib
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+
+RELATIVE_DATE_PATTERN = re.compile(r"\b(ago|today|yesterday)\b", re.IGNORECASE)
+
+# "2 days ago", "an hour ago", "3w": đơn vị -> số ngày
+RELATIVE_AGE_PATTERN = re.compile(r"^(\d+|an?)\s*(minute|min|m|hour|hr|h|day|d|week|wk|w|month|mo|year|yr|y)s?\b(\s+ago)?$")
+RELATIVE_AGE_DAYS = {
+    "minute": 0, "min": 0, "m": 0, "hour": 0, "hr": 0, "h": 0,
+    "day": 1, "d": 1, "week": 7, "wk": 7, "w": 7,
+    "month": 30, "mo": 30, "year": 365, "yr": 365, "y": 365,
+}
+DATE_FORMATS = ["%b %d, %Y", "%B %d, %Y", "%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y", "%b. %d, %Y"]
+
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.5, "negative": 0.0, "fresh": 1.0, "rotten": 0.0}
+SCORE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?$")
+
+def normalize_text(value):
+    """Lowercase, NFKC-normalize and collapse whitespace so cosmetic differences don't matter."""
+    if value is None:
+        return ""
+    value = unicodedata.normalize("NFKC", str(value)).lower()
+    return re.sub(r"\s+", " ", value).strip()
+
+def review_fingerprint(source, author_name, review_date, review_text):
+    """
+    Stable identity of a review across crawls: sha1 over source, author, date and text.
+
+    Relative dates ("2 days ago") change from one crawl to the next, so they are left
+    out of the fingerprint instead of producing a new identity every day.
+    """
+    date = normalize_text(review_date)
+    if RELATIVE_DATE_PATTERN.search(date):
+        date = ""
+    parts = [normalize_text(source), normalize_text(author_name), date, normalize_text(review_text)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def parse_score(score, source, role=None):
+    """
+    Map a raw score onto 0-1, or None when there is no usable score.
+
+    IMDb ratings and Metacritic user scores are out of 10, Metacritic critic scores out of
+    100, Rotten Tomatoes scores are a sentiment; explicit fractions such as "3.5/5" win.
+    """
+    text = normalize_text(score)
+    if text in SENTIMENT_SCORES:
+        return SENTIMENT_SCORES[text]
+    match = SCORE_PATTERN.match(text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    if match.group(2):
+        scale = float(match.group(2))
+    elif source == "metacritic" and (role == "critic" or value > 10):
+        scale = 100.0
+    else:
+        scale = 10.0
+    if scale <= 0 or value > scale:
+        return None
+    return round(value / scale, 4)
+
+def parse_review_date(review_date, reference=None):
+    """
+    Turn an absolute ("Apr 9, 2025", "2025-04-09") or relative ("2 days ago") review date into a date.
+
+    Relative dates are resolved against reference (default: today), i.e. the crawl date.
+    """
+    text = normalize_text(review_date)
+    if not text:
+        return None
+    reference = reference or date.today()
+    if text == "today":
+        return reference
+    if text == "yesterday":
+        return reference - timedelta(days=1)
+    match = RELATIVE_AGE_PATTERN.match(text)
+    if match:
+        amount = 1 if match.group(1) in ("a", "an") else int(match.group(1))
+        return reference - timedelta(days=amount * RELATIVE_AGE_DAYS[match.group(2)])
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text)
+    cleaned = re.sub(r"\bsept\b", "sep", cleaned).title()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, date_format).date()
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text.upper()).date()
+    except ValueError:
+        return None
+
+def normalize_review(review, source: str):
+    if not isinstance(review, dict):
+        print(f"Skipping invalid review item: {review} (type: {type(review)})")
+        return None
+    role = review.get("role", "user")  # Lấy role từ review, mặc định là "user"
+    normalized = None
+    if source == "imdb":
+        normalized = {
+            "review": review.get("review", "No Review"),
+            "score": review.get("score", "No Score"),
+            "author_name": review.get("author_name", "No Author"),
+            "review_date": review.get("review_date", None),
+            "link": review.get("link", None),
+            "role": role,
+        }
+    elif source == "rotten":
+        sentiment = review.get("sentiment", "N/A")
+        score = {
+            "POSITIVE": "Positive",
+            "NEGATIVE": "Negative",
+            "NEUTRAL": "Neutral",
+            "N/A": "No Score",
+        }.get(sentiment, "No Score")
+        normalized = {
+            "review": review.get("review", "No Review"),
+            "score": score,
+            "author_name": review.get("author", "N/A"),
+            "review_date": review.get("review_date", None),
+            "link": review.get("link", None),
+            "role": role,
+        }
+    elif source == "metacritic":
+        normalized = {
+            "review": review.get("review", "No Review"),
+            "score": review.get("score", "No Score"),
+            "author_name": review.get("author_name", "No Author"),
+            "review_date": review.get("review_date", None),
+            "link": review.get("link", None),
+            "role": role,
+        }
+    if normalized is None:
+        return None
+    normalized["fingerprint"] = review_fingerprint(
+        source, normalized["author_name"], normalized["review_date"], normalized["review"]
+    )
+    normalized["score_value"] = parse_score(normalized["score"], source, role)
+    normalized["published_on"] = parse_review_date(normalized["review_date"])
+    return normalized
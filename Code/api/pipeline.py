@@ -0,0 +1,335 @@
+import os
+import queue
+import threading
+import time
+
+from movie_crawler.seen_set import REVIEW, review_key
+from .aspects import score_review_aspects
+from .normalize import normalize_review
+from .storage import get_review_store
+
+# Số review mỗi lần ghi (một commit), số review mỗi lần chấm ABSA và sức chứa mỗi hàng đợi giữa hai stage
+WRITE_BATCH_SIZE = int(os.getenv("PIPELINE_WRITE_BATCH", "200"))
+SCORE_BATCH_SIZE = int(os.getenv("PIPELINE_SCORE_BATCH", "64"))
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "500"))
+REPORT_SECONDS = 15.0
+STAGES = ("crawl", "normalize", "write", "score")
+
+# Báo cho stage sau biết stage trước đã xong
+END = object()
+
+
+class PipelineAborted(Exception):
+    """Stops a stage because another stage of the pipeline failed."""
+
+
+class ReviewPipeline:
+    """
+    Crawl, normalize, save and score the reviews of one movie on one source as a stream.
+
+    Each stage runs on its own thread and hands its output to the next one through a bounded
+    queue, so a crawler that loads reviews faster than they are written waits instead of piling
+    them up: at most queue_size items sit between two stages and write_batch_size in the writer,
+    whatever the size of the movie. The writer commits every write_batch_size reviews, so a crash
+    only loses the batch being written. The watermark of a listing is only moved once every
+    review of it is saved; a listing cut short keeps its old watermark and the next refresh
+    crawls it again down to that. With a processor, the saved reviews go on to a scoring stage
+    that runs the ABSA model on score_batch_size reviews at a time and stores their aspect
+    sentiments, so they are ready before anyone asks the API for them. With a SeenSet, every
+    committed batch is added to it with its scores, so the rest of the crawl already skips
+    those reviews without waiting for the next sync.
+
+    If the crawl fails, the reviews crawled so far are still saved; if a later stage fails, the
+    others stop. Either way run() then raises the error.
+    """
+
+    def __init__(self, processor=None, model_version=None, store_factory=get_review_store,
+                 write_batch_size=WRITE_BATCH_SIZE, score_batch_size=SCORE_BATCH_SIZE, queue_size=QUEUE_SIZE,
+                 report_seconds=REPORT_SECONDS, seen=None):
+        self.processor = processor
+        self.seen = seen
+        self.model_version = model_version
+        self.store_factory = store_factory
+        self.write_batch_size = write_batch_size
+        self.score_batch_size = score_batch_size
+        self.queue_size = queue_size
+        self.report_seconds = report_seconds
+
+    def run(self, movie_link, source, listings, movie_name=None, on_progress=None):
+        """
+        Stream every listing of a movie through the pipeline.
+
+        Args:
+            listings (dict): {role: iterable of raw reviews, newest first}, e.g. the generators
+                of iter_movie_reviews; the listings are crawled one after the other.
+            on_progress: Called as on_progress(role, reviews, done) after each committed batch
+                (done False) and once a listing is saved to the end (reviews 0, done True).
+
+        Returns:
+            dict: {"new", "updated", "skipped"} counts, plus "movie_id" (None if nothing was saved
+            for a movie not in the database yet).
+        """
+        self.movie_link = movie_link
+        self.source = source
+        self.movie_name = movie_name
+        self.movie_id = None
+        self.on_progress = on_progress
+        self.counts = {"new": 0, "updated": 0, "skipped": 0}
+        self._abort = threading.Event()
+        self._errors = []
+        self._queues = {stage: queue.Queue(maxsize=self.queue_size) for stage in STAGES[1:]}
+        self._max_depth = {stage: 0 for stage in self._queues}
+        self._stats = {stage: {"items": 0, "seconds": 0.0, "waiting": 0.0, "running": False} for stage in STAGES}
+
+        work = {
+            "crawl": lambda: self._crawl(listings),
+            "normalize": self._normalize,
+            "write": self._write,
+            "score": self._score,
+        }
+        threads = [
+            threading.Thread(target=self._run_stage, args=(stage, work[stage]), name=f"pipeline-{stage}", daemon=True)
+            for stage in STAGES
+        ]
+        self._started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        next_report = self._started + self.report_seconds
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=max(0.0, next_report - time.monotonic()))
+                if time.monotonic() >= next_report:
+                    print(self.report())
+                    next_report = time.monotonic() + self.report_seconds
+        print(self.report())
+
+        if self._errors:
+            raise self._errors[0]
+        return dict(self.counts, movie_id=self.movie_id)
+
+    # Hàng đợi
+
+    def _put(self, stage, item):
+        """Put item on the queue of stage, waiting while it is full; the wait is charged to the producer."""
+        q = self._queues[stage]
+        started = time.monotonic()
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.2)
+                break
+            except queue.Full:
+                continue
+        self._max_depth[stage] = max(self._max_depth[stage], q.qsize())
+        return time.monotonic() - started
+
+    def _items(self, stage):
+        """Yield the items queued for stage until the previous stage has finished."""
+        q = self._queues[stage]
+        stats = self._stats[stage]
+        while True:
+            started = time.monotonic()
+            while True:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+                try:
+                    item = q.get(timeout=0.2)
+                    break
+                except queue.Empty:
+                    continue
+            stats["waiting"] += time.monotonic() - started
+            if item is END:
+                return
+            yield item
+
+    def _send(self, from_stage, to_stage, item):
+        self._stats[from_stage]["waiting"] += self._put(to_stage, item)
+
+    def _run_stage(self, stage, work):
+        stats = self._stats[stage]
+        stats["running"] = True
+        started = time.monotonic()
+        try:
+            work()
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            print(f"Pipeline stage {stage} failed for {self.movie_link}: {e}")
+            self._errors.append(e)
+            # Review đã crawl vẫn được lưu hết; lỗi ở các stage sau thì dừng cả pipeline
+            if stage != "crawl":
+                self._abort.set()
+        finally:
+            stats["seconds"] = time.monotonic() - started
+            stats["running"] = False
+
+    # Các stage
+
+    def _crawl(self, listings):
+        stats = self._stats["crawl"]
+        try:
+            for role, reviews in listings.items():
+                reviews = iter(reviews)
+                try:
+                    for review in reviews:
+                        stats["items"] += 1
+                        self._send("crawl", "normalize", (role, review))
+                finally:
+                    # Đóng generator ngay để crawler trả browser về pool
+                    if hasattr(reviews, "close"):
+                        reviews.close()
+                # review None: đã crawl hết danh sách của role này
+                self._send("crawl", "normalize", (role, None))
+        finally:
+            self._send_end("crawl", "normalize")
+
+    def _normalize(self):
+        stats = self._stats["normalize"]
+        for role, review in self._items("normalize"):
+            if review is not None:
+                stats["items"] += 1
+                self.movie_name = self.movie_name or review.get("movie_name")
+                review = normalize_review(dict(review, role=role), self.source)
+                if review is None:
+                    continue
+            self._send("normalize", "write", (role, review))
+        self._send("normalize", "write", END)
+
+    def _write(self):
+        store = None
+        try:
+            store = self.store_factory()
+            batch = []
+            newest = {}
+            for role, review in self._items("write"):
+                if review is None:
+                    self._save_batch(store, batch)
+                    batch = []
+                    self._finish_listing(store, role, newest.get(role))
+                    continue
+                # Review đầu tiên của mỗi danh sách là review mới nhất
+                newest.setdefault(role, review)
+                batch.append(review)
+                if len(batch) >= self.write_batch_size:
+                    self._save_batch(store, batch)
+                    batch = []
+            self._save_batch(store, batch)
+        except Exception:
+            if store:
+                store.rollback()
+            raise
+        finally:
+            self._send_end("write", "score")
+            if store:
+                store.close()
+
+    def _send_end(self, from_stage, to_stage):
+        try:
+            self._send(from_stage, to_stage, END)
+        except PipelineAborted:
+            pass
+
+    def _save_batch(self, store, batch):
+        if not batch:
+            return
+        # Bỏ các review trùng fingerprint trong cùng một lô (ON CONFLICT không cho cập nhật một dòng hai lần)
+        unique_reviews = {}
+        for r in batch:
+            unique_reviews.setdefault(r["fingerprint"], r)
+        counts = store.save_reviews(
+            self.movie_name or "Unknown Movie", self.movie_link, self.source, list(unique_reviews.values()),
+            update_watermarks=False,
+        )
+        if self.movie_id is None:
+            self.movie_id = store.get_movie(self.movie_link)["movie_id"]
+        review_ids = store.review_ids(self.movie_id, self.source, list(unique_reviews))
+        store.commit()
+        if self.seen is not None:
+            # Chỉ thêm sau commit: key thiếu thì review đi qua upsert, key thừa thì review bị bỏ mất
+            self.seen.add(REVIEW, [review_key(self.movie_link, fingerprint, r["score"]) for fingerprint, r in unique_reviews.items()])
+        counts["skipped"] += len(batch) - len(unique_reviews)
+        for key in self.counts:
+            self.counts[key] += counts[key]
+        self._stats["write"]["items"] += len(batch)
+        if self.on_progress:
+            self.on_progress(batch[0]["role"], len(batch), False)
+
+        if self.processor is not None:
+            self._send("write", "score", [
+                {"review_id": review_ids[fingerprint], "review": r["review"], "source": self.source, "role": r["role"]}
+                for fingerprint, r in unique_reviews.items() if fingerprint in review_ids
+            ])
+
+    def _finish_listing(self, store, role, newest_review):
+        """Move the watermark of a listing that was crawled to the end (or to the old watermark)."""
+        if self.movie_id is None:
+            movie = store.get_movie(self.movie_link)
+            self.movie_id = movie["movie_id"] if movie else None
+        if self.movie_id is not None:
+            store.touch_crawl(self.movie_id, self.source, [role], [newest_review] if newest_review else ())
+            store.commit()
+        if self.on_progress:
+            self.on_progress(role, 0, True)
+
+    def _score(self):
+        if self.processor is None:
+            for _ in self._items("score"):
+                pass
+            return
+        store = None
+        try:
+            store = self.store_factory()
+            pending = []
+            for reviews in self._items("score"):
+                pending.extend(reviews)
+                while len(pending) >= self.score_batch_size:
+                    self._score_batch(store, pending[:self.score_batch_size])
+                    pending = pending[self.score_batch_size:]
+            self._score_batch(store, pending)
+        except Exception:
+            if store:
+                store.rollback()
+            raise
+        finally:
+            if store:
+                store.close()
+
+    def _score_batch(self, store, reviews):
+        if not reviews:
+            return
+        _, scored_reviews = score_review_aspects(store, self.processor, reviews)
+        if scored_reviews:
+            store.save_aspect_sentiments(self.movie_id, scored_reviews, model_version=self.model_version)
+            # Aspect rows mới làm thay đổi payload của /api/reviews, tăng version để vô hiệu hóa cache
+            store.bump_movie_version(self.movie_id)
+            store.commit()
+        self._stats["score"]["items"] += len(reviews)
+
+    def metrics(self):
+        """Per stage: items done, items/s, share of time busy rather than waiting on a queue; per queue: depth now and at most."""
+        now = time.monotonic()
+        stages = {}
+        for stage, stats in self._stats.items():
+            seconds = (now - self._started) if stats["running"] else stats["seconds"]
+            busy = max(0.0, seconds - stats["waiting"])
+            stages[stage] = {
+                "items": stats["items"],
+                "per_second": stats["items"] / seconds if seconds > 0 else 0.0,
+                "busy": busy / seconds if seconds > 0 else 0.0,
+            }
+        queues = {stage: {"depth": q.qsize(), "max_depth": self._max_depth[stage]} for stage, q in self._queues.items()}
+        return {"stages": stages, "queues": queues}
+
+    def report(self) -> str:
+        """One line per stage for the log, with the depth of the queue feeding it."""
+        metrics = self.metrics()
+        lines = [f"--- {self.source} pipeline for {self.movie_name or self.movie_link} ---"]
+        for stage in STAGES:
+            stats = metrics["stages"][stage]
+            line = f"{stage:<10} {stats['items']:>6} items  {stats['per_second']:7.1f}/s  busy {stats['busy']:4.0%}"
+            if stage in metrics["queues"]:
+                depth = metrics["queues"][stage]
+                line += f"  queue {depth['depth']}/{self.queue_size} (max {depth['max_depth']})"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,115 @@
+from .aspects import ASPECTS, SENTIMENT_CODES
+
+# Các truy vấn nóng của API, tách riêng để test EXPLAIN không phải load mô hình ABSA
+
+MOVIE_BY_LINK_QUERY = "SELECT movie_id, movie_name, data_version FROM movies WHERE link = %s"
+
+def build_reviews_query(movie_id, filters, limit=None):
+    """
+    Build the keyset-paginated reviews query of a movie, ordered by review_id.
+
+    filters["aspect"] must be one of ASPECTS and filters["sentiment"] one of SENTIMENTS
+    (see parse_review_filters).
+    """
+    query = """
+    SELECT r.review_id, r.review, r.score, r.score_value, r.author_name, r.review_date, r.published_on, r.source, r.role
+    FROM reviews r
+    WHERE r.movie_id = %s
+    """
+    conditions, params = build_review_conditions(filters)
+    query += conditions + " ORDER BY r.review_id"
+    params = [movie_id] + params
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+def build_review_conditions(filters):
+    """Return the " AND ..." conditions on reviews r for the filters of parse_review_filters, and their params."""
+    query = ""
+    params = []
+    if filters["after"] is not None:
+        query += " AND r.review_id > %s"
+        params.append(filters["after"])
+    if filters["source"]:
+        query += " AND r.source = %s"
+        params.append(filters["source"])
+    if filters["role"]:
+        query += " AND r.role = %s"
+        params.append(filters["role"])
+    if filters["min_score"] is not None:
+        query += " AND r.score_value >= %s"
+        params.append(filters["min_score"])
+    if filters["max_score"] is not None:
+        query += " AND r.score_value <= %s"
+        params.append(filters["max_score"])
+    if filters["since"] is not None:
+        query += " AND r.published_on >= %s"
+        params.append(filters["since"])
+    if filters["until"] is not None:
+        query += " AND r.published_on <= %s"
+        params.append(filters["until"])
+    if filters["aspect"] or filters["sentiment"]:
+        # Chỉ các review đã được chấm điểm mới khớp bộ lọc khía cạnh;
+        # aspect đã được kiểm tra thuộc ASPECTS nên có thể dùng làm tên cột
+        query += " AND EXISTS (SELECT 1 FROM review_aspect_scores s WHERE s.review_id = r.review_id"
+        if filters["aspect"] and filters["sentiment"]:
+            query += f" AND s.{filters['aspect']} = %s"
+            params.append(SENTIMENT_CODES[filters["sentiment"]])
+        elif filters["aspect"]:
+            query += f" AND s.{filters['aspect']} IS NOT NULL"
+        else:
+            query += f" AND %s IN ({', '.join('s.' + aspect for aspect in ASPECTS)})"
+            params.append(SENTIMENT_CODES[filters["sentiment"]])
+        query += ")"
+    return query, params
+
+def build_in_condition(column, values, vendor="postgresql"):
+    # Postgres nhận cả danh sách trong một tham số mảng, SQLite cần một placeholder cho mỗi giá trị
+    values = list(values)
+    if vendor == "postgresql":
+        return f"{column} = ANY(%s)", [values]
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", values
+
+def build_movies_by_links_query(links, vendor="postgresql"):
+    condition, params = build_in_condition("link", links, vendor)
+    return f"SELECT movie_id, movie_name, link, data_version FROM movies WHERE {condition}", params
+
+def build_batch_reviews_query(movie_ids, filters, limit, vendor="postgresql"):
+    """
+    Build one query returning the first `limit` matching reviews of each movie, ordered by movie_id, review_id.
+
+    Each movie gets its own limit, so a movie with many reviews cannot crowd the others out of
+    the result; rows carry movie_id to group them again. On Postgres a LATERAL subquery reads
+    only the first `limit` rows of each movie from the (movie_id, review_id) index. SQLite has
+    no LATERAL and ranks the movies' reviews with ROW_NUMBER() instead.
+    """
+    conditions, filter_params = build_review_conditions(filters)
+    columns = "r.review_id, r.movie_id, r.review, r.score, r.score_value, r.author_name, r.review_date, r.published_on, r.source, r.role"
+    if vendor == "postgresql":
+        query = f"""
+        SELECT {columns}
+        FROM unnest(%s::integer[]) AS m(movie_id)
+        JOIN LATERAL (
+            SELECT * FROM reviews r
+            WHERE r.movie_id = m.movie_id{conditions}
+            ORDER BY r.review_id
+            LIMIT %s
+        ) r ON true
+        ORDER BY r.movie_id, r.review_id
+        """
+        return query, [list(movie_ids)] + filter_params + [limit]
+
+    condition, params = build_in_condition("r.movie_id", movie_ids, vendor)
+    query = f"""
+    SELECT review_id, movie_id, review, score, score_value, author_name, review_date, published_on, source, role
+    FROM (
+        SELECT {columns},
+               ROW_NUMBER() OVER (PARTITION BY r.movie_id ORDER BY r.review_id) AS review_rank
+        FROM reviews r
+        WHERE {condition}{conditions}
+    ) ranked
+    WHERE review_rank <= %s
+    ORDER BY movie_id, review_id
+    """
+    return query, params + filter_params + [limit]
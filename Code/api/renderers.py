@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+import orjson
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer
+
+try:
+    import msgpack
+except ImportError:  # msgpack là tùy chọn; không có thì chỉ trả JSON
+    msgpack = None
+
+# UTC ghi dạng "Z" như DjangoJSONEncoder; RealDictRow (dict con) được orjson serialize trực tiếp
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def isoformat(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Type is not msgpack serializable: {type(value).__name__}")
+
+def render_json(payload):
+    return orjson.dumps(payload, option=ORJSON_OPTIONS)
+
+def render_msgpack(payload):
+    return msgpack.packb(payload, default=isoformat, use_bin_type=True)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None  # orjson luôn trả UTF-8
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return render_json(data)
+
+
+class MsgPackRenderer(BaseRenderer):
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return render_msgpack(data)
+
+
+# Chọn theo header Accept; JSON đứng đầu nên là mặc định
+PAYLOAD_RENDERER_CLASSES = [ORJSONRenderer] + ([MsgPackRenderer] if msgpack else [])
+API_RENDERER_CLASSES = PAYLOAD_RENDERER_CLASSES + [BrowsableAPIRenderer]
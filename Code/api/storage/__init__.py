@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .base import ReviewStore
+from .postgres import PostgresReviewStore
+from .sqlite import SQLiteReviewStore
+
+load_dotenv()
+
+# Cùng file với DATABASES mặc định trong settings khi không cấu hình Postgres
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parent.parent.parent / "db.sqlite3"
+
+def get_review_store():
+    """
+    Open the review store configured by the environment.
+
+    REVIEW_STORE selects "postgres" or "sqlite"; it defaults to postgres when
+    POSTGRES_DATABASE is set. The SQLite file is SQLITE_PATH (default Code/db.sqlite3).
+
+    Raises:
+        ValueError: If REVIEW_STORE names an unknown backend.
+    """
+    backend = os.getenv("REVIEW_STORE") or ("postgres" if os.getenv("POSTGRES_DATABASE") else "sqlite")
+    if backend == "postgres":
+        return PostgresReviewStore()
+    if backend == "sqlite":
+        return SQLiteReviewStore(os.getenv("SQLITE_PATH") or str(DEFAULT_SQLITE_PATH))
+    raise ValueError(f"REVIEW_STORE must be 'postgres' or 'sqlite', not {backend!r}")
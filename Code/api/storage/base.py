@@ -0,0 +1,284 @@
+from ..analyze import SAVE_TEXT_PREDICTIONS_QUERY, TEXT_PREDICTION_TEMPLATE, decode_text_predictions, text_prediction_rows
+from ..aspects import fetch_aspect_summary
+from ..catalog import build_catalog_query
+from ..queries import (
+    MOVIE_BY_LINK_QUERY, build_batch_reviews_query, build_in_condition, build_movies_by_links_query, build_reviews_query,
+)
+
+UPSERT_MOVIE_QUERY = """
+INSERT INTO movies (movie_name, link, data_version, review_count, last_crawled_at)
+VALUES (%s, %s, 0, 0, CURRENT_TIMESTAMP)
+ON CONFLICT (link) DO UPDATE
+SET movie_name = EXCLUDED.movie_name
+RETURNING movie_id
+"""
+
+UPSERT_WATERMARK_QUERY = """
+INSERT INTO crawl_watermarks (movie_id, source, role, newest_fingerprint, newest_review_date, last_crawled_at)
+VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+ON CONFLICT (movie_id, source, role) DO UPDATE
+SET newest_fingerprint = COALESCE(EXCLUDED.newest_fingerprint, crawl_watermarks.newest_fingerprint),
+    newest_review_date = COALESCE(EXCLUDED.newest_review_date, crawl_watermarks.newest_review_date),
+    last_crawled_at = EXCLUDED.last_crawled_at
+"""
+
+
+class ReviewStore:
+    """
+    Data access shared by the API views and the crawlers.
+
+    Subclasses wrap a DB-API connection whose cursors return dict rows and take %s
+    placeholders, and override the few operations that need backend-specific SQL.
+    Write methods don't commit; call commit() once the unit of work is done.
+    """
+
+    vendor = None
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        self.close()
+
+    def cursor(self):
+        raise NotImplementedError
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+    def fetch_one(self, query, params=()):
+        cursor = self.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def fetch_all(self, query, params=()):
+        cursor = self.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    # Phim
+
+    def get_movie(self, link):
+        """Return {movie_id, movie_name, data_version} for a link, or None."""
+        return self.fetch_one(MOVIE_BY_LINK_QUERY, (link,))
+
+    def get_movies(self, links):
+        """Return {link: {movie_id, movie_name, link, data_version}} for the links already in the database."""
+        if not links:
+            return {}
+        query, params = build_movies_by_links_query(links, vendor=self.vendor)
+        return {row["link"]: row for row in self.fetch_all(query, params)}
+
+    def get_movie_by_id(self, movie_id):
+        return self.fetch_one("SELECT movie_id, movie_name, link FROM movies WHERE movie_id = %s", (movie_id,))
+
+    def movie_links_after(self, movie_id, limit):
+        """[{movie_id, link}] of up to limit movies added after movie_id, oldest first."""
+        return self.fetch_all(
+            "SELECT movie_id, link FROM movies WHERE movie_id > %s ORDER BY movie_id LIMIT %s", (movie_id, limit)
+        )
+
+    def bump_movie_version(self, movie_id):
+        # Dữ liệu của phim đã thay đổi, tăng version để vô hiệu hóa cache
+        row = self.fetch_one(
+            "UPDATE movies SET data_version = data_version + 1 WHERE movie_id = %s RETURNING data_version",
+            (movie_id,),
+        )
+        return row["data_version"]
+
+    def catalog_page(self, filters):
+        """Return limit + 1 catalog rows (see build_catalog_query); each row carries sort_value."""
+        query, params = build_catalog_query(filters, vendor=self.vendor)
+        return self.fetch_all(query, params)
+
+    # Review
+
+    def list_reviews(self, movie_id, filters, limit):
+        query, params = build_reviews_query(movie_id, filters, limit=limit)
+        return self.fetch_all(query, params)
+
+    def list_movies_reviews(self, movie_ids, filters, limit):
+        """Return the first `limit` matching reviews of each movie in one query, grouped as {movie_id: [rows]}."""
+        reviews = {movie_id: [] for movie_id in movie_ids}
+        if not movie_ids:
+            return reviews
+        query, params = build_batch_reviews_query(movie_ids, filters, limit, vendor=self.vendor)
+        for row in self.fetch_all(query, params):
+            reviews[row["movie_id"]].append(row)
+        return reviews
+
+    def iter_reviews(self, movie_id, filters, chunk_size):
+        """Yield the matching reviews in lists of at most chunk_size without loading them all."""
+        query, params = build_reviews_query(movie_id, filters, limit=filters["limit"])
+        return self.iter_query(query, params, chunk_size)
+
+    def iter_query(self, query, params, chunk_size):
+        """Yield the rows of a query in lists of at most chunk_size."""
+        cursor = self.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def watermark_fingerprints(self, movie_id, source):
+        """Return {role: {newest fingerprint}} of the last complete crawl of each listing of a movie on one source."""
+        rows = self.fetch_all(
+            """
+            SELECT role, newest_fingerprint
+            FROM crawl_watermarks
+            WHERE movie_id = %s AND source = %s AND newest_fingerprint IS NOT NULL
+            """,
+            (movie_id, source),
+        )
+        return {row["role"]: {row["newest_fingerprint"]} for row in rows}
+
+    def review_ids(self, movie_id, source, fingerprints):
+        """Return {fingerprint: review_id} of the given fingerprints stored for a movie on one source."""
+        if not fingerprints:
+            return {}
+        condition, params = build_in_condition("fingerprint", fingerprints, vendor=self.vendor)
+        rows = self.fetch_all(
+            f"SELECT fingerprint, review_id FROM reviews WHERE movie_id = %s AND source = %s AND {condition}",
+            [movie_id, source, *params],
+        )
+        return {row["fingerprint"]: row["review_id"] for row in rows}
+
+    def review_keys_after(self, review_id, limit):
+        """[{review_id, link, fingerprint, score}] of up to limit fingerprinted reviews added after review_id, oldest first."""
+        return self.fetch_all(
+            """
+            SELECT r.review_id, m.link, r.fingerprint, r.score
+            FROM reviews r
+            JOIN movies m ON m.movie_id = r.movie_id
+            WHERE r.review_id > %s AND r.fingerprint IS NOT NULL
+            ORDER BY r.review_id
+            LIMIT %s
+            """,
+            (review_id, limit),
+        )
+
+    def save_reviews(self, movie_name, movie_link, source, reviews, crawled_roles=(), update_watermarks=True):
+        """
+        Upsert a movie and its normalized reviews (unique by fingerprint, newest first).
+
+        New reviews are inserted, stored ones only get their score updated when it changed.
+        The movie's data_version, review_count and crawl watermarks are maintained; with
+        update_watermarks=False the reviews are one batch of a listing still being crawled,
+        and the caller moves the watermarks with touch_crawl once the listing is complete.
+
+        Returns:
+            dict: {"new", "updated", "skipped"} counts.
+        """
+        cursor = self.cursor()
+        try:
+            cursor.execute(UPSERT_MOVIE_QUERY, (movie_name, movie_link))
+            movie_id = cursor.fetchone()["movie_id"]
+            counts = self._upsert_reviews(cursor, movie_id, source, reviews)
+            if counts["new"] or counts["updated"]:
+                # Reviews của phim đã thay đổi, tăng version để cache /api/reviews được làm mới
+                cursor.execute(
+                    """
+                    UPDATE movies
+                    SET data_version = data_version + 1, review_count = review_count + %s, last_crawled_at = CURRENT_TIMESTAMP
+                    WHERE movie_id = %s
+                    """,
+                    (counts["new"], movie_id),
+                )
+            else:
+                cursor.execute("UPDATE movies SET last_crawled_at = CURRENT_TIMESTAMP WHERE movie_id = %s", (movie_id,))
+            if update_watermarks:
+                self._upsert_watermarks(cursor, movie_id, source, crawled_roles, reviews)
+            return counts
+        finally:
+            cursor.close()
+
+    def touch_crawl(self, movie_id, source, roles, newest=()):
+        """Record a complete crawl of the roles of a movie; newest holds the newest normalized review of roles that had new ones."""
+        cursor = self.cursor()
+        try:
+            self._upsert_watermarks(cursor, movie_id, source, roles, newest)
+            cursor.execute("UPDATE movies SET last_crawled_at = CURRENT_TIMESTAMP WHERE movie_id = %s", (movie_id,))
+        finally:
+            cursor.close()
+
+    def _upsert_reviews(self, cursor, movie_id, source, reviews):
+        raise NotImplementedError
+
+    def _upsert_watermarks(self, cursor, movie_id, source, roles, reviews=()):
+        # Review đầu tiên của mỗi role là review mới nhất; role không có review mới giữ mốc cũ
+        newest = {}
+        for r in reviews:
+            newest.setdefault(r["role"], r)
+        values = [
+            (movie_id, source, role, newest[role]["fingerprint"] if role in newest else None,
+             newest[role]["review_date"] if role in newest else None)
+            for role in sorted(set(roles) | set(newest))
+        ]
+        if values:
+            cursor.executemany(UPSERT_WATERMARK_QUERY, values)
+
+    # Aspect sentiment
+
+    def aspect_sentiments(self, review_ids):
+        """Return {review_id: ({aspect: {"sentiment": ...}}, confidence)} for the scored reviews."""
+        raise NotImplementedError
+
+    def save_aspect_sentiments(self, movie_id, scored_reviews, model_version=None):
+        """Store newly scored reviews (see aspects.store_aspect_sentiments) and update the summary."""
+        raise NotImplementedError
+
+    def rebuild_aspect_summary(self):
+        """Recompute movie_aspect_summary from review_aspect_scores in one set-based pass; returns the row count."""
+        raise NotImplementedError
+
+    def aspect_summary(self, movie_id, source=None, role=None):
+        cursor = self.cursor()
+        try:
+            return fetch_aspect_summary(cursor, movie_id, source=source, role=role)
+        finally:
+            cursor.close()
+
+    def text_predictions(self, text_hashes, model_version):
+        """Return {text_hash: {aspect: (sentiment, confidence)}} stored by /api/analyze for one model."""
+        if not text_hashes:
+            return {}
+        condition, params = build_in_condition("text_hash", text_hashes, self.vendor)
+        rows = self.fetch_all(
+            f"SELECT text_hash, aspect, sentiment, confidence FROM text_aspect_predictions WHERE model_version = %s AND {condition}",
+            [model_version] + params,
+        )
+        return decode_text_predictions(rows)
+
+    def save_text_predictions(self, predictions, model_version):
+        """Store {text_hash: {aspect: (sentiment, confidence)}} predictions; ones already stored are kept."""
+        rows = text_prediction_rows(predictions, model_version)
+        if not rows:
+            return
+        cursor = self.cursor()
+        try:
+            # Postgres ghi đè bằng execute_values; ở đây mỗi dòng một câu INSERT
+            cursor.executemany(SAVE_TEXT_PREDICTIONS_QUERY.replace("VALUES %s", f"VALUES {TEXT_PREDICTION_TEMPLATE}"), rows)
+        finally:
+            cursor.close()
@@ -0,0 +1,89 @@
+from psycopg2.extras import RealDictCursor, execute_values
+
+from ..analyze import SAVE_TEXT_PREDICTIONS_QUERY, TEXT_PREDICTION_TEMPLATE, text_prediction_rows
+from ..aspects import fetch_aspect_sentiments, rebuild_aspect_summary, store_aspect_sentiments
+from ..db import get_db_connection
+from .base import ReviewStore
+
+UPSERT_REVIEWS_QUERY = """
+INSERT INTO reviews (movie_id, review, score, author_name, review_date, source, role, fingerprint, score_value, published_on)
+VALUES %s
+ON CONFLICT (movie_id, fingerprint) DO UPDATE
+SET score = EXCLUDED.score, score_value = EXCLUDED.score_value
+WHERE reviews.score IS DISTINCT FROM EXCLUDED.score
+RETURNING (xmax = 0) AS inserted
+"""
+
+
+class PostgresReviewStore(ReviewStore):
+    """ReviewStore on the Postgres database from .env (or an already open psycopg2 connection)."""
+
+    vendor = "postgresql"
+
+    def __init__(self, conn=None):
+        super().__init__(conn or get_db_connection())
+
+    def cursor(self):
+        return self.conn.cursor(cursor_factory=RealDictCursor)
+
+    def iter_query(self, query, params, chunk_size):
+        # Server-side cursor: chỉ giữ một chunk trong bộ nhớ; commit sẽ đóng nó nên chỉ commit khi đã đọc hết
+        cursor = self.conn.cursor(name="review_store_stream", cursor_factory=RealDictCursor)
+        cursor.itersize = chunk_size
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def _upsert_reviews(self, cursor, movie_id, source, reviews):
+        # Review đã có chỉ được cập nhật khi score thay đổi; xmax = 0 nghĩa là dòng vừa được insert
+        values = [
+            (movie_id, r["review"], r["score"], r["author_name"], r["review_date"], source, r["role"], r["fingerprint"],
+             r["score_value"], r["published_on"])
+            for r in reviews
+        ]
+        if not values:
+            return {"new": 0, "updated": 0, "skipped": 0}
+        results = execute_values(cursor, UPSERT_REVIEWS_QUERY, values, fetch=True)
+        new_count = sum(1 for row in results if row["inserted"])
+        return {
+            "new": new_count,
+            "updated": len(results) - new_count,
+            "skipped": len(values) - len(results),
+        }
+
+    def aspect_sentiments(self, review_ids):
+        cursor = self.cursor()
+        try:
+            return fetch_aspect_sentiments(cursor, review_ids)
+        finally:
+            cursor.close()
+
+    def save_aspect_sentiments(self, movie_id, scored_reviews, model_version=None):
+        cursor = self.cursor()
+        try:
+            store_aspect_sentiments(cursor, movie_id, scored_reviews, model_version=model_version)
+        finally:
+            cursor.close()
+
+    def rebuild_aspect_summary(self):
+        cursor = self.cursor()
+        try:
+            return rebuild_aspect_summary(cursor)
+        finally:
+            cursor.close()
+
+    def save_text_predictions(self, predictions, model_version):
+        rows = text_prediction_rows(predictions, model_version)
+        if not rows:
+            return
+        cursor = self.cursor()
+        try:
+            execute_values(cursor, SAVE_TEXT_PREDICTIONS_QUERY, rows, template=TEXT_PREDICTION_TEMPLATE)
+        finally:
+            cursor.close()
@@ -0,0 +1,357 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+from ..aspects import (
+    ADD_TO_SUMMARY_QUERY, ASPECTS, SAVE_ASPECT_SCORES_QUERY, SCORE_ROW_TEMPLATE, SENTIMENT_LABELS, aspect_score_rows,
+    aspect_summary_rows, decode_aspect_scores,
+)
+from ..catalog import TitleIndex
+from ..queries import build_in_condition
+from .base import ReviewStore
+
+# Cùng schema với api/migrations, cho file SQLite không được tạo bằng `manage.py migrate`
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS movies (
+    movie_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movie_name TEXT NOT NULL,
+    link TEXT NOT NULL,
+    data_version INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    last_crawled_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS movies_link_uniq ON movies (link);
+CREATE INDEX IF NOT EXISTS movies_name_sort_idx ON movies (lower(movie_name), movie_id);
+CREATE INDEX IF NOT EXISTS movies_review_count_idx ON movies (review_count DESC, movie_id DESC);
+CREATE INDEX IF NOT EXISTS movies_last_crawled_idx ON movies (last_crawled_at DESC, movie_id DESC);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movie_id INTEGER NOT NULL REFERENCES movies (movie_id) ON DELETE CASCADE,
+    review TEXT NOT NULL,
+    score TEXT,
+    score_value REAL,
+    published_on DATE,
+    author_name TEXT,
+    review_date TEXT,
+    source VARCHAR(32) NOT NULL,
+    role VARCHAR(16),
+    fingerprint VARCHAR(40)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS reviews_movie_fingerprint_uniq ON reviews (movie_id, fingerprint);
+CREATE INDEX IF NOT EXISTS reviews_movie_review_idx ON reviews (movie_id, review_id);
+CREATE INDEX IF NOT EXISTS reviews_movie_score_idx ON reviews (movie_id, score_value);
+CREATE INDEX IF NOT EXISTS reviews_movie_published_idx ON reviews (movie_id, published_on);
+
+CREATE TABLE IF NOT EXISTS review_aspect_scores (
+    review_id INTEGER PRIMARY KEY REFERENCES reviews (review_id) ON DELETE CASCADE,
+    {", ".join(f"{aspect} SMALLINT" for aspect in ASPECTS)},
+    confidence REAL,
+    model_version VARCHAR(64),
+    scored_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS review_aspect_scored_at_idx ON review_aspect_scores (scored_at);
+
+CREATE TABLE IF NOT EXISTS text_aspect_predictions (
+    text_hash VARCHAR(40) NOT NULL,
+    model_version VARCHAR(64) NOT NULL,
+    aspect VARCHAR(32) NOT NULL,
+    sentiment SMALLINT NOT NULL,
+    confidence REAL NOT NULL,
+    scored_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (text_hash, model_version, aspect)
+);
+
+CREATE TABLE IF NOT EXISTS movie_aspect_summary (
+    movie_id INTEGER NOT NULL REFERENCES movies (movie_id) ON DELETE CASCADE,
+    aspect VARCHAR(32) NOT NULL,
+    sentiment VARCHAR(16) NOT NULL,
+    source VARCHAR(32) NOT NULL,
+    role VARCHAR(16) NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (movie_id, aspect, sentiment, source, role)
+);
+
+CREATE TABLE IF NOT EXISTS crawl_watermarks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movie_id INTEGER NOT NULL REFERENCES movies (movie_id) ON DELETE CASCADE,
+    source VARCHAR(32) NOT NULL,
+    role VARCHAR(16) NOT NULL,
+    newest_fingerprint VARCHAR(40),
+    newest_review_date TEXT,
+    last_crawled_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS crawl_watermarks_movie_source_role_uniq ON crawl_watermarks (movie_id, source, role);
+"""
+
+PLACEHOLDER_PATTERN = re.compile(r"%([s%])")
+FINGERPRINT_LOOKUP_SIZE = 500
+
+def as_datetime(value):
+    # SQLite lưu thời gian UTC dạng text; trả về datetime có múi giờ như psycopg2
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+# Cột được đổi từ text sang kiểu Python giống kết quả của psycopg2
+COLUMN_TYPES = {
+    "published_on": date.fromisoformat,
+    "last_crawled_at": as_datetime,
+    "scored_at": as_datetime,
+}
+
+def dict_row(cursor, row):
+    result = {}
+    for column, value in zip(cursor.description, row):
+        name = column[0]
+        if isinstance(value, str) and name in COLUMN_TYPES:
+            value = COLUMN_TYPES[name](value)
+        result[name] = value
+    return result
+
+def adapt(value):
+    if isinstance(value, datetime):
+        # Cùng dạng text UTC với CURRENT_TIMESTAMP để so sánh chuỗi đúng thứ tự thời gian
+        if value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class _Cursor:
+    """sqlite3 cursor taking the %s placeholders and date parameters of the Postgres queries."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @staticmethod
+    def _translate(query):
+        return PLACEHOLDER_PATTERN.sub(lambda m: "?" if m.group(1) == "s" else "%", query)
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self._translate(query), [adapt(value) for value in params])
+        return self
+
+    def executemany(self, query, param_list):
+        self._cursor.executemany(self._translate(query), ([adapt(value) for value in params] for params in param_list))
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SharedTitleIndex:
+    """
+    TitleIndex of the movies of one SQLite file, shared by every store of the process.
+
+    It is built from the movies table on the first fuzzy search; later searches only add the
+    movies inserted since (by any process), found by movie_id. A store that renames a movie
+    drops the index once the rename is committed, and the next search rebuilds it.
+    """
+
+    _indexes = {}
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.index = TitleIndex()
+        self.last_id = 0
+
+    @classmethod
+    def fuzzy(cls, path, cursor, query):
+        """(movie_id, movie_name, similarity) of every title similar to query, read under the lock."""
+        with cls._lock:
+            shared = cls._indexes.setdefault(path, cls())
+            cursor.execute("SELECT movie_id, movie_name FROM movies WHERE movie_id > %s ORDER BY movie_id", (shared.last_id,))
+            movies = [(row["movie_id"], row["movie_name"]) for row in cursor.fetchall()]
+            if movies:
+                if shared.last_id == 0:
+                    shared.index = TitleIndex.build(movies)
+                else:
+                    for movie_id, movie_name in movies:
+                        shared.index.add(movie_id, movie_name)
+                shared.last_id = movies[-1][0]
+            return shared.index.fuzzy(query, len(shared.index))
+
+    @classmethod
+    def drop(cls, path):
+        with cls._lock:
+            cls._indexes.pop(path, None)
+
+
+class SQLiteReviewStore(ReviewStore):
+    """
+    ReviewStore on an embedded SQLite file in WAL mode, for single-machine deployments.
+
+    Readers don't block the writer under WAL, and busy writers are retried for `timeout`
+    seconds. The file needs the schema from `manage.py migrate` or create_schema().
+    """
+
+    vendor = "sqlite"
+
+    def __init__(self, path, timeout=30.0):
+        self.path = os.path.abspath(path)
+        self._renamed_movie = False
+        conn = sqlite3.connect(path, timeout=timeout)
+        conn.row_factory = dict_row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Đủ an toàn với WAL, chỉ fsync khi checkpoint
+        conn.execute("PRAGMA foreign_keys=ON")
+        super().__init__(conn)
+
+    def create_schema(self):
+        self.conn.executescript(SCHEMA)
+
+    def cursor(self):
+        return _Cursor(self.conn.cursor())
+
+    def commit(self):
+        super().commit()
+        if self._renamed_movie:
+            SharedTitleIndex.drop(self.path)
+            self._renamed_movie = False
+
+    def save_reviews(self, movie_name, movie_link, source, reviews, crawled_roles=(), update_watermarks=True):
+        # Đổi tên phim: TitleIndex dùng chung phải dựng lại sau khi commit
+        stored = self.fetch_one("SELECT movie_name FROM movies WHERE link = %s", (movie_link,))
+        if stored and stored["movie_name"] != movie_name:
+            self._renamed_movie = True
+        return super().save_reviews(movie_name, movie_link, source, reviews, crawled_roles, update_watermarks)
+
+    def catalog_page(self, filters):
+        if not (filters["q"] and filters["match"] == "fuzzy"):
+            return super().catalog_page(filters)
+
+        # Không có pg_trgm: xếp hạng bằng TitleIndex dùng chung của file, cùng độ đo similarity
+        cursor = self.cursor()
+        try:
+            matches = sorted(
+                ((similarity, movie_id) for movie_id, _, similarity in SharedTitleIndex.fuzzy(self.path, cursor, filters["q"])),
+                reverse=True,
+            )
+            if filters["after"]:
+                after = (float(filters["after"][0]), filters["after"][1])
+                matches = [match for match in matches if match < after]
+            matches = matches[:filters["limit"] + 1]
+            if not matches:
+                return []
+            cursor.execute(
+                f"""
+                SELECT movie_id, movie_name, link, review_count, last_crawled_at
+                FROM movies WHERE movie_id IN ({", ".join(["%s"] * len(matches))})
+                """,
+                [movie_id for _, movie_id in matches],
+            )
+            movies = {row["movie_id"]: row for row in cursor.fetchall()}
+            # Phim đã bị xóa có thể vẫn còn trong index
+            return [dict(movies[movie_id], sort_value=similarity) for similarity, movie_id in matches if movie_id in movies]
+        finally:
+            cursor.close()
+
+    def _upsert_reviews(self, cursor, movie_id, source, reviews):
+        # Không có xmax như Postgres: đọc trước score của các fingerprint trong batch để phân loại,
+        # qua index (movie_id, fingerprint) và theo từng phần để không vượt giới hạn tham số của SQLite
+        fingerprints = [r["fingerprint"] for r in reviews]
+        stored_scores = {}
+        for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_SIZE):
+            condition, params = build_in_condition("fingerprint", fingerprints[start:start + FINGERPRINT_LOOKUP_SIZE], self.vendor)
+            cursor.execute(f"SELECT fingerprint, score FROM reviews WHERE movie_id = %s AND {condition}", [movie_id] + params)
+            stored_scores.update((row["fingerprint"], row["score"]) for row in cursor.fetchall())
+        new_rows = []
+        changed_rows = []
+        for r in reviews:
+            if r["fingerprint"] not in stored_scores:
+                new_rows.append((
+                    movie_id, r["review"], r["score"], r["author_name"], r["review_date"], source, r["role"],
+                    r["fingerprint"], r["score_value"], r["published_on"],
+                ))
+            elif stored_scores[r["fingerprint"]] != r["score"]:
+                changed_rows.append((r["score"], r["score_value"], movie_id, r["fingerprint"]))
+
+        if new_rows:
+            cursor.executemany(
+                """
+                INSERT INTO reviews (movie_id, review, score, author_name, review_date, source, role, fingerprint, score_value, published_on)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                new_rows,
+            )
+        if changed_rows:
+            cursor.executemany(
+                "UPDATE reviews SET score = %s, score_value = %s WHERE movie_id = %s AND fingerprint = %s",
+                changed_rows,
+            )
+        return {
+            "new": len(new_rows),
+            "updated": len(changed_rows),
+            "skipped": len(reviews) - len(new_rows) - len(changed_rows),
+        }
+
+    def aspect_sentiments(self, review_ids):
+        if not review_ids:
+            return {}
+        review_ids = list(review_ids)
+        rows = self.fetch_all(
+            f"""
+            SELECT review_id, {", ".join(ASPECTS)}, confidence
+            FROM review_aspect_scores
+            WHERE review_id IN ({", ".join(["%s"] * len(review_ids))})
+            """,
+            review_ids,
+        )
+        return {row["review_id"]: decode_aspect_scores(row) for row in rows}
+
+    def save_aspect_sentiments(self, movie_id, scored_reviews, model_version=None):
+        score_rows = aspect_score_rows(scored_reviews, model_version)
+        if not score_rows:
+            return
+        cursor = self.cursor()
+        try:
+            # Các câu INSERT dùng chung với Postgres, chỉ thay "VALUES %s" của execute_values bằng một dòng;
+            # RETURNING không dùng được với executemany nên chèn từng dòng
+            inserted = set()
+            insert_score = SAVE_ASPECT_SCORES_QUERY.replace("VALUES %s", f"VALUES {SCORE_ROW_TEMPLATE}")
+            for row in score_rows:
+                inserted.update(returned["review_id"] for returned in cursor.execute(insert_score, row).fetchall())
+            summary_rows = aspect_summary_rows(scored_reviews, movie_id, inserted)
+            if summary_rows:
+                summary_template = f"({', '.join(['%s'] * len(summary_rows[0]))})"
+                cursor.executemany(ADD_TO_SUMMARY_QUERY.replace("VALUES %s", f"VALUES {summary_template}"), summary_rows)
+        finally:
+            cursor.close()
+
+    def rebuild_aspect_summary(self):
+        # SQLite không có LATERAL: mỗi khía cạnh một nhánh UNION ALL thay cho VALUES của bản Postgres
+        aspect_codes = " UNION ALL ".join(
+            f"SELECT review_id, '{aspect}' AS aspect, {aspect} AS code FROM review_aspect_scores" for aspect in ASPECTS
+        )
+        label = " ".join(f"WHEN {code} THEN '{sentiment}'" for code, sentiment in SENTIMENT_LABELS.items())
+        cursor = self.cursor()
+        try:
+            cursor.execute("DELETE FROM movie_aspect_summary")
+            cursor.execute(f"""
+            INSERT INTO movie_aspect_summary (movie_id, aspect, sentiment, source, role, review_count)
+            SELECT r.movie_id, v.aspect, CASE v.code {label} END, r.source, COALESCE(r.role, 'user'), COUNT(*)
+            FROM ({aspect_codes}) v
+            JOIN reviews r ON r.review_id = v.review_id
+            WHERE v.code IS NOT NULL
+            GROUP BY r.movie_id, v.aspect, v.code, r.source, COALESCE(r.role, 'user')
+            """)
+            return cursor.rowcount
+        finally:
+            cursor.close()
@@ -1,3 +1,687 @@
-from django.test import TestCase
+import functools
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
 
-# Create your tests here.
+import psycopg2
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from movie_crawler.seen_set import LINK, REVIEW, SeenSet, canonical_url, review_key
+
+from .analyze import analyze_texts, parse_analyze_request, text_hash
+from .aspects import ASPECT_SENTIMENTS_QUERY, SUMMARY_QUERY
+from .cache import ReviewResponseCache, cached_response
+from .catalog import build_catalog_query, encode_cursor, parse_catalog_filters
+from .crawl_orchestrator import CrawlOrchestrator, CrawlTask
+from .crawl_reviews import skip_seen_reviews, sync_seen_set
+from .export import export_bounds, export_parquet, read_export_state, stream_parquet
+from .ingest import ingest_reviews, staging_rows
+from .middleware import ResponseCompressionMiddleware
+from .models import Movie, MovieAspectSummary, Review, ReviewAspectScore
+from .normalize import normalize_review
+from .pipeline import ReviewPipeline
+from .queries import MOVIE_BY_LINK_QUERY, build_batch_reviews_query, build_reviews_query
+from .renderers import render_json
+from .storage import PostgresReviewStore, SQLiteReviewStore
+
+NO_FILTERS = {
+    "limit": None, "after": None, "source": None, "role": None, "aspect": None, "sentiment": None,
+    "min_score": None, "max_score": None, "since": None, "until": None,
+}
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are checked on Postgres only")
+class HotQueryPlanTests(TestCase):
+    """The queries behind /api/reviews, /api/films and the summary endpoint must be able to use an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Movie.objects.create(movie_name="Fight Club", link="https://www.imdb.com/title/tt0137523/")
+        reviews = Review.objects.bulk_create([
+            Review(movie=cls.movie, review=f"Review {i}", score="8", source="imdb", role="user")
+            for i in range(20)
+        ])
+        ReviewAspectScore.objects.bulk_create([
+            ReviewAspectScore(review=review, acting=2, plot=1, confidence=0.9) for review in reviews
+        ])
+        MovieAspectSummary.objects.create(
+            movie=cls.movie, aspect="acting", sentiment="Positive", source="imdb", role="user", review_count=20
+        )
+        cls.review_ids = [review.review_id for review in reviews]
+
+    def assertUsesIndex(self, query, params):
+        with connection.cursor() as cursor:
+            # Bảng test rất nhỏ nên phải tắt seq scan để planner chọn index nếu có
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + query, params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertNotIn("Seq Scan", plan, plan)
+        self.assertIn("Index", plan, plan)
+
+    def test_movie_by_link(self):
+        self.assertUsesIndex(MOVIE_BY_LINK_QUERY, [self.movie.link])
+
+    def test_reviews_page(self):
+        query, params = build_reviews_query(self.movie.movie_id, dict(NO_FILTERS, after=self.review_ids[5]), limit=11)
+        self.assertUsesIndex(query, params)
+
+    def test_reviews_page_with_aspect_filter(self):
+        filters = dict(NO_FILTERS, aspect="acting", sentiment="Positive")
+        query, params = build_reviews_query(self.movie.movie_id, filters, limit=11)
+        self.assertUsesIndex(query, params)
+
+    def test_reviews_page_with_score_and_date_range(self):
+        filters = dict(NO_FILTERS, min_score=0.7, since=date(2024, 1, 1), until=date(2024, 12, 31))
+        query, params = build_reviews_query(self.movie.movie_id, filters, limit=11)
+        self.assertUsesIndex(query, params)
+
+    def test_reviews_page_with_sentiment_filter(self):
+        query, params = build_reviews_query(self.movie.movie_id, dict(NO_FILTERS, sentiment="Neutral"), limit=11)
+        self.assertUsesIndex(query, params)
+
+    def test_batch_reviews(self):
+        query, params = build_batch_reviews_query([self.movie.movie_id, 0], dict(NO_FILTERS, min_score=0.5), 5)
+        self.assertUsesIndex(query, params)
+
+    def test_aspect_sentiments_of_page(self):
+        self.assertUsesIndex(ASPECT_SENTIMENTS_QUERY, [self.review_ids[:10]])
+
+    def test_aspect_summary(self):
+        self.assertUsesIndex(SUMMARY_QUERY, [self.movie.movie_id])
+
+    def test_catalog_queries(self):
+        for params in ({}, {"q": "fig"}, {"q": "fight clb", "match": "fuzzy"}, {"sort": "review_count"}, {"sort": "last_crawled"}):
+            with self.subTest(params=params):
+                query, query_params = build_catalog_query(parse_catalog_filters(params))
+                self.assertUsesIndex(query, query_params)
+
+
+def imdb_reviews(*items):
+    """Normalized IMDb reviews from (text, score, review_date) triples, newest first."""
+    return [
+        normalize_review({"review": text, "score": score, "author_name": f"user{i}", "review_date": review_date}, "imdb")
+        for i, (text, score, review_date) in enumerate(items)
+    ]
+
+
+class ReviewStoreContract:
+    """Behaviour every ReviewStore backend must share; subclasses provide make_store()."""
+
+    link = "https://www.imdb.com/title/tt0137523/"
+
+    def setUp(self):
+        super().setUp()
+        self.store = self.make_store()
+        self.addCleanup(self.store.close)
+
+    def save(self, reviews, link=None, name="Fight Club", roles=("user",)):
+        counts = self.store.save_reviews(name, link or self.link, "imdb", reviews, crawled_roles=roles)
+        self.store.commit()
+        return counts
+
+    def test_save_reviews_inserts_updates_and_skips(self):
+        reviews = imdb_reviews(("Great", "9", "Apr 9, 2025"), ("Fine", "6", "Mar 1, 2025"), ("Bad", "2", "Jan 5, 2025"))
+        self.assertEqual(self.save(reviews), {"new": 3, "updated": 0, "skipped": 0})
+        movie = self.store.get_movie(self.link)
+        self.assertEqual(movie["movie_name"], "Fight Club")
+        self.assertEqual(movie["data_version"], 1)
+
+        rescored = imdb_reviews(("Great", "10", "Apr 9, 2025"), ("Fine", "6", "Mar 1, 2025"))
+        newer = imdb_reviews(("Loved it", "8", "May 2, 2025"))
+        self.assertEqual(self.save(newer + rescored), {"new": 1, "updated": 1, "skipped": 1})
+        self.assertEqual(self.store.get_movie(self.link)["data_version"], 2)
+        self.assertEqual(self.save(rescored), {"new": 0, "updated": 0, "skipped": 2})
+        self.assertEqual(self.store.get_movie(self.link)["data_version"], 2)
+
+        page = self.store.catalog_page(parse_catalog_filters({}))
+        self.assertEqual([(film["movie_name"], film["review_count"]) for film in page], [("Fight Club", 4)])
+        great = [r for r in self.store.list_reviews(movie["movie_id"], NO_FILTERS, 10) if r["review"] == "Great"]
+        self.assertEqual((great[0]["score"], great[0]["score_value"]), ("10", 1.0))
+
+    def test_list_and_iter_reviews(self):
+        self.save(imdb_reviews(*[(f"Review {i}", str(i), f"2025-01-{i:02d}") for i in range(1, 10)]))
+        movie_id = self.store.get_movie(self.link)["movie_id"]
+
+        first = self.store.list_reviews(movie_id, NO_FILTERS, 4)
+        second = self.store.list_reviews(movie_id, dict(NO_FILTERS, after=first[-1]["review_id"]), 4)
+        ids = [r["review_id"] for r in first + second]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 8)
+        self.assertEqual(first[0]["published_on"], date(2025, 1, 1))
+
+        filters = dict(NO_FILTERS, min_score=0.5, until=date(2025, 1, 7))
+        self.assertEqual([r["review"] for r in self.store.list_reviews(movie_id, filters, 10)], ["Review 5", "Review 6", "Review 7"])
+
+        chunks = list(self.store.iter_reviews(movie_id, dict(NO_FILTERS, limit=7), 3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+
+    def test_batch_lookup_of_movies_and_reviews(self):
+        other = f"{self.link}other/"
+        self.save(imdb_reviews(*[(f"Review {i}", str(i), None) for i in range(1, 6)]))
+        self.save(imdb_reviews(("Only one", "8", None)), link=other, name="Se7en")
+        movies = self.store.get_movies([self.link, other, "https://www.imdb.com/title/tt0000000/"])
+        self.assertEqual(set(movies), {self.link, other})
+        self.assertEqual(movies[other]["movie_name"], "Se7en")
+
+        movie_ids = [movies[self.link]["movie_id"], movies[other]["movie_id"]]
+        reviews = self.store.list_movies_reviews(movie_ids, NO_FILTERS, 3)
+        self.assertEqual([r["review"] for r in reviews[movie_ids[0]]], ["Review 1", "Review 2", "Review 3"])
+        self.assertEqual([r["review"] for r in reviews[movie_ids[1]]], ["Only one"])
+        filtered = self.store.list_movies_reviews(movie_ids, dict(NO_FILTERS, min_score=0.75), 3)
+        self.assertEqual({movie_id: len(rows) for movie_id, rows in filtered.items()}, {movie_ids[0]: 0, movie_ids[1]: 1})
+        self.assertEqual(self.store.get_movies([]), {})
+
+    def test_aspect_sentiments_and_summary(self):
+        self.save(imdb_reviews(("Great acting", "9", None), ("Slow plot", "4", None), ("Unscored", "5", None)))
+        movie_id = self.store.get_movie(self.link)["movie_id"]
+        reviews = self.store.list_reviews(movie_id, NO_FILTERS, 10)
+        self.store.save_aspect_sentiments(movie_id, [
+            (reviews[0]["review_id"], "imdb", "user", {"acting": "Positive", "plot": "Neutral"}, 0.9),
+            (reviews[1]["review_id"], "imdb", "user", {"acting": "Positive", "plot": "Negative"}, 0.6),
+        ], model_version="test")
+        self.store.commit()
+
+        stored = self.store.aspect_sentiments([r["review_id"] for r in reviews])
+        self.assertEqual(stored[reviews[0]["review_id"]], ({"acting": {"sentiment": "Positive"}, "plot": {"sentiment": "Neutral"}}, 0.9))
+        self.assertNotIn(reviews[2]["review_id"], stored)
+
+        summary = self.store.aspect_summary(movie_id)
+        self.assertEqual(summary["aspects"]["acting"]["counts"], {"Positive": 2, "Neutral": 0, "Negative": 0})
+        self.assertEqual(self.store.aspect_summary(movie_id, source="rotten")["aspects"], {})
+
+        filters = dict(NO_FILTERS, aspect="plot", sentiment="Negative")
+        self.assertEqual([r["review"] for r in self.store.list_reviews(movie_id, filters, 10)], ["Slow plot"])
+        self.assertEqual(self.store.bump_movie_version(movie_id), 2)
+
+    def test_scoring_the_same_reviews_twice_counts_them_once(self):
+        self.save(imdb_reviews(("Great acting", "9", None), ("Slow plot", "4", None)))
+        movie_id = self.store.get_movie(self.link)["movie_id"]
+        first, second = [r["review_id"] for r in self.store.list_reviews(movie_id, NO_FILTERS, 10)]
+        scored = [(first, "imdb", "user", {"acting": "Positive"}, 0.9)]
+        self.store.save_aspect_sentiments(movie_id, scored, model_version="test")
+        self.store.commit()
+
+        # Writer khác chấm lại review đầu cùng một review mới: chỉ review mới được cộng vào summary
+        rescored = [(first, "imdb", "user", {"acting": "Negative"}, 0.5), (second, "imdb", "user", {"acting": "Negative"}, 0.7)]
+        self.store.save_aspect_sentiments(movie_id, rescored, model_version="test")
+        self.store.save_aspect_sentiments(movie_id, rescored, model_version="test")
+        self.store.commit()
+
+        counts = self.store.aspect_summary(movie_id)["aspects"]["acting"]["counts"]
+        self.assertEqual(counts, {"Positive": 1, "Neutral": 0, "Negative": 1})
+        self.assertEqual(self.store.aspect_sentiments([first])[first][1], 0.9)
+
+    def test_rebuild_aspect_summary(self):
+        self.save(imdb_reviews(("Great acting", "9", None), ("Slow plot", "4", None)))
+        movie_id = self.store.get_movie(self.link)["movie_id"]
+        first, second = [r["review_id"] for r in self.store.list_reviews(movie_id, NO_FILTERS, 10)]
+        self.store.save_aspect_sentiments(movie_id, [
+            (first, "imdb", "user", {"acting": "Positive", "plot": "Neutral"}, 0.9),
+            (second, "imdb", "user", {"acting": "Positive", "plot": "Negative"}, 0.6),
+        ])
+        self.store.commit()
+        expected = self.store.aspect_summary(movie_id)
+
+        # Summary bị lệch: dựng lại từ review_aspect_scores
+        cursor = self.store.cursor()
+        cursor.execute("UPDATE movie_aspect_summary SET review_count = 7")
+        cursor.close()
+        self.assertEqual(self.store.rebuild_aspect_summary(), 3)
+        self.store.commit()
+        self.assertEqual(self.store.aspect_summary(movie_id), expected)
+
+    def test_catalog_pages(self):
+        for i, name in enumerate(["The Dark Knight", "The Dark Knight Rises", "Dark City", "Fight Club"]):
+            self.save(imdb_reviews(*[(f"{name} {j}", "7", None) for j in range(i + 1)]), link=f"{self.link}{i}/", name=name)
+
+        def names(params):
+            return [film["movie_name"] for film in self.store.catalog_page(parse_catalog_filters(params))]
+
+        self.assertEqual(names({"q": "the dark"}), ["The Dark Knight", "The Dark Knight Rises"])
+        self.assertEqual(names({"sort": "review_count"}), ["Fight Club", "Dark City", "The Dark Knight Rises", "The Dark Knight"])
+        self.assertEqual(names({"q": "dark knight", "match": "fuzzy"})[:2], ["The Dark Knight", "The Dark Knight Rises"])
+
+        first = self.store.catalog_page(parse_catalog_filters({"limit": "1"}))
+        self.assertEqual([film["movie_name"] for film in first], ["Dark City", "Fight Club"])
+        after = encode_cursor(first[0]["sort_value"], first[0]["movie_id"])
+        self.assertEqual(names({"limit": "1", "after": after}), ["Fight Club", "The Dark Knight"])
+
+    def test_crawl_watermarks(self):
+        reviews = imdb_reviews(("Newest", "9", "May 2, 2025"), ("Older", "7", "Jan 5, 2025"))
+        self.save(reviews)
+        movie_id = self.store.get_movie(self.link)["movie_id"]
+
+        self.store.touch_crawl(movie_id, "imdb", ["user"])
+        self.store.commit()
+        rows = self.store.fetch_all("SELECT role, newest_fingerprint, newest_review_date FROM crawl_watermarks WHERE movie_id = %s", (movie_id,))
+        self.assertEqual(rows, [{"role": "user", "newest_fingerprint": reviews[0]["fingerprint"], "newest_review_date": "May 2, 2025"}])
+
+
+class SQLiteReviewStoreTests(ReviewStoreContract, SimpleTestCase):
+    def make_store(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SQLiteReviewStore(os.path.join(directory.name, "reviews.sqlite3"))
+        store.create_schema()
+        return store
+
+    def test_wal_mode(self):
+        self.assertEqual(self.store.fetch_one("PRAGMA journal_mode")["journal_mode"], "wal")
+
+    def test_fuzzy_search_index_follows_new_and_renamed_movies(self):
+        def names(q):
+            return [film["movie_name"] for film in self.store.catalog_page(parse_catalog_filters({"q": q, "match": "fuzzy"}))]
+
+        self.save(imdb_reviews(("Great", "9", None)), name="The Dark Knight")
+        self.assertEqual(names("dark knight"), ["The Dark Knight"])
+        # Phim thêm bởi một kết nối khác vẫn được tìm thấy mà không dựng lại index
+        other = SQLiteReviewStore(self.store.path)
+        self.addCleanup(other.close)
+        other.save_reviews("The Dark Knight Rises", f"{self.link}rises/", "imdb", imdb_reviews(("Fine", "6", None)), ["user"])
+        other.commit()
+        self.assertEqual(names("dark knight"), ["The Dark Knight", "The Dark Knight Rises"])
+
+        self.save(imdb_reviews(("Great", "9", None)), name="Batman Begins")
+        self.assertEqual(names("batman begins"), ["Batman Begins"])
+        self.assertEqual(names("dark knight"), ["The Dark Knight Rises"])
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "The Postgres store is tested against the Postgres test database")
+class PostgresReviewStoreTests(ReviewStoreContract, TransactionTestCase):
+    def make_store(self):
+        # Kết nối riêng tới database test; TransactionTestCase xóa dữ liệu sau mỗi test
+        settings = connection.settings_dict
+        return PostgresReviewStore(psycopg2.connect(
+            dbname=settings["NAME"], user=settings["USER"], password=settings["PASSWORD"],
+            host=settings["HOST"], port=settings["PORT"] or "5432",
+        ))
+
+
+class ParquetExportTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = os.path.join(directory.name, "export")
+        self.store = SQLiteReviewStore(os.path.join(directory.name, "reviews.sqlite3"))
+        self.store.create_schema()
+        self.addCleanup(self.store.close)
+        self.store.save_reviews("Fight Club", ReviewStoreContract.link, "imdb", imdb_reviews(("Great", "9", None), ("Bad", "2", None)), ["user"])
+        self.store.commit()
+
+    def read(self, table):
+        return ds.dataset(os.path.join(self.output_dir, table), partitioning="hive").to_table().to_pylist()
+
+    def test_incremental_export_only_writes_new_rows(self):
+        results = export_parquet(self.store, self.output_dir, row_group_size=1)
+        self.assertEqual({table: result["rows"] for table, result in results.items()}, {"movies": 1, "reviews": 2, "aspect_sentiments": 0})
+        self.assertEqual(pq.ParquetFile(results["reviews"]["files"][0]).metadata.num_row_groups, 2)
+
+        self.store.save_reviews("Fight Club", ReviewStoreContract.link, "imdb", imdb_reviews(("New", "7", None)), ["user"])
+        movie_id = self.store.get_movie(ReviewStoreContract.link)["movie_id"]
+        review_id = self.store.list_reviews(movie_id, NO_FILTERS, 1)[0]["review_id"]
+        self.store.save_aspect_sentiments(movie_id, [(review_id, "imdb", "user", {"acting": "Positive"}, 0.9)])
+        self.store.commit()
+
+        results = export_parquet(self.store, self.output_dir, incremental=True)
+        self.assertEqual(results["reviews"]["rows"], 1)
+        self.assertEqual(sorted(row["review"] for row in self.read("reviews")), ["Bad", "Great", "New"])
+        aspects = self.read("aspect_sentiments")
+        self.assertEqual([(row["review_id"], row["acting"], row["plot"], row["source"]) for row in aspects], [(review_id, "Positive", None, "imdb")])
+        self.assertEqual(export_parquet(self.store, self.output_dir, incremental=True)["reviews"]["rows"], 0)
+
+    def test_incremental_export_picks_up_rows_committed_below_the_watermark(self):
+        self.store.save_reviews("Fight Club", ReviewStoreContract.link, "imdb", imdb_reviews(("Late", "5", None), ("Newest", "8", None)), ["user"])
+        self.store.commit()
+        movie_id = self.store.get_movie(ReviewStoreContract.link)["movie_id"]
+        late = self.store.fetch_one("SELECT review_id, fingerprint FROM reviews WHERE review = %s", ("Late",))
+        # Giả lập transaction đã lấy id của "Late" nhưng chỉ commit sau khi export chốt mốc
+        cursor = self.store.cursor()
+        cursor.execute("DELETE FROM reviews WHERE review_id = %s", (late["review_id"],))
+        self.store.commit()
+        export_parquet(self.store, self.output_dir, tables=["reviews"])
+        self.assertGreater(read_export_state(self.output_dir)["reviews"]["watermark"], late["review_id"])
+
+        cursor.execute(
+            "INSERT INTO reviews (review_id, movie_id, review, score, source, role, fingerprint) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (late["review_id"], movie_id, "Late", "5", "imdb", "user", late["fingerprint"]),
+        )
+        cursor.close()
+        self.store.commit()
+        results = export_parquet(self.store, self.output_dir, tables=["reviews"], incremental=True)
+        self.assertEqual(results["reviews"]["rows"], 1)
+        self.assertEqual(sorted(row["review"] for row in self.read("reviews")), ["Bad", "Great", "Late", "Newest"])
+        self.assertEqual(export_parquet(self.store, self.output_dir, tables=["reviews"], incremental=True)["reviews"]["rows"], 0)
+
+    def test_stream_parquet(self):
+        data = b"".join(stream_parquet(self.store, "reviews", upper=export_bounds(self.store, "reviews"), chunk_size=1))
+        table = pq.read_table(io.BytesIO(data))
+        self.assertEqual(table.column("review").to_pylist(), ["Great", "Bad"])
+
+
+class CountingProcessor:
+    """Stand-in for ABSAProcessor that records its forward passes instead of running the model."""
+
+    def __init__(self):
+        self.passes = []
+
+    def extract_aspects(self, review):
+        return {"Acting"} if "acting" in review.lower() else set()
+
+    def predict_pairs(self, pairs, batch_size=32):
+        self.passes.append(pairs)
+        return [("Positive" if "great" in review.lower() else "Negative", 0.8) for review, _ in pairs]
+
+    def predict_batch(self, reviews, aspects, batch_size=32):
+        self.passes.append(reviews)
+        return [{"acting": ("Positive" if "great" in review.lower() else "Negative", 0.8)} for review in reviews]
+
+
+class AnalyzeTextsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = SQLiteReviewStore(os.path.join(directory.name, "reviews.sqlite3"))
+        self.store.create_schema()
+        self.addCleanup(self.store.close)
+        self.processor = CountingProcessor()
+
+    def analyze(self, texts, **kwargs):
+        result = analyze_texts(self.store, self.processor, texts, model_version="test", **kwargs)
+        self.store.commit()
+        return result
+
+    def test_batches_pairs_and_reuses_stored_predictions(self):
+        texts = ["Great acting", "Dull plot", "great   ACTING"]
+        result = self.analyze(texts, aspects=["acting", "plot"], batch_size=2)
+        self.assertEqual(result["results"][0]["aspects"], {"acting": {"sentiment": "Positive", "confidence": 0.8}})
+        self.assertEqual(result["results"][1]["aspects"]["plot"]["sentiment"], "Negative")
+        # Văn bản trùng sau chuẩn hóa chỉ được chấm một lần: 1 + 2 cặp trong 2 lần chạy mô hình
+        self.assertEqual(result["results"][2]["text_hash"], text_hash(texts[0]))
+        self.assertEqual((result["scored_pairs"], result["forward_passes"], result["complete"]), (3, 2, True))
+
+        again = self.analyze(["Great Acting", "New text"], aspects=["acting", "plot"], mentioned_only=False)
+        self.assertEqual((again["cached_pairs"], again["scored_pairs"]), (1, 3))
+        self.assertEqual(set(self.processor.passes[-1]), {("New text", "acting"), ("New text", "plot"), ("Great Acting", "plot")})
+
+    def test_latency_budget_leaves_pending_aspects(self):
+        result = self.analyze(["Great acting", "Another review"], mentioned_only=False, batch_size=7, budget=1e-9)
+        self.assertFalse(result["complete"])
+        self.assertEqual(result["forward_passes"], 0)
+        self.assertEqual(len(result["results"][1]["pending_aspects"]), 7)
+        self.assertEqual(self.store.text_predictions([text_hash("Another review")], "test"), {})
+
+    def test_parse_analyze_request(self):
+        params = parse_analyze_request({"texts": ["x"], "aspects": "plot,Acting", "budget_ms": 60000})
+        self.assertEqual((params["aspects"], params["mentioned_only"]), (["acting", "plot"], True))
+        self.assertLessEqual(params["budget"], 2.0)
+        for data in ({"texts": []}, {"texts": ["x"], "aspects": ["music"]}, {"texts": ["x"], "budget_ms": 0}):
+            with self.assertRaises(ValueError):
+                parse_analyze_request(data)
+
+
+class ResponseCompressionTests(SimpleTestCase):
+    body = render_json({"reviews": [{"review": f"Review number {i}", "published_on": date(2025, 4, 9)} for i in range(500)]})
+
+    def get(self, response, accept_encoding="gzip, deflate"):
+        middleware = ResponseCompressionMiddleware(lambda request: response)
+        return middleware(RequestFactory().get("/api/reviews", HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_large_json_is_gzipped_with_weak_etag(self):
+        response = HttpResponse(self.body, content_type="application/json")
+        response["ETag"] = '"abc"'
+        response = self.get(response)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(response.content))["reviews"][0]["published_on"], "2025-04-09")
+
+    def test_small_refused_and_parquet_bodies_are_left_alone(self):
+        self.assertFalse(self.get(HttpResponse(b"{}", content_type="application/json")).has_header("Content-Encoding"))
+        self.assertFalse(self.get(HttpResponse(self.body), "gzip;q=0, identity").has_header("Content-Encoding"))
+        parquet = HttpResponse(self.body, content_type="application/vnd.apache.parquet")
+        self.assertFalse(self.get(parquet).has_header("Content-Encoding"))
+
+    def test_streaming_response_is_compressed_per_chunk(self):
+        lines = [render_json({"review_id": i}) + b"\n" for i in range(100)]
+        response = self.get(StreamingHttpResponse(iter(lines), content_type="application/x-ndjson"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(lines))
+
+
+class ReviewResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = os.path.join(directory.name, "cache")
+        self.store = SQLiteReviewStore(os.path.join(directory.name, "reviews.sqlite3"))
+        self.store.create_schema()
+        self.addCleanup(self.store.close)
+
+    def save(self, *items):
+        self.store.save_reviews("Fight Club", ReviewStoreContract.link, "imdb", imdb_reviews(*items), ["user"])
+        self.store.commit()
+        return self.store.get_movie(ReviewStoreContract.link)["data_version"]
+
+    def test_write_bumps_data_version_and_misses(self):
+        cache = ReviewResponseCache(cache_dir=self.cache_dir)
+        version = self.save(("Great", "9", None))
+        cache.set("fight-club", version, b'{"reviews": 1}')
+        self.assertEqual(cache.get("fight-club", version).body, b'{"reviews": 1}')
+
+        newer = self.save(("Bad", "2", None))
+        self.assertNotEqual(newer, version)
+        self.assertIsNone(cache.get("fight-club", newer))
+        # Entry cũ đã bị xóa ở cả hai tầng, kể cả khi hỏi lại với version cũ
+        self.assertIsNone(cache.get("fight-club", version))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_file_tier_survives_a_new_cache(self):
+        entry = ReviewResponseCache(cache_dir=self.cache_dir).set("fight-club", 3, b'{"reviews": 1}')
+        restarted = ReviewResponseCache(cache_dir=self.cache_dir)
+        self.assertEqual(restarted.get("fight-club", 3), entry)
+        self.assertIsNone(restarted.get("other", 3))
+        self.assertIsNone(ReviewResponseCache().get("fight-club", 3))
+
+    def test_if_none_match_returns_304_also_for_weak_etags(self):
+        entry = ReviewResponseCache().set("fight-club", 1, ResponseCompressionTests.body)
+
+        def get(if_none_match=None, accept_encoding="gzip"):
+            headers = {"HTTP_ACCEPT_ENCODING": accept_encoding}
+            if if_none_match:
+                headers["HTTP_IF_NONE_MATCH"] = if_none_match
+            request = RequestFactory().get("/api/reviews", **headers)
+            return ResponseCompressionMiddleware(lambda request: cached_response(request, entry))(request)
+
+        first = get()
+        self.assertEqual((first.status_code, first["ETag"]), (200, f"W/{entry.etag}"))
+        # Client gửi lại ETag yếu mà middleware nén đã trả về
+        self.assertEqual(get(first["ETag"]).status_code, 304)
+        self.assertEqual(get(entry.etag, accept_encoding="identity").status_code, 304)
+        self.assertEqual(get(f'"other", {entry.etag}').status_code, 304)
+        self.assertEqual(get("*").status_code, 304)
+        self.assertEqual(get('"other"').status_code, 200)
+
+
+class IngestReviewsTests(TestCase):
+    """ingest_reviews on the Django test database: SQLite by default, Postgres with DJANGO_DB=postgres."""
+
+    link = ReviewStoreContract.link
+
+    def ingest(self, *items):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "reviews.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for text, score, author in items:
+                record = {"movie_name": "Fight Club", "link": self.link, "review": text, "score": score, "author_name": author}
+                f.write(json.dumps(record) + "\n")
+        with transaction.atomic():
+            counts = ingest_reviews(connection, staging_rows([path]), batch_size=2)
+        return {name: counts[name] for name in ("rows", "new", "updated", "skipped")}
+
+    def movie(self):
+        movie = Movie.objects.get(link=self.link)
+        return movie.review_count, movie.data_version
+
+    def test_ingesting_the_same_file_twice(self):
+        # Dòng thứ ba trùng hệt dòng đầu trong cùng file
+        first = [("Great", "8", "alice"), ("Fine", "6", "bob"), ("Great", "8", "alice")]
+        self.assertEqual(self.ingest(*first), {"rows": 3, "new": 2, "updated": 0, "skipped": 1})
+        self.assertEqual(self.movie(), (2, 1))
+        self.assertEqual(Review.objects.filter(movie__link=self.link).count(), 2)
+
+        self.assertEqual(self.ingest(*first), {"rows": 3, "new": 0, "updated": 0, "skipped": 3})
+        self.assertEqual(self.movie(), (2, 1))
+
+        rescored = [("Great", "9", "alice"), ("Fine", "6", "bob"), ("Slow", "4", "carol")]
+        self.assertEqual(self.ingest(*rescored), {"rows": 3, "new": 1, "updated": 1, "skipped": 1})
+        self.assertEqual(self.movie(), (3, 2))
+        great = Review.objects.get(movie__link=self.link, review="Great")
+        self.assertEqual((great.score, great.score_value), ("9", 0.9))
+        self.assertEqual(Movie.objects.filter(link=self.link).count(), 1)
+
+
+class CrawlOrchestratorTests(SimpleTestCase):
+    def test_runs_sources_concurrently_within_domain_limits_and_retries(self):
+        lock = threading.Lock()
+        running = {}
+        peaks = {}
+        failures = {"imdb Se7en": 1}
+
+        def crawl(source, title):
+            with lock:
+                running[source] = running.get(source, 0) + 1
+                peaks[source] = max(peaks.get(source, 0), running[source])
+            time.sleep(0.02)
+            with lock:
+                running[source] -= 1
+                if failures.get(f"{source} {title}", 0):
+                    failures[f"{source} {title}"] -= 1
+                    raise RuntimeError("page did not load")
+            return {"new": 2, "updated": 0, "skipped": 1}
+
+        def film_list(source, titles):
+            return [CrawlTask(source, title, functools.partial(crawl, source, title)) for title in titles]
+
+        orchestrator = CrawlOrchestrator(
+            max_workers=4, domain_concurrency={"imdb": 1}, backoff=0.01, dashboard_seconds=60,
+        )
+        stats = orchestrator.run([
+            CrawlTask("imdb", "film list", lambda: film_list("imdb", ["Fight Club", "Se7en", "Zodiac"])),
+            CrawlTask("rotten", "film list", lambda: film_list("rotten", ["Alien", "Aliens", "Prometheus", "Covenant"])),
+        ])
+        self.assertEqual(peaks["imdb"], 1)
+        self.assertEqual(peaks["rotten"], 2)
+        self.assertEqual(stats["imdb"]["retries"], 1)
+        self.assertEqual((stats["imdb"]["done"], stats["imdb"]["new"]), (4, 6))
+        self.assertEqual((stats["rotten"]["done"], stats["rotten"]["skipped"]), (5, 4))
+
+    def test_gives_up_after_max_attempts(self):
+        def broken():
+            raise RuntimeError("blocked")
+
+        orchestrator = CrawlOrchestrator(max_attempts=2, backoff=0.01, dashboard_seconds=60)
+        stats = orchestrator.run([CrawlTask("metacritic", "film list", broken)])
+        self.assertEqual((stats["metacritic"]["failed"], stats["metacritic"]["retries"]), (1, 1))
+        self.assertIn("failed 1", orchestrator.dashboard())
+
+
+class ReviewPipelineTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "reviews.sqlite3")
+        self.store = self.make_store()
+        self.store.create_schema()
+        self.addCleanup(self.store.close)
+
+    def make_store(self):
+        # Mỗi stage mở kết nối riêng trên thread của nó
+        return SQLiteReviewStore(self.path)
+
+    def pipeline(self, **kwargs):
+        return ReviewPipeline(store_factory=self.make_store, write_batch_size=2, queue_size=1, **kwargs)
+
+    @staticmethod
+    def listing(*texts, fail_after=None):
+        for i, text in enumerate(texts):
+            if i == fail_after:
+                raise RuntimeError("browser crashed")
+            yield {"movie_name": "Fight Club", "review": text, "score": "8", "author_name": f"user{i}", "review_date": None}
+
+    def test_streams_saves_in_batches_and_scores(self):
+        processor = CountingProcessor()
+        counts = self.pipeline(processor=processor, model_version="test", score_batch_size=3).run(
+            ReviewStoreContract.link, "imdb", {"user": self.listing("Great acting", "Dull", "Great plot", "Meh", "Bad")}
+        )
+        movie_id = counts.pop("movie_id")
+        self.assertEqual(counts, {"new": 5, "updated": 0, "skipped": 0})
+        self.assertEqual(self.store.get_movie(ReviewStoreContract.link)["movie_name"], "Fight Club")
+        self.assertEqual([len(reviews) for reviews in processor.passes], [3, 2])
+
+        review_ids = [row["review_id"] for row in self.store.list_reviews(movie_id, NO_FILTERS, 10)]
+        sentiments = self.store.aspect_sentiments(review_ids)
+        self.assertEqual(sorted(sentiment["acting"]["sentiment"] for sentiment, _ in sentiments.values()), ["Negative"] * 3 + ["Positive"] * 2)
+
+        # Mốc của danh sách là review mới nhất (đầu tiên), chỉ ghi khi đã crawl hết danh sách
+        newest = normalize_review(next(self.listing("Great acting")), "imdb")["fingerprint"]
+        self.assertEqual(self.store.watermark_fingerprints(movie_id, "imdb"), {"user": {newest}})
+
+    def test_crash_keeps_saved_batches_and_the_old_watermark(self):
+        with self.assertRaises(RuntimeError):
+            self.pipeline().run(ReviewStoreContract.link, "imdb", {"user": self.listing("New", "Newer", "Old", fail_after=2)})
+        movie_id = self.store.get_movie(ReviewStoreContract.link)["movie_id"]
+        self.assertEqual(len(self.store.list_reviews(movie_id, NO_FILTERS, 10)), 2)
+        # Không có mốc: lần refresh sau crawl lại cả danh sách thay vì dừng ở review đã lưu
+        self.assertEqual(self.store.watermark_fingerprints(movie_id, "imdb"), {})
+
+        pipeline = self.pipeline()
+        counts = pipeline.run(ReviewStoreContract.link, "imdb", {"user": self.listing("New", "Newer", "Old")})
+        self.assertEqual((counts["new"], counts["updated"]), (1, 0))
+        self.assertEqual(set(pipeline.metrics()["stages"]), {"crawl", "normalize", "write", "score"})
+        self.assertLessEqual(pipeline.metrics()["queues"]["write"]["max_depth"], 1)
+
+    def test_seen_set_syncs_and_drops_saved_reviews_but_the_newest(self):
+        with self.assertRaises(RuntimeError):
+            self.pipeline().run(ReviewStoreContract.link, "imdb", {"user": self.listing("New", "Newer", "Old", fail_after=2)})
+        seen = SeenSet(os.path.join(os.path.dirname(self.path), "crawl_seen.sqlite3"))
+        self.addCleanup(seen.close)
+        self.assertEqual(sync_seen_set(seen, self.store, batch_size=1), 3)
+        self.assertEqual(sync_seen_set(seen, self.store), 0)
+        self.assertTrue(seen.contains(LINK, canonical_url(ReviewStoreContract.link)))
+
+        # "New" vẫn được chuyển đi để làm mốc, "Newer" đã lưu thì bị bỏ trước khi vào pipeline
+        listing = skip_seen_reviews(self.listing("New", "Newer", "Old"), "imdb", "user", ReviewStoreContract.link, seen)
+        counts = self.pipeline().run(ReviewStoreContract.link, "imdb", {"user": listing})
+        self.assertEqual((counts["new"], counts["updated"], counts["skipped"]), (1, 0, 1))
+        newest = normalize_review(next(self.listing("New")), "imdb")["fingerprint"]
+        self.assertEqual(self.store.watermark_fingerprints(counts["movie_id"], "imdb"), {"user": {newest}})
+
+        # Review đã lưu nhưng đổi score vẫn vào pipeline để được cập nhật; pipeline ghi score mới vào set
+        self.assertEqual(sync_seen_set(seen, self.store), 1)
+        rescored = [dict(review, score="9") if review["review"] == "Newer" else review for review in self.listing("New", "Newer", "Old")]
+        listing = skip_seen_reviews(rescored, "imdb", "user", ReviewStoreContract.link, seen)
+        counts = self.pipeline(seen=seen).run(ReviewStoreContract.link, "imdb", {"user": listing})
+        self.assertEqual((counts["new"], counts["updated"], counts["skipped"]), (0, 1, 1))
+        rescored_key = review_key(ReviewStoreContract.link, normalize_review(rescored[1], "imdb")["fingerprint"], "9")
+        self.assertTrue(seen.contains(REVIEW, rescored_key))
+        listing = skip_seen_reviews(rescored, "imdb", "user", ReviewStoreContract.link, seen)
+        self.assertEqual([review["review"] for review in listing], ["New"])
+
+    def test_seen_set_with_old_review_keys_is_rebuilt(self):
+        self.pipeline().run(ReviewStoreContract.link, "imdb", {"user": self.listing("New", "Old")})
+        seen = SeenSet(os.path.join(os.path.dirname(self.path), "crawl_seen.sqlite3"))
+        self.addCleanup(seen.close)
+        seen.add(REVIEW, ["https://www.imdb.com/title/tt0137523 ab12"])
+        seen.set_meta("reviews_synced_id", 2)
+        self.assertEqual(sync_seen_set(seen, self.store), 3)
+        self.assertEqual(seen.count, 3)
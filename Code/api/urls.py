@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import FilmListAPIView, ReviewsAPIView
+from .views import AnalyzeAPIView, ExportAPIView, FilmListAPIView, MovieSummaryAPIView, ReviewsAPIView, ReviewsBatchAPIView
 
 urlpatterns = [
     path('films', FilmListAPIView.as_view(), name='film-list'),
     path('reviews', ReviewsAPIView.as_view(), name='reviews'),
-]
\ No newline at end of file
+    path('reviews/batch', ReviewsBatchAPIView.as_view(), name='reviews-batch'),
+    path('movies/<int:movie_id>/summary', MovieSummaryAPIView.as_view(), name='movie-summary'),
+    path('analyze', AnalyzeAPIView.as_view(), name='analyze'),
+    path('export', ExportAPIView.as_view(), name='export'),
+]
@@ -2,14 +2,19 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from django.http import HttpResponse, StreamingHttpResponse
+import hmac
 import os
+from datetime import date
 from dotenv import load_dotenv
-from movie_crawler.rotten_crawler import RottenTomatoesCrawler
-from movie_crawler.imdb_crawler import IMDBCrawler
-from movie_crawler.metacritic_crawler import MetacriticCrawler
-from .crawl_reviews import save_reviews_to_postgres
+from .analyze import MAX_ANALYZE_TEXT_CHARS, MAX_ANALYZE_TEXTS, analyze_texts, parse_analyze_request
+from .aspects import ASPECTS, SENTIMENTS, score_review_aspects
+from .cache import ReviewResponseCache, cached_response
+from .catalog import encode_cursor, parse_catalog_filters
+from .crawl_reviews import CRAWLERS, CrawlQueue, crawl_movie_reviews, save_reviews
+from .export import EXPORT_TABLES, export_bounds, overlap_start, stream_parquet
+from .renderers import API_RENDERER_CLASSES, PAYLOAD_RENDERER_CLASSES, render_json
+from .storage import get_review_store
 from model.model import ABSAProcessor
 
 absa_processor = ABSAProcessor(
@@ -23,254 +28,501 @@ absa_processor.load_model(load_path="./absa_model")
 
 load_dotenv()
 
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("POSTGRES_DATABASE"),
-        user=os.getenv("POSTGRES_USER"),
-        password=os.getenv("POSTGRES_PASSWORD"),
-        host=os.getenv("POSTGRES_HOST"),
-        port=os.getenv("DB_PORT", "5432"),
+# Ghi kèm mỗi dòng review_aspect_scores để biết review nào cần chấm lại khi đổi mô hình
+ABSA_MODEL_VERSION = os.getenv("ABSA_MODEL_VERSION", "absa_model")
+# Số cặp (review, khía cạnh) trong mỗi lần chạy mô hình
+ABSA_BATCH_SIZE = int(os.getenv("ABSA_BATCH_SIZE", "32"))
+
+review_cache = ReviewResponseCache(
+    max_entries=int(os.getenv("REVIEW_CACHE_SIZE", "256")),
+    cache_dir=os.getenv("REVIEW_CACHE_DIR") or None,
+)
+
+# Phim chưa có trong DB được /api/reviews/batch đưa vào hàng đợi crawl chạy nền
+crawl_queue = CrawlQueue(max_workers=int(os.getenv("CRAWL_QUEUE_WORKERS", "2")))
+
+REVIEW_PAGE_SIZE = 100
+MAX_REVIEW_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 200
+BATCH_PAGE_SIZE = 20
+MAX_BATCH_LINKS = 50
+
+# Các trường của mỗi review trả về; client chọn bớt bằng fields=review,aspect_sentiments
+REVIEW_FIELDS = (
+    "review_id", "movie_name", "author", "review", "link", "score", "score_value", "role", "source",
+    "review_date", "published_on", "aspect_sentiments", "aspect_confidence",
+)
+ASPECT_FIELDS = ("aspect_sentiments", "aspect_confidence")
+
+def parse_review_filters(query_params):
+    """
+    Read pagination and filter parameters of /api/reviews.
+
+    Raises:
+        ValueError: If limit or after is not a valid integer, a score bound is not a
+            number, a date bound is not an ISO date, or aspect/sentiment/fields is unknown.
+    """
+    limit = query_params.get("limit", None)
+    after = query_params.get("after", None)
+    min_score = query_params.get("min_score", None)
+    max_score = query_params.get("max_score", None)
+    since = query_params.get("since", None)
+    until = query_params.get("until", None)
+    fields = query_params.get("fields", None) or ""
+    # Query string gửi "a,b"; body JSON của /api/reviews/batch có thể gửi danh sách
+    fields = {str(name).strip() for name in (fields.split(",") if isinstance(fields, str) else fields)} - {""}
+    filters = {
+        "limit": min(int(limit), MAX_REVIEW_PAGE_SIZE) if limit else None,
+        "after": int(after) if after else None,
+        "source": query_params.get("source", None),
+        "role": query_params.get("role", None),
+        "aspect": (query_params.get("aspect", None) or "").lower() or None,
+        "sentiment": (query_params.get("sentiment", None) or "").capitalize() or None,
+        "min_score": float(min_score) if min_score else None,
+        "max_score": float(max_score) if max_score else None,
+        "since": date.fromisoformat(since) if since else None,
+        "until": date.fromisoformat(until) if until else None,
+        # Giữ thứ tự của REVIEW_FIELDS để cùng một tập trường luôn có cùng cache key
+        "fields": tuple(name for name in REVIEW_FIELDS if name in fields) or None,
+    }
+    if filters["limit"] is not None and filters["limit"] < 1:
+        raise ValueError("limit must be a positive integer")
+    if filters["aspect"] and filters["aspect"] not in ASPECTS:
+        raise ValueError(f"aspect must be one of {', '.join(ASPECTS)}")
+    if filters["sentiment"] and filters["sentiment"] not in SENTIMENTS:
+        raise ValueError(f"sentiment must be one of {', '.join(SENTIMENTS)}")
+    if fields - set(REVIEW_FIELDS):
+        raise ValueError(f"fields must be among {', '.join(REVIEW_FIELDS)}")
+    return filters
+
+def link_source(movie_link):
+    """Return the source of a movie link, or None for sites without a crawler."""
+    if "rottentomatoes.com" in movie_link:
+        return "rotten"
+    if "imdb.com" in movie_link:
+        return "imdb"
+    if "metacritic.com" in movie_link:
+        return "metacritic"
+    return None
+
+def review_aspect_sentiments(store, reviews):
+    """Aspect sentiments of reviews from absa_processor; see aspects.score_review_aspects."""
+    return score_review_aspects(store, absa_processor, reviews, batch_size=ABSA_BATCH_SIZE)
+
+def format_review(movie, movie_link, review, aspect_sentiments=(None, None), fields=None):
+    absa_results, confidence = aspect_sentiments
+    # Định dạng dữ liệu trả về cho client
+    formatted = {
+        "review_id": review["review_id"],
+        "movie_name": movie["movie_name"],
+        "author": review["author_name"],
+        "review": review["review"],
+        "link": movie_link,
+        "score": review["score"],
+        "score_value": review["score_value"],
+        "role": review["role"],
+        "source": review["source"],
+        "review_date": review["review_date"],
+        "published_on": review["published_on"],
+        "aspect_sentiments": absa_results,
+        "aspect_confidence": confidence,
+    }
+    return {name: formatted[name] for name in fields} if fields else formatted
+
+def wants_aspects(fields):
+    return not fields or any(name in fields for name in ASPECT_FIELDS)
+
+def format_reviews(store, movie, movie_link, reviews, fields=None):
+    """
+    Attach aspect sentiments to a batch of review rows, scoring reviews that have none yet.
+
+    With fields, each review only keeps those keys; when no aspect field is requested the
+    stored sentiments are not read and the ABSA model is not run.
+
+    Returns:
+        tuple: (formatted reviews, newly scored reviews to pass to store.save_aspect_sentiments)
+    """
+    sentiments, scored_reviews = review_aspect_sentiments(store, reviews) if wants_aspects(fields) else ({}, [])
+    formatted_reviews = [
+        format_review(movie, movie_link, review, sentiments.get(review["review_id"], (None, None)), fields)
+        for review in reviews
+    ]
+    return formatted_reviews, scored_reviews
+
+def build_reviews_payload(store, movie, movie_link, filters):
+    """
+    Build one page of the /api/reviews payload for a movie.
+
+    Returns:
+        tuple: (payload, data_version the payload corresponds to)
+    """
+    movie_id = movie["movie_id"]
+    version = movie["data_version"]
+    limit = filters["limit"] or REVIEW_PAGE_SIZE
+
+    # Lấy thêm một dòng để biết còn trang sau hay không
+    reviews = store.list_reviews(movie_id, filters, limit + 1)
+    has_more = len(reviews) > limit
+    reviews = reviews[:limit]
+
+    formatted_reviews, scored_reviews = format_reviews(store, movie, movie_link, reviews, filters["fields"])
+    if scored_reviews:
+        # Aspect rows mới làm thay đổi payload, tăng version để vô hiệu hóa cache
+        store.save_aspect_sentiments(movie_id, scored_reviews, model_version=ABSA_MODEL_VERSION)
+        version = store.bump_movie_version(movie_id)
+        store.commit()
+
+    response_data = {
+        "movie": {
+            "movie_name": movie["movie_name"],
+            "link": movie_link
+        },
+        "reviews": formatted_reviews,
+        "next_after": reviews[-1]["review_id"] if has_more else None,
+    }
+    return response_data, version
+
+def build_batch_payload(store, links, filters):
+    """
+    Build the /api/reviews/batch payload: the first page of reviews of every requested movie.
+
+    Stored movies and their reviews are read with one query each, whatever the number of
+    links, and the unscored reviews of all of them go through a single batched ABSA pass.
+    Movies not in the database yet are queued for a background crawl.
+
+    Returns:
+        list: One entry per link in request order, with status "ready" (movie, reviews and
+            next_after), "queued" or "unsupported".
+    """
+    limit = filters["limit"] or BATCH_PAGE_SIZE
+    movies = store.get_movies(links)
+    # Lấy thêm một dòng mỗi phim để biết còn trang sau hay không
+    reviews_by_movie = store.list_movies_reviews([movie["movie_id"] for movie in movies.values()], filters, limit + 1)
+    page_reviews = [review for reviews in reviews_by_movie.values() for review in reviews[:limit]]
+
+    sentiments, scored_reviews = (
+        review_aspect_sentiments(store, page_reviews) if wants_aspects(filters["fields"]) else ({}, [])
     )
+    if scored_reviews:
+        movie_ids = {review["review_id"]: review["movie_id"] for review in page_reviews}
+        scored_by_movie = {}
+        for scored in scored_reviews:
+            scored_by_movie.setdefault(movie_ids[scored[0]], []).append(scored)
+        # Aspect rows mới làm thay đổi payload của /api/reviews, tăng version để vô hiệu hóa cache
+        for movie_id, movie_scored in sorted(scored_by_movie.items()):
+            store.save_aspect_sentiments(movie_id, movie_scored, model_version=ABSA_MODEL_VERSION)
+            store.bump_movie_version(movie_id)
+        store.commit()
+
+    results = []
+    for link in links:
+        movie = movies.get(link)
+        if movie:
+            reviews = reviews_by_movie[movie["movie_id"]]
+            results.append({
+                "link": link,
+                "status": "ready",
+                "movie": {"movie_name": movie["movie_name"], "link": link},
+                "reviews": [
+                    format_review(movie, link, review, sentiments.get(review["review_id"], (None, None)), filters["fields"])
+                    for review in reviews[:limit]
+                ],
+                "next_after": reviews[limit - 1]["review_id"] if len(reviews) > limit else None,
+            })
+        elif link_source(link):
+            crawl_queue.submit(link, link_source(link))
+            results.append({"link": link, "status": "queued"})
+        else:
+            results.append({"link": link, "status": "unsupported"})
+    return results
+
+def stream_reviews(movie, movie_link, filters):
+    """
+    Yield the reviews of a movie as NDJSON lines, reading them chunk by chunk from the store.
+
+    The first line describes the movie; each following line is one review. The generator
+    owns its store because it keeps running after the view has returned.
+    """
+    store = None
+    try:
+        store = get_review_store()
+        yield render_json({"movie": {"movie_name": movie["movie_name"], "link": movie_link}}) + b"\n"
+
+        scored_any = False
+        for reviews in store.iter_reviews(movie["movie_id"], filters, STREAM_CHUNK_SIZE):
+            formatted_reviews, scored_reviews = format_reviews(store, movie, movie_link, reviews, filters["fields"])
+            if scored_reviews:
+                # Commit sẽ đóng server-side cursor của Postgres, nên chỉ commit khi đã đọc hết
+                store.save_aspect_sentiments(movie["movie_id"], scored_reviews, model_version=ABSA_MODEL_VERSION)
+                scored_any = True
+            for review in formatted_reviews:
+                yield render_json(review) + b"\n"
+
+        if scored_any:
+            store.bump_movie_version(movie["movie_id"])
+            store.commit()
+    except Exception as e:
+        yield render_json({"error": str(e)}) + b"\n"
+    finally:
+        if store:
+            store.close()
+
+def has_export_token(request):
+    # Export đọc toàn bộ dữ liệu nên cần token riêng (EXPORT_API_TOKEN); không cấu hình thì tắt endpoint
+    token = os.getenv("EXPORT_API_TOKEN")
+    return bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+def stream_export(table, after, upper, source):
+    """Yield one Parquet file of a table; like stream_reviews, the generator owns its store."""
+    store = get_review_store()
+    try:
+        yield from stream_parquet(store, table, after=after, upper=upper, source=source)
+    finally:
+        store.close()
+
+def review_cache_key(movie_link, filters, output_format="json"):
+    params = "&".join(f"{name}={value}" for name, value in sorted(filters.items()) if value is not None)
+    return f"{movie_link}?{params}&format={output_format}"
 
 class FilmListAPIView(APIView):
+    renderer_classes = API_RENDERER_CLASSES
+
     def get(self, request):
-        conn = None
-        cursor = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            query = "SELECT movie_name, link FROM movies"
-            cursor.execute(query)
-            films = cursor.fetchall()
-            film_list = {film["movie_name"]: film["link"] for film in films}
-            return Response({"films": film_list}, status=status.HTTP_200_OK)
+            filters = parse_catalog_filters(request.query_params)
+        except ValueError as e:
+            return Response({"error": f"Invalid catalog parameter: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        store = None
+        try:
+            store = get_review_store()
+            films = store.catalog_page(filters)
+
+            # Lấy thêm một dòng để biết còn trang sau hay không
+            next_cursor = None
+            if len(films) > filters["limit"]:
+                films = films[:filters["limit"]]
+                next_cursor = encode_cursor(films[-1]["sort_value"], films[-1]["movie_id"])
+
+            film_list = [
+                {
+                    "movie_id": film["movie_id"],
+                    "movie_name": film["movie_name"],
+                    "link": film["link"],
+                    "review_count": film["review_count"],
+                    "last_crawled_at": film["last_crawled_at"],
+                }
+                for film in films
+            ]
+            return Response({"films": film_list, "next_after": next_cursor}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            if store:
+                store.close()
+
+class MovieSummaryAPIView(APIView):
+    renderer_classes = API_RENDERER_CLASSES
+
+    def get(self, request, movie_id):
+        source = request.query_params.get("source", None)
+        role = request.query_params.get("role", None)
+
+        store = None
+        try:
+            store = get_review_store()
+            movie = store.get_movie_by_id(movie_id)
+            if not movie:
+                return Response({"error": "Movie not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            summary = store.aspect_summary(movie_id, source=source, role=role)
+            return Response({"movie": movie, **summary}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+            if store:
+                store.close()
 
 class ReviewsAPIView(APIView):
+    # Payload được render sẵn thành bytes và cache theo định dạng đã thương lượng qua header Accept
+    renderer_classes = PAYLOAD_RENDERER_CLASSES
+
     def get(self, request):
         movie_link = request.query_params.get("link", None)
         if not movie_link:
             return Response({"error": "Link is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        source = None
-        if "rottentomatoes.com" in movie_link:
-            source = "rotten"
-        elif "imdb.com" in movie_link:
-            source = "imdb"
-        elif "metacritic.com" in movie_link:
-            source = "metacritic"
-        else:
+        source = link_source(movie_link)
+        if source is None:
             return Response({"error": "Unsupported link source"}, status=status.HTTP_400_BAD_REQUEST)
 
-        conn = None
-        cursor = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            filters = parse_review_filters(request.query_params)
+        except ValueError as e:
+            return Response({"error": f"Invalid query parameter: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        streaming = request.query_params.get("stream", "").lower() in ("1", "true", "ndjson")
+        renderer = request.accepted_renderer
+        cache_key = review_cache_key(movie_link, filters, renderer.format)
+
+        store = None
+        try:
+            store = get_review_store()
 
             # Truy vấn movie từ link
-            query = "SELECT movie_id, movie_name FROM movies WHERE link = %s"
-            cursor.execute(query, (movie_link,))
-            movie = cursor.fetchone()
+            movie = store.get_movie(movie_link)
 
             if movie:
-                movie_id = movie["movie_id"]
-                movie_name = movie["movie_name"]
-
-                # Truy vấn reviews
-                query = """
-                SELECT r.review_id, r.review, r.score, r.author_name, r.review_date, r.source, m.link, r.role
-                FROM reviews r
-                JOIN movies m ON r.movie_id = m.movie_id
-                WHERE r.movie_id = %s
-                """
-                cursor.execute(query, (movie_id,))
-                reviews = cursor.fetchall()
-
-                aspects = ["direction", "acting", "plot", "overall", "visuals", "themes", "pacing"]  # Danh sách khía cạnh
-                formatted_reviews = []
-
-                for review in reviews:
-                    review_id = review["review_id"]
-                    review_text = review["review"]
-
-                    # Kiểm tra xem aspect_sentiment đã tồn tại trong bảng aspect_sentiment hay chưa
-                    query_aspect = """
-                    SELECT aspect, sentiment
-                    FROM aspect_sentiment
-                    WHERE review_id = %s
-                    """
-                    cursor.execute(query_aspect, (review_id,))
-                    aspect_sentiments = cursor.fetchall()
-
-                    # Chuyển đổi dữ liệu aspect sentiment thành dictionary
-                    absa_results = {}
-                    if aspect_sentiments:
-                        for aspect_sentiment in aspect_sentiments:
-                            aspect = aspect_sentiment["aspect"]
-                            sentiment = aspect_sentiment["sentiment"]
-                            absa_results[aspect] = {"sentiment": sentiment}  # Không có confidence trong DB
-                    else:
-                        # Nếu chưa có aspect sentiment, chạy mô hình ABSA và lưu vào bảng aspect_sentiment
-                        for aspect in aspects:
-                            sentiment= absa_processor.predict_sentiment(review_text, aspect)
-                            absa_results[aspect] = {"sentiment": sentiment}
-
-                            # Lưu vào bảng aspect_sentiment
-                            insert_query = """
-                            INSERT INTO aspect_sentiment (review_id, aspect, sentiment)
-                            VALUES (%s, %s, %s)
-                            """
-                            cursor.execute(insert_query, (review_id, aspect, sentiment))
-                        conn.commit()
-
-                    # Định dạng dữ liệu trả về cho client
-                    formatted_reviews.append({
-                        "movie_name": movie_name,
-                        "author": review["author_name"],
-                        "review": review_text,
-                        "link": review["link"],
-                        "score": review["score"],
-                        "role": review["role"],
-                        "source": review["source"],
-                        "review_date": review["review_date"],
-                        "aspect_sentiments": absa_results
-                    })
-
-                response_data = {
-                    "movie": {
-                        "movie_name": movie_name,
-                        "link": movie_link
-                    },
-                    "reviews": formatted_reviews
-                }
-                return Response(response_data, status=status.HTTP_200_OK)
+                if streaming:
+                    return StreamingHttpResponse(
+                        stream_reviews(movie, movie_link, filters), content_type="application/x-ndjson"
+                    )
+                cached = review_cache.get(cache_key, movie["data_version"])
+                if cached is not None:
+                    return cached_response(request, cached, renderer.media_type)
             else:
                 # Nếu không tìm thấy movie trong DB, tiến hành crawl dữ liệu
-                reviews = []
-                crawler = None
-                if source == "rotten":
-                    crawler = RottenTomatoesCrawler()
-                elif source == "imdb":
-                    crawler = IMDBCrawler()
-                else:
-                    crawler = MetacriticCrawler()
-
-                if source == "rotten":
-                    rotten_critic_reviews = crawler.get_reviews(f"{movie_link}/reviews", role="critic")
-                    rotten_user_reviews = crawler.get_reviews(f"{movie_link}/reviews?type=user", role="user")
-                    rotten_reviews = rotten_critic_reviews + rotten_user_reviews
-                    if not rotten_reviews:
-                        return Response({"error": "No reviews found for this movie"}, status=status.HTTP_404_NOT_FOUND)
-                    reviews.extend(rotten_reviews)
-                    save_reviews_to_postgres(rotten_reviews, movie_name, "rotten", movie_link)
-                elif source == "imdb":
-                    review_url = crawler.convert_to_review_url(movie_link)
-                    imdb_reviews = crawler.get_reviews(review_url, movie_name)
-                    if not imdb_reviews:
-                        return Response({"error": "No reviews found for this movie"}, status=status.HTTP_404_NOT_FOUND)
-                    movie_name = imdb_reviews[0].get("movie_name", movie_name) if imdb_reviews else "Unknown Movie"
-                    reviews.extend(imdb_reviews)
-                    save_reviews_to_postgres(imdb_reviews, movie_name, "imdb", movie_link)
-                else:
-                    critic_reviews = crawler.get_reviews(f"{movie_link}critic-reviews/", role="critic")
-                    user_reviews = crawler.get_reviews(f"{movie_link}user-reviews/", role="user")
-                    meta_reviews = critic_reviews + user_reviews
-                    if not meta_reviews:
-                        return Response({"error": "No reviews found for this movie"}, status=status.HTTP_404_NOT_FOUND)
-                    reviews.extend(meta_reviews)
-                    save_reviews_to_postgres(meta_reviews, movie_name, "metacritic", movie_link)
+                crawler = CRAWLERS[source]()
+                reviews_by_role = crawl_movie_reviews(crawler, source, movie_link)
+                crawled_reviews = [r for role_reviews in reviews_by_role.values() for r in role_reviews]
+                if not crawled_reviews:
+                    return Response({"error": "No reviews found for this movie"}, status=status.HTTP_404_NOT_FOUND)
+                movie_name = crawled_reviews[0].get("movie_name")
+                save_reviews(
+                    crawled_reviews, movie_name, source, movie_link, crawled_roles=list(reviews_by_role)
+                )
 
                 # Truy vấn lại movie sau khi crawl và lưu vào DB
-                query = "SELECT movie_id, movie_name FROM movies WHERE link = %s"
-                cursor.execute(query, (movie_link,))
-                movie = cursor.fetchone()
+                movie = store.get_movie(movie_link)
 
                 if not movie:
                     return Response({"error": "Failed to save movie to database"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                movie_id = movie["movie_id"]
-                movie_name = movie["movie_name"]
-
-                # Truy vấn lại reviews sau khi crawl
-                query = """
-                SELECT r.review_id, r.review, r.score, r.author_name, r.review_date, r.source, m.link, r.role
-                FROM reviews r
-                JOIN movies m ON r.movie_id = m.movie_id
-                WHERE r.movie_id = %s
-                """
-                cursor.execute(query, (movie_id,))
-                reviews = cursor.fetchall()
-
-                aspects = ["direction", "acting", "plot", "overall", "visuals", "themes", "pacing"]
-                formatted_reviews = []
-
-                for review in reviews:
-                    review_id = review["review_id"]
-                    review_text = review["review"]
-
-                    # Kiểm tra xem aspect_sentiment đã tồn tại trong bảng aspect_sentiment hay chưa
-                    query_aspect = """
-                    SELECT aspect, sentiment
-                    FROM aspect_sentiment
-                    WHERE review_id = %s
-                    """
-                    cursor.execute(query_aspect, (review_id,))
-                    aspect_sentiments = cursor.fetchall()
-
-                    # Chuyển đổi dữ liệu aspect sentiment thành dictionary
-                    absa_results = {}
-                    if aspect_sentiments:
-                        for aspect_sentiment in aspect_sentiments:
-                            aspect = aspect_sentiment["aspect"]
-                            sentiment = aspect_sentiment["sentiment"]
-                            absa_results[aspect] = {"sentiment": sentiment}  # Không có confidence trong DB
-                    else:
-                        # Nếu chưa có aspect sentiment, chạy mô hình ABSA và lưu vào bảng aspect_sentiment
-                        for aspect in aspects:
-                            sentiment= absa_processor.predict_sentiment(review_text, aspect)
-                            absa_results[aspect] = {"sentiment": sentiment}
-
-                            # Lưu vào bảng aspect_sentiment
-                            insert_query = """
-                            INSERT INTO aspect_sentiment (review_id, aspect, sentiment)
-                            VALUES (%s, %s, %s)
-                            """
-                            cursor.execute(insert_query, (review_id, aspect, sentiment))
-                        conn.commit()
-
-                    # Định dạng dữ liệu trả về cho client
-                    formatted_reviews.append({
-                        "movie_name": movie_name,
-                        "author": review["author_name"],
-                        "review": review_text,
-                        "link": review["link"],
-                        "score": review["score"],
-                        "role": review["role"],
-                        "source": review["source"],
-                        "review_date": review["review_date"],
-                        "aspect_sentiments": absa_results
-                    })
-
-                response_data = {
-                    "movie": {
-                        "movie_name": movie_name,
-                        "link": movie_link
-                    },
-                    "reviews": formatted_reviews
-                }
-                return Response(response_data, status=status.HTTP_200_OK)
+                if streaming:
+                    return StreamingHttpResponse(
+                        stream_reviews(movie, movie_link, filters), content_type="application/x-ndjson"
+                    )
+
+            response_data, version = build_reviews_payload(store, movie, movie_link, filters)
+            entry = review_cache.set(cache_key, version, renderer.render(response_data))
+            return cached_response(request, entry, renderer.media_type)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
\ No newline at end of file
+            if store:
+                store.close()
+
+
+class ReviewsBatchAPIView(APIView):
+    renderer_classes = API_RENDERER_CLASSES
+
+    def post(self, request):
+        # Body JSON: {"links": [...]} cùng các bộ lọc của /api/reviews (limit áp dụng cho từng phim)
+        data = request.data if isinstance(request.data, dict) else {}
+        links = data.get("links", None)
+        if not isinstance(links, list) or not links or not all(isinstance(link, str) and link for link in links):
+            return Response({"error": "links must be a non-empty list of movie links"}, status=status.HTTP_400_BAD_REQUEST)
+        links = list(dict.fromkeys(links))
+        if len(links) > MAX_BATCH_LINKS:
+            return Response({"error": f"At most {MAX_BATCH_LINKS} links per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            filters = parse_review_filters(data)
+        except (TypeError, ValueError) as e:
+            return Response({"error": f"Invalid parameter: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if filters["after"] is not None:
+            return Response(
+                {"error": "after is not supported here; page a single movie with /api/reviews"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        store = None
+        try:
+            store = get_review_store()
+            return Response({"movies": build_batch_payload(store, links, filters)}, status=status.HTTP_200_OK)
+        except Exception as e:
+            if store:
+                store.rollback()
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            if store:
+                store.close()
+
+
+class AnalyzeAPIView(APIView):
+    renderer_classes = API_RENDERER_CLASSES
+
+    def post(self, request):
+        # Body JSON: {"texts": [...], "aspects": [...], "mentioned_only": true, "budget_ms": 500}
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            params = parse_analyze_request(data)
+        except (TypeError, ValueError) as e:
+            return Response({"error": f"Invalid parameter: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(params["texts"]) > MAX_ANALYZE_TEXTS or any(len(text) > MAX_ANALYZE_TEXT_CHARS for text in params["texts"]):
+            return Response(
+                {"error": f"At most {MAX_ANALYZE_TEXTS} texts of at most {MAX_ANALYZE_TEXT_CHARS} characters per request"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        store = None
+        try:
+            store = get_review_store()
+            result = analyze_texts(
+                store, absa_processor, params["texts"], aspects=params["aspects"], mentioned_only=params["mentioned_only"],
+                budget=params["budget"], batch_size=ABSA_BATCH_SIZE, model_version=ABSA_MODEL_VERSION,
+            )
+            store.commit()
+            return Response({"model_version": ABSA_MODEL_VERSION, **result}, status=status.HTTP_200_OK)
+        except Exception as e:
+            if store:
+                store.rollback()
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            if store:
+                store.close()
+
+
+class ExportAPIView(APIView):
+    renderer_classes = API_RENDERER_CLASSES
+
+    def get(self, request):
+        if not has_export_token(request):
+            return Response({"error": "A valid export token is required"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        table = request.query_params.get("table", "reviews")
+        if table not in EXPORT_TABLES:
+            return Response(
+                {"error": f"table must be one of {', '.join(EXPORT_TABLES)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        after = request.query_params.get("after", None) or None
+        if after is not None and table == "reviews":
+            if not after.isdigit():
+                return Response({"error": "after must be a review_id for the reviews table"}, status=status.HTTP_400_BAD_REQUEST)
+            after = int(after)
+        if after is not None:
+            # Đọc lại một khoảng dưới after cho các dòng commit muộn; client bỏ trùng theo khóa chính
+            try:
+                after = overlap_start(table, after)
+            except ValueError:
+                return Response({"error": "after must be an ISO timestamp for this table"}, status=status.HTTP_400_BAD_REQUEST)
+        source = request.query_params.get("source", None)
+
+        store = None
+        try:
+            store = get_review_store()
+            # Chốt mốc trên trước khi stream; client gửi lại nó làm after ở lần export sau
+            upper = export_bounds(store, table)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            if store:
+                store.close()
+
+        response = StreamingHttpResponse(
+            stream_export(table, after, upper, source), content_type="application/vnd.apache.parquet"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{table}.parquet"'
+        if upper is not None:
+            response["X-Export-Watermark"] = str(upper)
+        return response
@@ -0,0 +1,160 @@
+"""
+Compare the row-per-aspect `aspect_sentiment` layout with the wide `review_aspect_scores` layout.
+
+Run from the Code directory:
+    python -m benchmarks.bench_aspect_storage --reviews 200000
+    python -m benchmarks.bench_aspect_storage --reviews 200000 --postgres
+
+Both layouts are filled with the same synthetic sentiments, then the on-disk size (table plus
+indexes) and the latency of reading the aspects of one 100-review page are reported. Without
+--postgres the tables live in throwaway SQLite files; with --postgres they are temporary
+tables in the database from .env.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from api.aspects import ASPECTS, SENTIMENT_CODES, SENTIMENT_LABELS, SENTIMENTS
+
+PAGE_SIZE = 100
+
+ROWS_DDL = """
+CREATE {temp} TABLE bench_aspect_rows (
+    id {serial} PRIMARY KEY,
+    review_id INTEGER NOT NULL,
+    aspect VARCHAR(32) NOT NULL,
+    sentiment VARCHAR(16) NOT NULL,
+    UNIQUE (review_id, aspect)
+)
+"""
+
+WIDE_DDL = f"""
+CREATE {{temp}} TABLE bench_aspect_wide (
+    review_id INTEGER PRIMARY KEY,
+    {", ".join(f"{aspect} SMALLINT" for aspect in ASPECTS)},
+    confidence REAL,
+    model_version VARCHAR(64)
+)
+"""
+
+
+def make_sentiments(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        (review_id, {aspect: rng.choice(SENTIMENTS) for aspect in ASPECTS}, rng.uniform(0.4, 1.0))
+        for review_id in range(1, count + 1)
+    ]
+
+
+def row_values(sentiments):
+    return [(review_id, aspect, sentiment) for review_id, labels, _ in sentiments for aspect, sentiment in labels.items()]
+
+
+def wide_values(sentiments):
+    return [
+        (review_id, *(SENTIMENT_CODES[labels[aspect]] for aspect in ASPECTS), confidence, "absa_model")
+        for review_id, labels, confidence in sentiments
+    ]
+
+
+def read_rows(cursor, review_ids, placeholder):
+    cursor.execute(f"SELECT review_id, aspect, sentiment FROM bench_aspect_rows WHERE review_id IN ({placeholder})", review_ids)
+    results = {}
+    for review_id, aspect, sentiment in cursor.fetchall():
+        results.setdefault(review_id, {})[aspect] = {"sentiment": sentiment}
+    return results
+
+
+def read_wide(cursor, review_ids, placeholder):
+    cursor.execute(f"SELECT review_id, {', '.join(ASPECTS)}, confidence FROM bench_aspect_wide WHERE review_id IN ({placeholder})", review_ids)
+    results = {}
+    for row in cursor.fetchall():
+        results[row[0]] = {
+            aspect: {"sentiment": SENTIMENT_LABELS[code]} for aspect, code in zip(ASPECTS, row[1:-1]) if code is not None
+        }
+    return results
+
+
+def time_reads(cursor, count, repeat, placeholder_for):
+    rng = random.Random(7)
+    pages = []
+    for _ in range(repeat):
+        start = rng.randint(1, max(1, count - PAGE_SIZE))
+        pages.append(list(range(start, start + PAGE_SIZE)))
+    for name, reader in (("aspect_sentiment", read_rows), ("review_aspect_scores", read_wide)):
+        placeholder = placeholder_for(PAGE_SIZE)
+        started = time.perf_counter()
+        for review_ids in pages:
+            reader(cursor, review_ids, placeholder)
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f"  read {PAGE_SIZE}-review page from {name:22} {elapsed:8.3f} ms")
+
+
+def bench_sqlite(sentiments, repeat):
+    directory = tempfile.mkdtemp(prefix="bench_aspects_")
+    sizes = {}
+    connections = {}
+    for name, ddl, insert, values in (
+        ("aspect_sentiment", ROWS_DDL, "INSERT INTO bench_aspect_rows (review_id, aspect, sentiment) VALUES (?, ?, ?)", row_values(sentiments)),
+        ("review_aspect_scores", WIDE_DDL, f"INSERT INTO bench_aspect_wide VALUES ({', '.join(['?'] * (len(ASPECTS) + 3))})", wide_values(sentiments)),
+    ):
+        path = os.path.join(directory, f"{name}.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(ddl.format(temp="", serial="INTEGER"))
+        conn.executemany(insert, values)
+        conn.commit()
+        conn.execute("VACUUM")
+        sizes[name] = os.path.getsize(path)
+        connections[name] = conn
+    for name, size in sizes.items():
+        print(f"  {name:22} {size / 1024 / 1024:8.2f} MB")
+
+    # Gộp hai file vào một kết nối để đo đọc trên cùng điều kiện
+    conn = connections["aspect_sentiment"]
+    conn.execute("ATTACH DATABASE ? AS wide", (os.path.join(directory, "review_aspect_scores.sqlite3"),))
+    time_reads(conn.cursor(), len(sentiments), repeat, lambda n: ", ".join(["?"] * n))
+    for conn in connections.values():
+        conn.close()
+    shutil.rmtree(directory)
+
+
+def bench_postgres(sentiments, repeat):
+    from psycopg2.extras import execute_values
+    from api.db import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ROWS_DDL.format(temp="TEMP", serial="BIGSERIAL"))
+        cursor.execute(WIDE_DDL.format(temp="TEMP"))
+        execute_values(cursor, "INSERT INTO bench_aspect_rows (review_id, aspect, sentiment) VALUES %s", row_values(sentiments), page_size=10000)
+        execute_values(cursor, "INSERT INTO bench_aspect_wide VALUES %s", wide_values(sentiments), page_size=10000)
+        for table in ("bench_aspect_rows", "bench_aspect_wide"):
+            cursor.execute(f"ANALYZE {table}")
+        for name, table in (("aspect_sentiment", "bench_aspect_rows"), ("review_aspect_scores", "bench_aspect_wide")):
+            cursor.execute("SELECT pg_total_relation_size(%s)", (table,))
+            print(f"  {name:22} {cursor.fetchone()[0] / 1024 / 1024:8.2f} MB")
+        time_reads(cursor, len(sentiments), repeat, lambda n: ", ".join(["%s"] * n))
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--postgres", action="store_true", help="Benchmark against POSTGRES_* from .env instead of SQLite")
+    args = parser.parse_args()
+
+    data = make_sentiments(args.reviews)
+    print(f"{args.reviews} reviews x {len(ASPECTS)} aspects")
+    if args.postgres:
+        bench_postgres(data, args.repeat)
+    else:
+        bench_sqlite(data, args.repeat)
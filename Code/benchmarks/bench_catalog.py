@@ -0,0 +1,123 @@
+"""
+Benchmark catalog search over a synthetic catalog.
+
+Run from the Code directory:
+    python -m benchmarks.bench_catalog --movies 200000
+    python -m benchmarks.bench_catalog --movies 200000 --postgres
+
+The in-process TitleIndex is always measured. With --postgres the same catalog is loaded
+into a temporary `movies` table (it shadows the real one for this session only), indexed
+like production, and the /api/films queries are timed against it.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from api.catalog import TitleIndex, build_catalog_query, parse_catalog_filters
+
+WORDS = (
+    "the of a night day last dark star war love story king queen city dead man woman girl boy "
+    "return rise fall lost secret life world house game blood fire ice moon sun road river "
+    "ghost dream shadow hunter black white red blue iron golden silent final first broken "
+    "wild little big American empire legend escape island kingdom summer winter space time"
+).split()
+
+QUERIES = ["the", "star w", "dark", "ghost of", "lost in the", "zzz"]
+FUZZY_QUERIES = ["stra wars", "the darkk night", "goldn empire", "shadw hunter"]
+
+
+def make_catalog(count, seed=42):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    movies = []
+    for movie_id in range(1, count + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+        if rng.random() < 0.3:
+            title += f" {rng.randint(2, 9)}"
+        movies.append((
+            movie_id,
+            title,
+            f"https://www.imdb.com/title/tt{movie_id:08d}/",
+            rng.randint(0, 5000),
+            now - timedelta(minutes=rng.randint(0, 525600)),
+        ))
+    return movies
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def bench_title_index(movies, repeat):
+    start = time.perf_counter()
+    index = TitleIndex.build([(movie[0], movie[1]) for movie in movies])
+    print(f"TitleIndex build: {time.perf_counter() - start:.2f}s for {len(index)} titles")
+
+    for query in QUERIES:
+        elapsed, results = timed(lambda: index.prefix(query, 50), repeat)
+        print(f"  prefix {query!r:16} {elapsed:8.3f} ms  ({len(results)} rows)")
+    for query in FUZZY_QUERIES:
+        elapsed, results = timed(lambda: index.fuzzy(query, 50), repeat)
+        print(f"  fuzzy  {query!r:16} {elapsed:8.3f} ms  ({len(results)} rows)")
+
+
+def bench_postgres(movies, repeat):
+    from psycopg2.extras import execute_values
+    from api.db import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("""
+        CREATE TEMP TABLE movies (
+            movie_id INTEGER PRIMARY KEY,
+            movie_name TEXT NOT NULL,
+            link TEXT NOT NULL,
+            review_count INTEGER NOT NULL,
+            last_crawled_at TIMESTAMPTZ NOT NULL
+        )
+        """)
+        start = time.perf_counter()
+        execute_values(cursor, "INSERT INTO movies VALUES %s", movies, page_size=5000)
+        cursor.execute("CREATE INDEX ON movies (lower(movie_name) text_pattern_ops, movie_id)")
+        cursor.execute("CREATE INDEX ON movies (lower(movie_name), movie_id)")
+        cursor.execute("CREATE INDEX ON movies USING gin (lower(movie_name) gin_trgm_ops)")
+        cursor.execute("CREATE INDEX ON movies (review_count DESC, movie_id DESC)")
+        cursor.execute("CREATE INDEX ON movies (last_crawled_at DESC, movie_id DESC)")
+        cursor.execute("ANALYZE movies")
+        print(f"Postgres load + index: {time.perf_counter() - start:.2f}s")
+
+        cases = [{"q": query} for query in QUERIES]
+        cases += [{"q": query, "match": "fuzzy"} for query in FUZZY_QUERIES]
+        cases += [{"sort": "review_count"}, {"sort": "last_crawled"}, {"q": "the", "sort": "review_count"}]
+        for params in cases:
+            query, query_params = build_catalog_query(parse_catalog_filters(params))
+
+            def run():
+                cursor.execute(query, query_params)
+                return cursor.fetchall()
+
+            elapsed, rows = timed(run, repeat)
+            print(f"  {str(params):45} {elapsed:8.3f} ms  ({len(rows)} rows)")
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--postgres", action="store_true", help="Also benchmark against POSTGRES_* from .env")
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.movies)
+    bench_title_index(catalog, args.repeat)
+    if args.postgres:
+        bench_postgres(catalog, args.repeat)
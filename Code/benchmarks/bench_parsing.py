@@ -0,0 +1,203 @@
+"""
+Measure how many archived pages per second the crawlers' extraction gets through, per site.
+
+Run from the Code directory:
+    python -m benchmarks.bench_parsing --archive archive/
+    python -m benchmarks.bench_parsing --pages 20 --cards 50
+
+Every page is parsed into an lxml.html document and run through the extract_* method of its
+site's crawler, as movie_crawler.reparse does. For comparison, the same pages are also
+parsed into a full BeautifulSoup tree, with lxml and with html.parser, which is what the
+extraction cost before any selector ran. Without --archive, a throwaway PageArchive is
+filled with synthetic pages of every site and page type, shaped like the real ones.
+"""
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+from bs4 import BeautifulSoup
+
+from movie_crawler.html_parse import parse_html
+from movie_crawler.page_archive import PageArchive
+from movie_crawler.reparse import extract_page, source_of
+
+WORDS = (
+    "the film story acting plot director scenes visuals pacing ending character performance "
+    "beautiful boring brilliant slow great terrible music camera script dialogue emotional "
+    "funny dark long short cast hero villain twist moment world sound effects love hate"
+).split()
+
+# Phần trang không phải thẻ review: header, menu, script như trang thật
+PAGE_SHELL = """<!DOCTYPE html><html><head><title>{title}</title>
+<script>window.__DATA__ = {{"items": [{padding}]}};</script></head><body>
+<nav class="navbar">{nav}</nav><main>{main}</main><footer class="footer">{nav}</footer></body></html>"""
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def shell(rng, title, main):
+    nav = "".join(f'<ul class="nav-list"><li class="nav-item"><a href="/{word}">{word}</a></li></ul>' for word in WORDS)
+    padding = ",".join(str(rng.randint(0, 10 ** 6)) for _ in range(500))
+    return PAGE_SHELL.format(title=title, padding=padding, nav=nav, main=main)
+
+
+def imdb_reviews(rng, cards):
+    main = '<section class="ipc-page-section"><h2>Fight Club</h2></section>' + "".join(
+        f"""<article class="sc-1 user-review-item"><div class="ipc-list-card__content">
+        <span class="ipc-rating-star ipc-rating-star--rating">{rng.randint(1, 10)}</span>
+        <div class="ipc-html-content ipc-html-content--base"><div class="ipc-html-content-inner-div">{sentence(rng, 40, 300)}</div></div>
+        </div><ul class="ipc-inline-list"><li class="ipc-inline-list__item"><a href="/user/ur{i}">user{i}</a></li>
+        <li class="ipc-inline-list__item review-date">Apr {rng.randint(1, 28)}, 2025</li></ul></article>"""
+        for i in range(cards)
+    )
+    return shell(rng, "Fight Club reviews", main)
+
+
+def imdb_films(rng, cards):
+    main = "".join(
+        f'<div class="ipc-metadata-list-summary-item"><a class="ipc-title-link-wrapper" href="/title/tt{i:07d}/">'
+        f'<h3 class="ipc-title__text">{i + 1}. {sentence(rng, 1, 4).title()} {i}</h3></a></div>'
+        for i in range(cards)
+    )
+    return shell(rng, "IMDb search", main)
+
+
+def rotten_reviews(rng, cards, role):
+    row, name, text_class, date_class = (
+        ("review-row", "display-name", "review-text", "original-score-and-url") if role == "critic"
+        else ("audience-review-row", "audience-reviews__name", "audience-reviews__review", "audience-reviews__duration")
+    )
+    main = '<aside><a class="sidebar-title" href="/m/fight_club">Fight Club</a></aside>' + "".join(
+        f"""<div class="{row}"><div class="review-data"><score-icon-critics sentiment="{rng.choice(("positive", "negative"))}"></score-icon-critics>
+        <a class="{name}" href="/critics/c{i}">critic{i}</a></div>
+        <div class="review-text-container"><p class="{text_class}">{sentence(rng, 20, 120)}</p>
+        <p class="{date_class}"><span>Apr {rng.randint(1, 28)}, 2025</span></p></div></div>"""
+        for i in range(cards)
+    ) + '<div class="load-more-container"><button>Load More</button></div>'
+    return shell(rng, "Fight Club reviews", main)
+
+
+def rotten_films(rng, cards):
+    main = "".join(
+        f'<div class="flex-container"><a href="/m/film_{i}"><score-icon-critics sentiment="{"empty" if i % 7 == 0 else "positive"}">'
+        f'</score-icon-critics><span class="p--small">{sentence(rng, 1, 4).title()} {i}</span></a></div>'
+        for i in range(cards)
+    )
+    return shell(rng, "Rotten Tomatoes browse", main)
+
+
+def metacritic_reviews(rng, cards, role):
+    name = "c-siteReview_criticName" if role == "critic" else "c-siteReviewHeader_username"
+    main = '<a class="c-productSubpageHeader_back" href="/movie/fight-club/">Fight Club</a>' + "".join(
+        f"""<div class="c-siteReview"><div class="c-siteReview_main"><div class="c-siteReviewHeader">
+        <div class="c-siteReviewHeader_reviewScore"><span>{rng.randint(0, 100)}</span></div>
+        <div class="c-siteReviewHeader_reviewDate">Apr {rng.randint(1, 28)}, 2025</div></div>
+        <div class="c-siteReview_quote"><span>{sentence(rng, 20, 150)}</span></div></div>
+        <a class="{name}" href="/critic/c{i}">By critic{i}</a></div>"""
+        for i in range(cards)
+    )
+    return shell(rng, "Fight Club critic reviews", main)
+
+
+def metacritic_movies(rng, cards):
+    main = "".join(
+        f'<a class="c-finderProductCard_container" href="/movie/film-{i}/"><div class="c-siteReviewScore_background"></div>'
+        f'<h3><span>{i + 1}.</span><span>{sentence(rng, 1, 4).title()} {i}</span></h3></a>'
+        for i in range(cards)
+    )
+    return shell(rng, "Metacritic browse", main)
+
+
+def fill_synthetic_archive(archive, pages, cards, seed=42):
+    """Store pages of every site and page type; returns how many were stored."""
+    rng = random.Random(seed)
+    stored = 0
+    for page in range(pages):
+        for url, kind, role, html in (
+            (f"https://www.imdb.com/title/tt{page:07d}/reviews/", "reviews", "user", imdb_reviews(rng, cards)),
+            (f"https://www.imdb.com/search/title/?page={page}", "film_list", None, imdb_films(rng, cards)),
+            (f"https://www.rottentomatoes.com/m/film_{page}/reviews", "reviews", "critic", rotten_reviews(rng, cards, "critic")),
+            (f"https://www.rottentomatoes.com/m/film_{page}/reviews?type=user", "reviews", "user", rotten_reviews(rng, cards, "user")),
+            (f"https://www.rottentomatoes.com/browse/movies_at_home/?page={page}", "film_list", None, rotten_films(rng, cards)),
+            (f"https://www.metacritic.com/movie/film-{page}/critic-reviews/", "reviews", "critic", metacritic_reviews(rng, cards, "critic")),
+            (f"https://www.metacritic.com/movie/film-{page}/user-reviews/", "reviews", "user", metacritic_reviews(rng, cards, "user")),
+            (f"https://www.metacritic.com/browse/movie/?page={page}", "movie_list", None, metacritic_movies(rng, cards)),
+        ):
+            archive.store(url, html, kind, role)
+            stored += 1
+    return stored
+
+
+def load_pages(archive):
+    """(source, entry, html) of the latest fetch of every archived page of a known site, read up front."""
+    pages = []
+    for entry in archive.entries():
+        source = source_of(entry["url"])
+        if source:
+            pages.append((source, entry, archive.read(entry["sha256"])))
+    return pages
+
+
+def timed(function, pages):
+    """Seconds spent per source running function(source, entry, html) on each page, and the items it returned."""
+    seconds = defaultdict(float)
+    items = defaultdict(int)
+    # extract_* in từng review; bỏ đi để không đo thời gian in
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for source, entry, html in pages:
+            started = time.perf_counter()
+            result = function(source, entry, html)
+            seconds[source] += time.perf_counter() - started
+            items[source] += len(result) if isinstance(result, list) else 0
+    return seconds, items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", help="PageArchive directory of a crawl; synthetic pages if not given")
+    parser.add_argument("--pages", type=int, default=20, help="Synthetic pages per site and page type")
+    parser.add_argument("--cards", type=int, default=50, help="Review or film cards per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.archive:
+            archive = PageArchive(args.archive)
+        else:
+            archive = PageArchive(directory)
+            fill_synthetic_archive(archive, args.pages, args.cards)
+        pages = load_pages(archive)
+
+    counts = defaultdict(int)
+    sizes = defaultdict(int)
+    for source, _, html in pages:
+        counts[source] += 1
+        sizes[source] += len(html)
+    print(f"{len(pages)} pages, {sum(sizes.values()) / 1024 / 1024:.1f} MB of HTML")
+
+    methods = [
+        ("lxml + compiled XPath extraction", lambda source, entry, html: extract_page(
+            source, entry["kind"], entry["url"], entry["role"], parse_html(html)
+        )),
+        ("BeautifulSoup(lxml) tree only", lambda source, entry, html: BeautifulSoup(html, "lxml")),
+        ("BeautifulSoup(html.parser) tree only", lambda source, entry, html: BeautifulSoup(html, "html.parser")),
+    ]
+    for name, function in methods:
+        print(name)
+        best = None
+        for _ in range(args.repeat):
+            seconds, items = timed(function, pages)
+            if best is None or sum(seconds.values()) < sum(best[0].values()):
+                best = (seconds, items)
+        seconds, items = best
+        for source in sorted(counts):
+            line = f"  {source:<11} {counts[source]:>5} pages  {counts[source] / seconds[source]:9.1f} pages/s"
+            if items[source]:
+                line += f"  {items[source]:>7} items"
+            print(line)
@@ -0,0 +1,100 @@
+"""
+Measure serialization time and response size of the /api/reviews payload.
+
+Run from the Code directory:
+    python -m benchmarks.bench_review_rendering --reviews 5000
+
+A synthetic payload shaped like format_reviews output is rendered with the previous
+encoder (json.dumps + DjangoJSONEncoder), DRF's JSONRenderer, orjson and msgpack (when
+installed), with and without a `fields=review,aspect_sentiments` projection, and every
+body is compressed with gzip and brotli (when installed) as ResponseCompressionMiddleware does.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from django.conf import settings
+
+settings.configure()  # JSONRenderer đọc settings của DRF
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from api.aspects import ASPECTS, SENTIMENTS
+from api.middleware import brotli, compress
+from api.renderers import msgpack, render_json, render_msgpack
+
+WORDS = (
+    "the film story acting plot director scenes visuals pacing ending character performance "
+    "beautiful boring brilliant slow great terrible music camera script dialogue emotional "
+    "funny dark long short cast hero villain twist moment world sound effects love hate"
+).split()
+
+
+def make_payload(count, seed=42):
+    rng = random.Random(seed)
+    published = date(2025, 4, 9)
+    reviews = []
+    for review_id in range(1, count + 1):
+        reviews.append({
+            "review_id": review_id,
+            "movie_name": "Fight Club",
+            "author": f"user{rng.randint(1, 100000)}",
+            "review": " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 400))),
+            "link": "https://www.imdb.com/title/tt0137523/",
+            "score": str(rng.randint(1, 10)),
+            "score_value": round(rng.random(), 4),
+            "role": "user",
+            "source": "imdb",
+            "review_date": "Apr 9, 2025",
+            "published_on": published - timedelta(days=rng.randint(0, 3000)),
+            "aspect_sentiments": {aspect: {"sentiment": rng.choice(SENTIMENTS)} for aspect in ASPECTS},
+            "aspect_confidence": rng.uniform(0.4, 1.0),
+        })
+    return {
+        "movie": {"movie_name": "Fight Club", "link": "https://www.imdb.com/title/tt0137523/"},
+        "reviews": reviews,
+        "next_after": None,
+        "generated_at": datetime.now(timezone.utc),
+    }
+
+
+def project(payload, fields):
+    return dict(payload, reviews=[{name: review[name] for name in fields} for review in payload["reviews"]])
+
+
+def timed(function, payload, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = function(payload)
+    return body, (time.perf_counter() - started) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = make_payload(args.reviews)
+    renderers = [
+        ("json + DjangoJSONEncoder", lambda p: json.dumps(p, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        ("DRF JSONRenderer", JSONRenderer().render),
+        ("orjson", render_json),
+    ]
+    if msgpack:
+        renderers.append(("msgpack", render_msgpack))
+    encodings = ["gzip"] + (["br"] if brotli else [])
+
+    print(f"{args.reviews} reviews")
+    for label, data in (("all fields", payload), ("fields=review,aspect_sentiments", project(payload, ["review", "aspect_sentiments"]))):
+        print(label)
+        for name, render in renderers:
+            body, elapsed = timed(render, data, args.repeat)
+            line = f"  {name:26} {elapsed:8.1f} ms  {len(body) / 1024:9.1f} KB"
+            for encoding in encodings:
+                compressed, compress_ms = timed(lambda b: compress(b, encoding), body, 1)
+                line += f"  | {encoding} {len(compressed) / 1024:8.1f} KB in {compress_ms:6.1f} ms"
+            print(line)
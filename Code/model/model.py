@@ -320,6 +320,19 @@ class ABSAProcessor:
         Returns:
             str: Predicted sentiment (Positive, Negative, Neutral).
         """
+        return self.predict_sentiment_with_confidence(review, aspect)[0]
+
+    def predict_sentiment_with_confidence(self, review, aspect):
+        """
+        Predict sentiment for a single aspect together with the model's probability for it.
+
+        Args:
+            review (str): Review text.
+            aspect (str): Aspect to predict (Acting, Plot, etc.).
+
+        Returns:
+            tuple: (sentiment, confidence) where confidence is the softmax probability in [0, 1].
+        """
         # Tiền xử lý văn bản trước khi dự đoán
         preprocessed_review = self.preprocessor.preprocess_text(review, keep_stopwords=True)
 
@@ -331,11 +344,71 @@ class ABSAProcessor:
         self.model.eval()
         with torch.no_grad():
             outputs = self.model(**inputs)
-            logits = outputs.logits
-            predicted_label = torch.argmax(logits, dim=1).item()
+            probabilities = torch.softmax(outputs.logits, dim=1)
+            confidence, predicted_label = torch.max(probabilities, dim=1)
 
         # Chuyển đổi nhãn số thành cảm xúc
-        return self.label_mapping_reverse[predicted_label]
+        return self.label_mapping_reverse[predicted_label.item()], confidence.item()
+
+    def predict_batch(self, reviews, aspects=None, batch_size=32):
+        """
+        Predict sentiment with confidence for every aspect of every review in batched forward passes.
+
+        Args:
+            reviews (list): Review texts.
+            aspects (list): Aspects to predict for each review (default: self.aspects).
+            batch_size (int): Number of (review, aspect) pairs per forward pass.
+
+        Returns:
+            list: One {aspect: (sentiment, confidence)} dict per review, in input order.
+        """
+        aspects = list(aspects or self.aspects)
+        pairs = [(index, aspect) for index in range(len(reviews)) for aspect in aspects]
+        results = self.predict_pairs([(reviews[index], aspect) for index, aspect in pairs], batch_size=batch_size)
+
+        predictions = [{} for _ in reviews]
+        for (index, aspect), result in zip(pairs, results):
+            predictions[index][aspect] = result
+        return predictions
+
+    def predict_pairs(self, pairs, batch_size=32):
+        """
+        Predict sentiment with confidence for (review, aspect) pairs, batch_size pairs per forward pass.
+
+        Args:
+            pairs (list): (review text, aspect) tuples; a review may appear with several aspects.
+            batch_size (int): Number of pairs per forward pass.
+
+        Returns:
+            list: (sentiment, confidence) per pair, in input order.
+        """
+        # Mỗi review chỉ tiền xử lý một lần cho mọi khía cạnh
+        preprocessed_reviews = {}
+        input_texts = []
+        for review, aspect in pairs:
+            if review not in preprocessed_reviews:
+                preprocessed_reviews[review] = self.preprocessor.preprocess_text(review, keep_stopwords=True)
+            input_texts.append(f"{preprocessed_reviews[review]} [SEP] {aspect}")
+
+        # Xếp các cặp theo độ dài để mỗi batch được padding đến độ dài gần nhau
+        order = sorted(range(len(pairs)), key=lambda i: len(input_texts[i]))
+        results = [None] * len(pairs)
+
+        self.model.eval()
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = self.tokenizer(
+                [input_texts[i] for i in batch], return_tensors="pt", padding=True, truncation=True,
+                max_length=self.max_length,
+            )
+            with torch.no_grad():
+                probabilities = torch.softmax(self.model(**inputs).logits, dim=1)
+                confidences, predicted_labels = torch.max(probabilities, dim=1)
+
+            for i, confidence, label in zip(batch, confidences.tolist(), predicted_labels.tolist()):
+                results[i] = (self.label_mapping_reverse[label], confidence)
+
+        return results
 
     def predict_all_aspects(self, review, filter_mentioned_aspects=False):
         """
@@ -0,0 +1,267 @@
+import os
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from .rate_limit import shared_rate_limiter
+
+DEFAULT_CHROMEDRIVER_PATH = "D:/NLP/chromedriver-win64/chromedriver-win64/chromedriver.exe"
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/91.0.4472.124 Safari/537.36"
+)
+
+# Font và media không cần cho việc đọc review; ảnh được tắt bằng content setting
+BLOCKED_URL_PATTERNS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg", "*.gif",
+]
+PAGE_TIMINGS_KEPT = 200
+DEFAULT_POOL_SIZE = 2
+
+
+def lightweight_chrome_options(headless=True) -> Options:
+    """Chrome options for crawling: no images, eager page loads, no GPU or extensions."""
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("--ignore-ssl-errors")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    # get() trả về khi DOM đã sẵn sàng, không đợi ảnh, quảng cáo hay iframe
+    chrome_options.page_load_strategy = "eager"
+    return chrome_options
+
+
+class PooledDriver:
+    """
+    A WebDriver leased from a BrowserPool.
+
+    Everything is delegated to the wrapped driver; get() is timed and counted so the pool
+    can report page-load metrics and recycle the driver after max_pages pages.
+    """
+
+    def __init__(self, driver, pool):
+        self.driver = driver
+        self.pool = pool
+        self.page_count = 0
+
+    def get(self, url):
+        if self.pool.rate_limiter:
+            self.pool.rate_limiter.wait(url)
+        started = time.perf_counter()
+        try:
+            return self.driver.get(url)
+        finally:
+            self.page_count += 1
+            self.pool.record_page_load(time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+
+class BrowserPool:
+    """
+    Keep up to `size` warm Chrome drivers and lease them to crawlers.
+
+        with pool.lease() as browser:
+            browser.get(url)
+
+    Drivers are started on first use and reused across leases. With a rate_limiter, every
+    page load first waits for a slot of its domain. A driver is checked before
+    each lease and after an exception escapes a lease, and replaced when it no longer
+    answers or after max_pages page loads.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, chromedriver_path=DEFAULT_CHROMEDRIVER_PATH, max_pages=50, headless=True,
+                 page_load_timeout=120, driver_factory=None, rate_limiter=None):
+        self.size = size
+        self.chromedriver_path = chromedriver_path
+        self.max_pages = max_pages
+        self.headless = headless
+        self.page_load_timeout = page_load_timeout
+        self.driver_factory = driver_factory or self._start_chrome
+        self.rate_limiter = rate_limiter
+        self._idle = queue.LifoQueue()  # Driver dùng gần nhất còn "nóng" nhất
+        self._lock = threading.Lock()
+        self._started = 0
+        self._live = 0
+        self._recycled = 0
+        self._page_timings = deque(maxlen=PAGE_TIMINGS_KEPT)
+        self._pages = 0
+        self._pages_waited = 0
+        self._wait_seconds = 0.0
+        self._work_seconds = 0.0
+        self._closed = False
+
+    def _start_chrome(self):
+        driver = webdriver.Chrome(
+            service=Service(self.chromedriver_path), options=lightweight_chrome_options(self.headless)
+        )
+        driver.set_page_load_timeout(self.page_load_timeout)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except WebDriverException as e:
+            print(f"Could not block fonts and media: {e}")
+        return driver
+
+    def _new_driver(self):
+        with self._lock:
+            self._live += 1
+            self._started += 1
+        try:
+            return PooledDriver(self.driver_factory(), self)
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+
+    def _discard(self, pooled):
+        with self._lock:
+            self._live -= 1
+            self._recycled += 1
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass  # Driver đã chết thì quit cũng lỗi
+
+    @staticmethod
+    def _is_healthy(pooled):
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._live < self.size
+                if can_start:
+                    return self._new_driver()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser free in the pool after {timeout} seconds")
+                try:
+                    pooled = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+            if self._is_healthy(pooled):
+                return pooled
+            print("Browser in the pool stopped responding, starting a new one")
+            self._discard(pooled)
+
+    @contextmanager
+    def lease(self, timeout=300):
+        """Lease a driver for the duration of the with block, waiting up to `timeout` seconds for one."""
+        if self._closed:
+            raise RuntimeError("The browser pool is closed")
+        pooled = self._acquire(timeout)
+        crashed = False
+        try:
+            yield pooled
+        except Exception:
+            # Timeout hay không thấy phần tử không làm hỏng driver; chỉ thay driver không còn phản hồi
+            crashed = not self._is_healthy(pooled)
+            raise
+        finally:
+            if crashed or self._closed or pooled.page_count >= self.max_pages:
+                self._discard(pooled)
+            else:
+                self._idle.put(pooled)
+
+    def record_page_load(self, seconds):
+        with self._lock:
+            self._pages += 1
+            self._page_timings.append(seconds)
+
+    def record_page_waits(self, wait_seconds, work_seconds):
+        """Add the wait/work split of one page, see waits.PageWaits."""
+        with self._lock:
+            self._pages_waited += 1
+            self._wait_seconds += wait_seconds
+            self._work_seconds += work_seconds
+
+    def recent_page_loads(self):
+        """Durations in seconds of the most recent page loads, oldest first."""
+        with self._lock:
+            return list(self._page_timings)
+
+    def metrics(self):
+        """Counters and page-load timing percentiles (over the last PAGE_TIMINGS_KEPT pages), in ms."""
+        timings = sorted(self.recent_page_loads())
+        with self._lock:
+            metrics = {
+                "drivers_live": self._live,
+                "drivers_idle": self._idle.qsize(),
+                "drivers_started": self._started,
+                "drivers_recycled": self._recycled,
+                "pages_loaded": self._pages,
+                "pages_instrumented": self._pages_waited,
+                "wait_s_total": round(self._wait_seconds, 2),
+                "work_s_total": round(self._work_seconds, 2),
+            }
+        if timings:
+            metrics.update({
+                "page_load_avg_ms": round(statistics.fmean(timings) * 1000, 1),
+                "page_load_p50_ms": round(timings[len(timings) // 2] * 1000, 1),
+                "page_load_p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 1),
+                "page_load_max_ms": round(timings[-1] * 1000, 1),
+            })
+        return metrics
+
+    def close(self):
+        """Quit the idle drivers; drivers still leased are quit when they are returned."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+def shared_browser_pool(chromedriver_path=None) -> BrowserPool:
+    """
+    Return the process-wide pool for a chromedriver, so every crawler reuses the same warm browsers.
+
+    Size, recycling and headless mode come from BROWSER_POOL_SIZE (default 2),
+    BROWSER_MAX_PAGES (default 50) and BROWSER_HEADLESS (default 1).
+    """
+    chromedriver_path = chromedriver_path or os.getenv("CHROMEDRIVER_PATH") or DEFAULT_CHROMEDRIVER_PATH
+    with _shared_pools_lock:
+        pool = _shared_pools.get(chromedriver_path)
+        if pool is None or pool._closed:
+            pool = BrowserPool(
+                size=int(os.getenv("BROWSER_POOL_SIZE", str(DEFAULT_POOL_SIZE))),
+                chromedriver_path=chromedriver_path,
+                max_pages=int(os.getenv("BROWSER_MAX_PAGES", "50")),
+                headless=os.getenv("BROWSER_HEADLESS", "1") not in ("0", "false"),
+                rate_limiter=shared_rate_limiter(),
+            )
+            _shared_pools[chromedriver_path] = pool
+        return pool
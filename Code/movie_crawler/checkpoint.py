@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+CHECKPOINT_VERSION = 2
+CHECKPOINT_SECONDS = 10.0
+
+
+class CrawlCheckpoint:
+    """
+    Progress of a crawl kept in a crawler's state_file, so an interrupted crawl can resume.
+
+    Every crawler uses the same format:
+
+        {
+          "version": 2,
+          "updated_at": "2025-05-02T10:00:00+00:00",
+          "listings": {base_url: {"page": 3, "films": {link: title}, "done": false}},
+          "films": {link: {"roles": {role: {"reviews": 120, "done": true}}, "done": false}}
+        }
+
+    "page" is the last listing page read, or the number of "load more" clicks on sites that
+    load more films in place. Films are keyed by link, as two films can share a title; version 1
+    files, keyed by title, are converted when resumed. Changes are written at most every
+    `interval` seconds (and on save(force=True)) to a temporary file that then replaces the
+    state file, so a crash never leaves half a file. Without resume the previous state is
+    ignored and overwritten.
+    """
+
+    def __init__(self, path, resume=False, interval=CHECKPOINT_SECONDS):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._state = {"version": CHECKPOINT_VERSION, "listings": {}, "films": {}}
+        if resume and path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == 1:
+                # Bản 1 giữ danh sách phim theo tiêu đề ({title: link}); đổi sang {link: title}
+                for listing in state.get("listings", {}).values():
+                    listing["films"] = {link: title for title, link in listing.get("films", {}).items()}
+                state["version"] = CHECKPOINT_VERSION
+            if state.get("version") == CHECKPOINT_VERSION:
+                self._state = state
+            else:
+                print(f"Ignoring {path}: checkpoint version {state.get('version')} is not {CHECKPOINT_VERSION}")
+
+    # Danh sách phim
+
+    def listing(self, url):
+        """{"page", "films", "done"} of a film listing; page 0 and no films if it was never read."""
+        with self._lock:
+            listing = self._state["listings"].get(url, {})
+            return {"page": listing.get("page", 0), "films": dict(listing.get("films", {})), "done": listing.get("done", False)}
+
+    def update_listing(self, url, page, films, done=False):
+        with self._lock:
+            self._state["listings"][url] = {"page": page, "films": dict(films), "done": done}
+            self._dirty = True
+        self.save(force=done)
+
+    # Review của từng phim
+
+    def film_done(self, link):
+        with self._lock:
+            return self._state["films"].get(link, {}).get("done", False)
+
+    def done_roles(self, link):
+        """Roles of a film whose review listing was crawled to the end."""
+        with self._lock:
+            roles = self._state["films"].get(link, {}).get("roles", {})
+            return {role for role, progress in roles.items() if progress.get("done")}
+
+    def update_film(self, link, role, reviews, done=False):
+        """Count reviews saved for one listing of a film; done once the listing was crawled to the end."""
+        with self._lock:
+            film = self._state["films"].setdefault(link, {"roles": {}, "done": False})
+            progress = film["roles"].setdefault(role, {"reviews": 0, "done": False})
+            progress["reviews"] += reviews
+            progress["done"] = progress["done"] or done
+            self._dirty = True
+        self.save()
+
+    def finish_film(self, link):
+        with self._lock:
+            self._state["films"].setdefault(link, {"roles": {}, "done": False})["done"] = True
+            self._dirty = True
+        self.save()
+
+    def save(self, force=False):
+        """Write the state if it changed and `interval` seconds have passed since the last write, or if force."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._saved_at < self.interval):
+                return
+            self._state["updated_at"] = datetime.now(timezone.utc).isoformat()
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2, ensure_ascii=False)
+            os.replace(self.path + ".tmp", self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
@@ -0,0 +1,49 @@
+from selenium.common.exceptions import WebDriverException
+
+# Hàm dùng chung cho các script trích xuất; text() giống html_parse.text() (text_content().strip() của lxml)
+DOM_HELPERS = """
+function first(root, selector) { return root ? root.querySelector(selector) : null; }
+function text(root, selector) {
+    var element = first(root, selector);
+    return element ? element.textContent.trim() : null;
+}
+function orElse(value, fallback) { return value === null ? fallback : value; }
+"""
+
+
+class DomReviewReader:
+    """
+    Read review records straight from the page with a site's extraction script.
+
+    The script gets the number of review cards already read as arguments[0] (then `args`) and
+    returns {"movie_name", "reviews": [one record per card from there on]}, or null when the
+    page does not have the expected structure. Each read() is one execute_script round trip
+    that only transfers the reviews added since the previous one, instead of serializing and
+    parsing the whole page. Once a read fails, read() returns None and the crawler falls back
+    to parsing the page source with lxml.
+    """
+
+    def __init__(self, browser, script, *args):
+        self.browser = browser
+        self.script = DOM_HELPERS + script
+        self.args = args
+        self.offset = 0
+        self.movie_name = None
+        self.failed = False
+
+    def read(self):
+        """Records of the review cards added since the previous call, or None if in-browser extraction failed."""
+        if self.failed:
+            return None
+        try:
+            page = self.browser.execute_script(self.script, self.offset, *self.args)
+        except WebDriverException as e:
+            print(f"In-browser extraction failed: {e}")
+            page = None
+        if not page:
+            print("Falling back to parsing the page source.")
+            self.failed = True
+            return None
+        self.movie_name = page["movie_name"]
+        self.offset += len(page["reviews"])
+        return page["reviews"]
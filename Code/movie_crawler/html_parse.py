@@ -0,0 +1,44 @@
+import lxml.html
+from lxml import etree
+
+# Parser dùng chung; lxml.html giữ cả thẻ lạ như <score-icon-critics>
+HTML_PARSER = lxml.html.HTMLParser()
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def parse_html(html: str) -> lxml.html.HtmlElement:
+    """
+    Parse a page into an lxml.html document, the page type every crawler extracts from.
+
+    A blank page gives an empty document rather than an error, so selectors just find nothing.
+    """
+    if not html or not html.strip():
+        return lxml.html.document_fromstring("<html></html>", parser=HTML_PARSER)
+    try:
+        return lxml.html.document_fromstring(html, parser=HTML_PARSER)
+    except ValueError:
+        # lxml không nhận chuỗi unicode có khai báo <?xml encoding=...?>
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=UTF8_HTML_PARSER)
+
+
+def has_class(name: str) -> str:
+    """XPath predicate for elements with the CSS class name among their classes, like .name in CSS."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def selector(path: str) -> etree.XPath:
+    """Compile an XPath once; call the result with an element to get the list of matches."""
+    return etree.XPath(path)
+
+
+def first(select: etree.XPath, element):
+    """First match of a compiled selector under element, or None (also when element is None)."""
+    if element is None:
+        return None
+    matches = select(element)
+    return matches[0] if matches else None
+
+
+def text(element, default=None):
+    """Stripped text of element and its descendants, or default if there is no element."""
+    return element.text_content().strip() if element is not None else default
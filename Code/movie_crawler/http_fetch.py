@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .browser_pool import USER_AGENT
+from .html_parse import parse_html
+from .page_archive import shared_page_archive
+from .rate_limit import shared_rate_limiter
+
+HTTP = "http"
+BROWSER = "browser"
+HTTP_TIMEOUT = 20
+HTTP_POOL_SIZE = 10
+HTTP_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    # IMDb dịch tiêu đề theo ngôn ngữ; giữ tiếng Anh như trình duyệt
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def new_http_session(pool_size=HTTP_POOL_SIZE) -> requests.Session:
+    """A keep-alive session with a connection pool of pool_size per host and retries on connection errors."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+
+class PageFetcher:
+    """
+    Fetch pages over plain HTTP first, and remember per site which pages need a browser.
+
+    Pages are fetched with a keep-alive requests.Session and parsed into lxml.html documents
+    (see html_parse). A page is only used when usable(page) says its selectors matched; otherwise the crawler loads it in
+    Chrome. Modes are kept per (host, kind), where kind names a type of page such as
+    "reviews" or "film_list". Once the browser worked where plain HTTP did not, later
+    pages of that kind go straight to the browser. With modes_file the modes survive restarts.
+    With a rate_limiter, every request first waits for a slot of its domain. With an archive
+    (PageArchive), every usable page is kept there for re-parsing offline.
+    """
+
+    def __init__(self, session=None, timeout=HTTP_TIMEOUT, modes_file=None, rate_limiter=None, archive=None):
+        self.session = session or new_http_session()
+        self.rate_limiter = rate_limiter
+        self.archive = archive
+        self.timeout = timeout
+        self.modes_file = modes_file
+        self._lock = threading.Lock()
+        self._modes = {}
+        self._counts = Counter()
+        if modes_file and os.path.exists(modes_file):
+            with open(modes_file, "r", encoding="utf-8") as f:
+                self._modes = json.load(f)
+
+    @staticmethod
+    def site_key(url, kind):
+        return f"{urlsplit(url).netloc} {kind}"
+
+    def mode(self, url, kind) -> str:
+        with self._lock:
+            return self._modes.get(self.site_key(url, kind), HTTP)
+
+    def remember(self, url, kind, mode):
+        key = self.site_key(url, kind)
+        with self._lock:
+            previous = self._modes.get(key)
+            if previous == mode:
+                return
+            self._modes[key] = mode
+            modes = dict(self._modes)
+        if previous is not None or mode != HTTP:
+            print(f"Fetching {key} pages with {mode} from now on")
+        if self.modes_file:
+            with open(self.modes_file, "w", encoding="utf-8") as f:
+                json.dump(modes, f, indent=2)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def fetch_html(self, url):
+        """HTML of url over plain HTTP, or None if the request fails or is not answered with a 200 HTML page."""
+        if self.rate_limiter:
+            self.rate_limiter.wait(url)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"HTTP fetch of {url} failed: {e}")
+            return None
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", ""):
+            print(f"HTTP fetch of {url} returned {response.status_code}")
+            return None
+        return response.text
+
+    def archive_page(self, url, html, kind, role=None, mode=HTTP):
+        if self.archive is not None:
+            self.archive.store(url, html, kind, role, mode)
+
+    def get(self, url, kind, usable, role=None):
+        """
+        Parse url fetched over plain HTTP, if pages of this kind do not need a browser.
+
+        Returns:
+            HtmlElement | None: The page if usable(page) is truthy, else None and the page should
+            be loaded in the browser (then call remember(url, kind, BROWSER) if that worked).
+        """
+        if self.mode(url, kind) == BROWSER:
+            self._count("browser_direct")
+            return None
+        html = self.fetch_html(url)
+        page = parse_html(html) if html is not None else None
+        if page is None or not usable(page):
+            self._count("http_unusable")
+            return None
+        self._count("http_pages")
+        self.remember(url, kind, HTTP)
+        self.archive_page(url, html, kind, role)
+        return page
+
+    def page(self, url, kind, usable, load_in_browser, role=None):
+        """
+        Parse url over plain HTTP, or from load_in_browser() (the page source) when that does not work.
+
+        If the browser page is usable where plain HTTP was not, pages of this kind go straight
+        to the browser from then on.
+        """
+        page = self.get(url, kind, usable, role)
+        if page is not None:
+            return page
+        html = load_in_browser()
+        page = parse_html(html)
+        self._count("browser_pages")
+        if usable(page):
+            self.remember(url, kind, BROWSER)
+            self.archive_page(url, html, kind, role, BROWSER)
+        return page
+
+    def metrics(self):
+        """Pages served over HTTP, pages that did not work over HTTP, and pages sent straight to the browser."""
+        with self._lock:
+            return {"modes": dict(self._modes), **self._counts}
+
+
+_shared_fetcher = None
+_shared_fetcher_lock = threading.Lock()
+
+def shared_page_fetcher() -> PageFetcher:
+    """The process-wide fetcher, so every crawler shares the HTTP connections and the mode of each site."""
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = PageFetcher(
+                modes_file=os.getenv("FETCH_MODES_FILE") or None, rate_limiter=shared_rate_limiter(),
+                archive=shared_page_archive(),
+            )
+        return _shared_fetcher
@@ -1,205 +1,361 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from lxml.html import HtmlElement
 import os
+from .browser_pool import BrowserPool, shared_browser_pool
+from .checkpoint import CrawlCheckpoint
+from .http_fetch import BROWSER, PageFetcher, shared_page_fetcher
+from .incremental import contains_known, take_until_known
+from .dom_extract import DomReviewReader
+from .html_parse import first, has_class, parse_html, selector, text
+from .seen_set import canonical_url
+from .waits import MIN_WAIT_TIMEOUT, PageWaits
+
+FILM_CARD_SELECTOR = "a.ipc-title-link-wrapper"
+REVIEW_CARD_SELECTOR = "article.user-review-item"
+
+# XPath biên dịch sẵn cho extract_*: mỗi thẻ được duyệt một lần, mỗi trường chỉ tìm trong thẻ đó
+FILM_CARDS = selector(f"//a[{has_class('ipc-title-link-wrapper')}]")
+FILM_TITLE = selector("(.//h3)[1]")
+MOVIE_NAME = selector(f"((//section[{has_class('ipc-page-section')}])[1]//h2)[1]")
+REVIEW_CARDS = selector(f"//article[{has_class('user-review-item')}]")
+CARD_CONTENT = selector(f"(.//div[{has_class('ipc-list-card__content')}])[1]")
+REVIEW_TEXT = selector(f"(.//div[{has_class('ipc-html-content-inner-div')}])[1]")
+REVIEW_SCORE = selector(f"(.//span[{has_class('ipc-rating-star--rating')}])[1]")
+INLINE_ITEMS = selector(f".//li[{has_class('ipc-inline-list__item')}]")
+FIRST_LINK = selector("(.//a)[1]")
+SEE_MORE = selector(f"(//*[{has_class('chained-see-more-button')}])[1]")
+SPOILER_BUTTON = selector(f"(.//*[{has_class('review-spoiler-button')}])[1]")
+
+# Cùng các trường như extract_reviews, cho các thẻ review từ vị trí arguments[0] trở đi
+IMDB_REVIEWS_SCRIPT = """
+var movieName = text(first(document, 'section.ipc-page-section'), 'h2');
+if (movieName === null) { return null; }
+var cards = document.querySelectorAll('article.user-review-item');
+var reviews = [];
+for (var i = arguments[0]; i < cards.length; i++) {
+    var content = first(cards[i], 'div.ipc-list-card__content');
+    var items = cards[i].querySelectorAll('li.ipc-inline-list__item');
+    reviews.push({
+        review: orElse(text(content, 'div.ipc-html-content-inner-div'), 'No Review'),
+        score: orElse(text(content, 'span.ipc-rating-star--rating'), 'No Score'),
+        author_name: items.length > 0 ? orElse(text(items[0], 'a'), 'No Author') : 'No Author',
+        review_date: items.length > 1 ? items[1].textContent.trim() : null
+    });
+}
+return {movie_name: movieName, reviews: reviews};
+"""
+# Số nút spoiler đang hiện; arguments[0] = true thì bấm tất cả trong cùng lần gọi
+SPOILER_BUTTONS_SCRIPT = """
+var buttons = Array.prototype.filter.call(
+    document.querySelectorAll('.review-spoiler-button'),
+    function (button) { return button.offsetParent !== null; }
+);
+if (arguments[0]) { buttons.forEach(function (button) { button.click(); }); }
+return buttons.length;
+"""
 
 
 class IMDBCrawler:
     def __init__(
         self,
-        chromedriver_path: str = "D:/NLP/chromedriver-win64/chromedriver-win64/chromedriver.exe",
+        chromedriver_path: str = None,
+        state_file: str = "imdb_state.json",
+        pool: BrowserPool = None,
+        fetcher: PageFetcher = None,
+        resume: bool = False,
     ):
-        """Initialize the IMDBCrawler with a path to chromedriver."""
-        self.chromedriver_path = chromedriver_path
-        self.browser = None
-
-    def initialize_chrome_driver(self) -> webdriver.Chrome:
-        """Initialize and return a headless Chrome WebDriver."""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument('--ignore-certificate-errors')
-        chrome_options.add_argument('--ignore-ssl-errors')
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
+        """
+        Initialize the IMDBCrawler.
 
-        self.browser = webdriver.Chrome(
-            service=Service(self.chromedriver_path), options=chrome_options
-        )
-        return self.browser
+        Pages are fetched over plain HTTP with fetcher when possible, by default the shared one;
+        browsers are leased from pool, by default the shared pool of chromedriver_path.
+        Crawl progress is checkpointed to state_file; with resume, the previous run's progress is picked up.
+        """
+        self.state_file = state_file
+        self.checkpoint = CrawlCheckpoint(state_file, resume=resume)
+        self.pool = pool or shared_browser_pool(chromedriver_path)
+        self.fetcher = fetcher or shared_page_fetcher()
+
+    def extract_films(self, page: HtmlElement, film_list: dict, target_films: int) -> int:
+        """
+        Add the films of a parsed search page to film_list ({link: title}), up to target_films; returns how many were new.
 
-    def close_browser(self):
-        """Close the browser if it’s open."""
-        if self.browser:
-            self.browser.quit()
-            self.browser = None
+        Films are told apart by canonical link, so two films with the same title are both kept.
+        """
+        new_films_count = 0
+        known = {canonical_url(link) for link in film_list}
+        for poster_card in FILM_CARDS(page):
+            title_elem = first(FILM_TITLE, poster_card)
+            if title_elem is not None:
+                title = text(title_elem).split(".", 1)[1].strip()
+                href_value = "https://www.imdb.com" + poster_card.get("href")
+                if canonical_url(href_value) not in known:
+                    known.add(canonical_url(href_value))
+                    film_list[href_value] = title
+                    new_films_count += 1
+                    print(f"Title: {title}, Link: {href_value}")
+                    if len(film_list) >= target_films:
+                        break
+        return new_films_count
 
     def get_film_list(self, base_url: str, target_films: int = 100) -> dict:
-        """Fetch at least target_films films from IMDb by clicking '50 more' until the target is met."""
-        self.initialize_chrome_driver()
-        self.browser.get(base_url)
+        """
+        Fetch at least target_films films from IMDb by clicking '50 more' until the target is met.
 
-        # Wait for the initial list of films to load
-        WebDriverWait(self.browser, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "ipc-title-link-wrapper"))
-        )
+        Films found by an earlier run are kept in the checkpoint; a resumed run only loads more
+        if they are not enough.
+        """
+        progress = self.checkpoint.listing(base_url)
+        film_list = progress["films"]
+        if len(film_list) >= target_films or progress["done"]:
+            print(f"Resuming: {len(film_list)} films already listed.")
+            return film_list
+        if film_list:
+            print(f"Resuming with {len(film_list)} films listed after {progress['page']} loads.")
+
+        # Trang đầu có sẵn trong HTML; chỉ cần browser để bấm "50 more"
+        page = self.fetcher.get(base_url, "film_list", lambda page: first(FILM_CARDS, page) is not None)
+        if page is not None:
+            new_films_count = self.extract_films(page, film_list, target_films)
+            print(f"Load 0: Added {new_films_count} new films. Total so far: {len(film_list)}")
+            self.checkpoint.update_listing(base_url, 0, film_list)
+            if len(film_list) >= target_films:
+                self.checkpoint.save(force=True)
+                print(f"Finished crawling. Total films collected: {len(film_list)}")
+                return film_list
+            print("More films are loaded with JavaScript, opening the browser.")
+
+        exhausted = False
 
-        film_list = {}
-        load_count = 0
-
-        while len(film_list) < target_films:
-            # Parse current page content
-            soup = BeautifulSoup(self.browser.page_source, "lxml")
-            poster_cards = soup.find_all("a", class_="ipc-title-link-wrapper")
-
-            new_films_count = 0
-            for poster_card in poster_cards:
-                title_elem = poster_card.find("h3")
-                if title_elem:
-                    full_title = title_elem.text.strip()
-                    title = full_title.split(".", 1)[1].strip()
-                    href_value = "https://www.imdb.com" + poster_card["href"]
-                    if title not in film_list:
-                        film_list[title] = href_value
-                        new_films_count += 1
-                        print(f"Title: {title}, Link: {href_value}")
-                        if len(film_list) >= target_films:
-                            break
-
-            print(
-                f"Load {load_count}: Added {new_films_count} new films. Total so far: {len(film_list)}"
+        with self.pool.lease() as browser:
+            waits = PageWaits(browser, "IMDb film list")
+            waits.get(base_url)
+
+            # Wait for the initial list of films to load
+            waits.until(
+                EC.presence_of_element_located((By.CLASS_NAME, "ipc-title-link-wrapper"))
             )
 
-            if len(film_list) >= target_films:
-                break
+            load_count = 0
 
-            # Try to load more films
-            try:
-                see_more_button = WebDriverWait(self.browser, 20).until(
-                    EC.element_to_be_clickable(
-                        (By.XPATH, "//button[contains(@class, 'ipc-see-more__button')]")
-                    )
-                )
-                self.browser.execute_script(
-                    "arguments[0].scrollIntoView(true);", see_more_button
+            while len(film_list) < target_films:
+                # Parse current page content
+                new_films_count = self.extract_films(
+                    parse_html(browser.page_source), film_list, target_films
                 )
-                self.browser.execute_script("arguments[0].click();", see_more_button)
-                print(f"Clicked '50 more' (Load {load_count + 1})...")
-                time.sleep(15)  # Wait for content to load
 
-                # Scroll to bottom to ensure all content is loaded
-                last_height = self.browser.execute_script(
-                    "return document.body.scrollHeight"
+                print(
+                    f"Load {load_count}: Added {new_films_count} new films. Total so far: {len(film_list)}"
                 )
-                while True:
-                    self.browser.execute_script(
-                        "window.scrollTo(0, document.body.scrollHeight);"
+                self.checkpoint.update_listing(base_url, load_count, film_list)
+
+                if len(film_list) >= target_films:
+                    break
+
+                # Try to load more films
+                try:
+                    see_more_button = waits.until(
+                        EC.element_to_be_clickable(
+                            (By.XPATH, "//button[contains(@class, 'ipc-see-more__button')]")
+                        )
                     )
-                    time.sleep(5)
-                    new_height = self.browser.execute_script(
-                        "return document.body.scrollHeight"
+                    browser.execute_script(
+                        "arguments[0].scrollIntoView(true);", see_more_button
                     )
-                    if new_height == last_height:
+                    card_count = waits.count(FILM_CARD_SELECTOR)
+                    browser.execute_script("arguments[0].click();", see_more_button)
+                    print(f"Clicked '50 more' (Load {load_count + 1})...")
+                    # Đợi thẻ phim mới xuất hiện thay vì ngủ cố định 15 giây
+                    if waits.count_increase(FILM_CARD_SELECTOR, card_count) == card_count:
+                        print("No new films appeared after clicking '50 more'.")
+                        exhausted = True
                         break
-                    last_height = new_height
 
-                load_count += 1
-            except Exception as e:
-                print(f"Error clicking '50 more' or no more films to load: {e}")
-                break
+                    # Scroll to bottom to ensure all content is loaded
+                    waits.scroll_to_end()
 
-        self.close_browser()
+                    load_count += 1
+                except Exception as e:
+                    print(f"Error clicking '50 more' or no more films to load: {e}")
+                    exhausted = True
+                    break
+
+            if self.fetcher.archive is not None:
+                self.fetcher.archive_page(base_url, browser.page_source, "film_list", mode=BROWSER)
+            waits.done()
+
+        # Trang HTTP có đọc được thì vẫn cần browser để tải thêm: lần sau đi thẳng vào browser
+        if film_list:
+            self.fetcher.remember(base_url, "film_list", BROWSER)
+        self.checkpoint.update_listing(base_url, load_count, film_list, done=exhausted)
+        self.checkpoint.save(force=True)
         print(f"Finished crawling. Total films collected: {len(film_list)}")
         return film_list
 
-    def convert_to_review_url(self, movie_url: str) -> str:
-        """Convert a movie URL to its reviews URL."""
+    def convert_to_review_url(self, movie_url: str, newest_first: bool = False) -> str:
+        """Convert a movie URL to its reviews URL, optionally sorted newest first."""
         base_url = movie_url.split("?")[0] if "?" in movie_url else movie_url
-        return base_url + "reviews/"
-
-    def get_reviews(self, url: str) -> list:
-        """Fetch reviews for a specific movie from IMDb."""
-        self.initialize_chrome_driver()
-        self.browser.get(url)
-        print(f"Opening URL: {url.split('reviews')[0]}")
+        review_url = base_url + "reviews/"
+        if newest_first:
+            review_url += "?sort=submission_date&dir=desc"
+        return review_url
 
-        time.sleep(3)
-
-        # Click "See More" to get all reviews
-        have_more_reviews = True
-        while have_more_reviews:
-            try:
-                span_element = WebDriverWait(self.browser, 10).until(
-                    EC.presence_of_element_located(
-                        (By.CLASS_NAME, "chained-see-more-button")
-                    )
-                )
-                button_inside_span = span_element.find_element(
-                    By.CLASS_NAME, "ipc-see-more__button"
-                )
-                self.browser.execute_script("arguments[0].click();", button_inside_span)
-                time.sleep(5)
-            except:
-                have_more_reviews = False
-                print("Không tìm thấy nút 'See More', có thể đã tải hết reviews.")
-
-        # Open all spoiler comments
-        spoiler_buttons = self.browser.find_elements(
-            By.CLASS_NAME, "review-spoiler-button"
-        )
-        for button in spoiler_buttons:
-            if button.is_displayed():
-                self.browser.execute_script("arguments[0].click();", button)
-                time.sleep(1)
-
-        # Extract HTML after opening spoilers
-        soup = BeautifulSoup(self.browser.page_source, "html.parser")
-        
-        movie_name = soup.find("section", class_="ipc-page-section").find("h2").text.strip()
-        # Extract reviews
+    def extract_reviews(self, page: HtmlElement, url: str) -> list:
+        """Extract review dicts from a parsed IMDb reviews page."""
+        movie_name_elem = first(MOVIE_NAME, page)
+        if movie_name_elem is None:
+            raise ValueError(f"No movie title on {url}")
+        movie_name = text(movie_name_elem)
         reviews = []
-        for review_card in soup.find_all("article", class_="user-review-item"):
-            # Get review content
-            review = review_card.find("div", class_="ipc-list-card__content")
-            content_elem = review.find("div", class_="ipc-html-content-inner-div")
-            content = content_elem.text.strip() if content_elem else "No Review"
-
-            # Get review score
-            score_elem = review.find("span", class_="ipc-rating-star--rating")
-            score = score_elem.text.strip() if score_elem else "No Score"
-
-            review_author = review_card.find_all("li", class_="ipc-inline-list__item")
-            author = (
-                review_author[0].find("a").text.strip()
-                if len(review_author) > 0
-                else "No Author"
-            )
-            date = (
-                review_author[1].text.strip() if len(review_author) > 1 else None
-            )
+        for review_card in REVIEW_CARDS(page):
+            # Get review content and score
+            review = first(CARD_CONTENT, review_card)
+            content = text(first(REVIEW_TEXT, review), "No Review")
+            score = text(first(REVIEW_SCORE, review), "No Score")
+
+            review_author = INLINE_ITEMS(review_card)
+            author = text(first(FIRST_LINK, review_author[0]), "No Author") if review_author else "No Author"
+            date = text(review_author[1]) if len(review_author) > 1 else None
 
             reviews.append(
                 {
                     "movie_name": movie_name,
                     "review": content,
                     "score": score,
-                    "link": url.split("?")[0] if "?" in url else url.split("reviews")[0],
+                    "link": url.split("reviews")[0],
                     "author_name": author,
                     "review_date": date,
                 }
             )
-            
-
-        self.close_browser()
         return reviews
 
+    def review_from_record(self, record: dict, movie_name: str, url: str) -> dict:
+        """Build the same review dict as extract_reviews from a record of IMDB_REVIEWS_SCRIPT."""
+        return {
+            "movie_name": movie_name,
+            "review": record["review"],
+            "score": record["score"],
+            "link": url.split("reviews")[0],
+            "author_name": record["author_name"],
+            "review_date": record["review_date"],
+        }
+
+    def open_spoilers(self, browser, waits: PageWaits):
+        """Click every visible spoiler button in one call and wait until their reviews are shown."""
+        if browser.execute_script(SPOILER_BUTTONS_SCRIPT, True):
+            try:
+                waits.until(
+                    lambda driver: driver.execute_script(SPOILER_BUTTONS_SCRIPT, False) == 0,
+                    timeout=MIN_WAIT_TIMEOUT,
+                )
+            except TimeoutException:
+                print("Some spoilers did not open.")
+
+    def read_new_reviews(self, browser, waits: PageWaits, reader: DomReviewReader, url: str, read_before: int) -> list:
+        """
+        The reviews added to the page since the previous read, the first read_before being read already.
+
+        Falls back to parsing the whole page with extract_reviews if in-browser extraction fails.
+        """
+        self.open_spoilers(browser, waits)
+        records = reader.read()
+        if records is None:
+            return self.extract_reviews(parse_html(browser.page_source), url)[read_before:]
+        return [self.review_from_record(record, reader.movie_name, url) for record in records]
+
+    def is_reviews_page(self, page: HtmlElement) -> bool:
+        """Whether a page has the movie title that extract_reviews needs."""
+        return first(MOVIE_NAME, page) is not None
+
+    def needs_browser(self, page: HtmlElement, reviews: list, stop_when=None) -> bool:
+        """Whether reviews wanted are missing from the HTML: more behind 'See More', or spoilers still collapsed."""
+        more_wanted = first(SEE_MORE, page) is not None and not contains_known(reviews, stop_when)
+        collapsed_spoilers = any(
+            first(SPOILER_BUTTON, card) is not None and first(REVIEW_TEXT, card) is None
+            for card in REVIEW_CARDS(page)
+        )
+        return bool(more_wanted or collapsed_spoilers)
+
+    def iter_reviews(self, url: str, stop_when=None):
+        """
+        Yield the reviews of a movie on IMDb as they are loaded, so they can be saved while more load.
+
+        If stop_when is given, the page should be sorted newest first: loading stops at the
+        first review for which stop_when returns True, which is not yielded.
+        """
+        # Trang đầu đủ khi phim ít review hoặc khi lần crawl lại đã gặp review cũ ngay trên đó
+        page = self.fetcher.get(url, "reviews", self.is_reviews_page, role="user")
+        if page is not None:
+            reviews = self.extract_reviews(page, url)
+            if not self.needs_browser(page, reviews, stop_when):
+                yield from take_until_known(reviews, stop_when)
+                return
+            print("More reviews are loaded with JavaScript, opening the browser.")
+
+        read_count = 0
+        with self.pool.lease() as browser:
+            waits = PageWaits(browser, f"IMDb reviews {url.split('reviews')[0]}")
+            waits.get(url)
+            print(f"Opening URL: {url.split('reviews')[0]}")
+
+            try:
+                waits.until(EC.presence_of_element_located((By.CSS_SELECTOR, REVIEW_CARD_SELECTOR)))
+            except TimeoutException:
+                print("No reviews appeared on the page.")
+
+            reader = DomReviewReader(browser, IMDB_REVIEWS_SCRIPT)
+
+            # Click "See More" to get all reviews; the reviews of each load are passed on right away
+            have_more_reviews = True
+            reached_known = False
+            while not reached_known:
+                new_reviews = self.read_new_reviews(browser, waits, reader, url, read_count)
+                read_count += len(new_reviews)
+                for review in new_reviews:
+                    if stop_when is not None and stop_when(review):
+                        print("Reached reviews saved by a previous crawl, stop loading more.")
+                        reached_known = True
+                        break
+                    yield review
+                if reached_known or not have_more_reviews:
+                    break
+                try:
+                    span_element = waits.until(
+                        EC.presence_of_element_located(
+                            (By.CLASS_NAME, "chained-see-more-button")
+                        )
+                    )
+                    button_inside_span = span_element.find_element(
+                        By.CLASS_NAME, "ipc-see-more__button"
+                    )
+                    review_count = waits.count(REVIEW_CARD_SELECTOR)
+                    browser.execute_script("arguments[0].click();", button_inside_span)
+                    if waits.count_increase(REVIEW_CARD_SELECTOR, review_count) == review_count:
+                        have_more_reviews = False
+                        print("Không có review mới sau khi bấm 'See More', có thể đã tải hết reviews.")
+                except:
+                    have_more_reviews = False
+                    print("Không tìm thấy nút 'See More', có thể đã tải hết reviews.")
+
+            if self.fetcher.archive is not None:
+                self.fetcher.archive_page(url, browser.page_source, "reviews", "user", BROWSER)
+            waits.done()
+
+        # Trang HTTP có đọc được thì vẫn cần browser để tải thêm: lần sau đi thẳng vào browser
+        if read_count:
+            self.fetcher.remember(url, "reviews", BROWSER)
+
+    def get_reviews(self, url: str, stop_when=None) -> list:
+        """
+        Fetch reviews for a specific movie from IMDb.
+
+        If stop_when is given, the page should be sorted newest first: loading stops once a
+        review for which stop_when returns True is on the page, and only the reviews listed
+        before it are returned.
+        """
+        return list(self.iter_reviews(url, stop_when))
 
 if __name__ == "__main__":
     crawler = IMDBCrawler()
@@ -0,0 +1,20 @@
+def take_until_known(reviews: list, stop_when) -> list:
+    """
+    Return the reviews listed before the first one stop_when recognizes.
+
+    Review pages are read newest-first, so everything after the first already-stored
+    review was saved by an earlier crawl.
+    """
+    if stop_when is None:
+        return reviews
+    new_reviews = []
+    for review in reviews:
+        if stop_when(review):
+            break
+        new_reviews.append(review)
+    return new_reviews
+
+
+def contains_known(reviews: list, stop_when) -> bool:
+    """Check whether any of the reviews loaded so far was stored by an earlier crawl."""
+    return stop_when is not None and any(stop_when(review) for review in reviews)
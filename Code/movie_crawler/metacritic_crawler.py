@@ -1,115 +1,146 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-from bs4 import BeautifulSoup
+from lxml.html import HtmlElement
 import json
 import os
+from .browser_pool import BrowserPool, shared_browser_pool
+from .checkpoint import CrawlCheckpoint
+from .html_parse import first, has_class, parse_html, selector, text
+from .seen_set import canonical_url
+from .http_fetch import BROWSER, PageFetcher, shared_page_fetcher
+from .incremental import take_until_known
+from .waits import PageWaits
+
+# XPath biên dịch sẵn cho extract_*: mỗi thẻ được duyệt một lần, mỗi trường chỉ tìm trong thẻ đó
+MOVIE_CARDS = selector(f"//a[{has_class('c-finderProductCard_container')}]")
+MOVIE_SCORE = selector(f"(.//div[{has_class('c-siteReviewScore_background')}])[1]")
+MOVIE_TITLE = selector("(.//h3)[1]")
+TITLE_SPANS = selector(".//span")
+MOVIE_NAME = selector(f"(//a[{has_class('c-productSubpageHeader_back')}])[1]")
+NO_REVIEWS_MESSAGE = selector(f"(//*[{has_class('c-pageProductReviews_message')}])[1]")
+REVIEW_CARDS = selector(f"//div[{has_class('c-siteReview')}]")
+REVIEW_BODY = selector(f"(.//div[{has_class('c-siteReview_main')}])[1]")
+REVIEW_SCORE = selector(f"(.//div[{has_class('c-siteReviewHeader_reviewScore')}])[1]")
+REVIEW_QUOTE = selector(f"(.//div[{has_class('c-siteReview_quote')}])[1]")
+REVIEW_DATE = selector(
+    f"((.//div[{has_class('c-siteReviewHeader')}])[1]//div[{has_class('c-siteReviewHeader_reviewDate')}])[1]"
+)
+FIRST_SPAN = selector("(.//span)[1]")
+AUTHOR_LINK = {
+    "critic": selector(f"(.//a[{has_class('c-siteReview_criticName')}])[1]"),
+    "user": selector(f"(.//a[{has_class('c-siteReviewHeader_username')}])[1]"),
+}
+AUTHOR_SPAN = {
+    "critic": selector(f"(.//span[{has_class('c-siteReview_criticName')}])[1]"),
+    "user": selector(f"(.//span[{has_class('c-siteReviewHeader_username')}])[1]"),
+}
 
 
 class MetacriticCrawler:
     def __init__(
         self,
-        chromedriver_path: str = "D:/NLP/chromedriver-win64/chromedriver-win64/chromedriver.exe",
+        chromedriver_path: str = None,
         state_file: str = "metacritic_state.json",
+        pool: BrowserPool = None,
+        fetcher: PageFetcher = None,
+        resume: bool = False,
     ):
-        """Initialize the MetacriticCrawler with chromedriver path and state file."""
-        self.chromedriver_path = chromedriver_path
+        """
+        Initialize the MetacriticCrawler.
+
+        Pages are fetched over plain HTTP with fetcher when possible, by default the shared one;
+        browsers are leased from pool, by default the shared pool of chromedriver_path.
+        Crawl progress is checkpointed to state_file; with resume, the previous run's progress is picked up.
+        """
         self.state_file = state_file
-        self.browser = None
-
-    def initialize_chrome_driver(self) -> webdriver.Chrome:
-        """Initialize and return a Chrome WebDriver."""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--headless")  # Uncomment if you want headless mode
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
-        chrome_options.add_argument('--ignore-certificate-errors')
-        chrome_options.add_argument('--ignore-ssl-errors')
-        chrome_options.add_argument("--allow-insecure-localhost")
+        self.checkpoint = CrawlCheckpoint(state_file, resume=resume)
+        self.pool = pool or shared_browser_pool(chromedriver_path)
+        self.fetcher = fetcher or shared_page_fetcher()
 
-        driver = webdriver.Chrome(
-            service=Service(self.chromedriver_path), options=chrome_options
-        )
-        driver.set_page_load_timeout(300)
-        self.browser = driver
-        return self.browser
+    def load_in_browser(self, url: str, class_name: str) -> str:
+        """Page source of url once an element of class_name is on it, retrying once after 10 seconds."""
+        with self.pool.lease() as browser:
+            waits = PageWaits(browser, f"Metacritic {url}")
+            try:
+                waits.get(url)
+                waits.until(EC.presence_of_element_located((By.CLASS_NAME, class_name)))
+            except Exception as e:
+                print(f"Error loading {url}: {e}. Retrying in 10 seconds...")
+                time.sleep(10)
+                waits.get(url)
+                waits.until(EC.presence_of_element_located((By.CLASS_NAME, class_name)))
+            page_source = browser.page_source
+            waits.done()
+        return page_source
 
-    def close_browser(self):
-        """Close the browser if it’s open."""
-        if self.browser:
-            self.browser.quit()
-            self.browser = None
+    def extract_movies(self, page: HtmlElement, movie_list: dict, min_movies: int) -> int:
+        """
+        Add the scored movies of a parsed browse page to movie_list ({link: title}), up to min_movies; returns how many were new.
+
+        Movies are told apart by canonical link, so two movies with the same title are both kept.
+        """
+        new_movies_count = 0
+        known = {canonical_url(link) for link in movie_list}
+        for poster_card in MOVIE_CARDS(page):
+            if first(MOVIE_SCORE, poster_card) is not None:
+                href_value = "https://www.metacritic.com" + poster_card.get("href")
+                title_elem = first(MOVIE_TITLE, poster_card)
+                spans = TITLE_SPANS(title_elem) if title_elem is not None else []
+                if spans:
+                    title = text(spans[1] if len(spans) > 1 else spans[0])
+                    if canonical_url(href_value) not in known:  # Avoid duplicates
+                        known.add(canonical_url(href_value))
+                        movie_list[href_value] = title
+                        new_movies_count += 1
+                        print(f"Title: {title}, Link: {href_value}")
+                        if(len(movie_list) >= min_movies):
+                            break
+        return new_movies_count
 
     def get_movie_list(
         self, base_url: str, start_page: int = 1, min_movies: int = 100
     ) -> dict:
-        """Fetch a list of movies from Metacritic until at least min_movies are collected."""
-        movie_list = {}
-        page = start_page
+        """
+        Fetch a list of movies from Metacritic until at least min_movies are collected.
+
+        A resumed run keeps the movies of the checkpoint and goes on from the page after the last one read.
+        """
+        progress = self.checkpoint.listing(base_url)
+        movie_list = progress["films"]
+        page = max(start_page, progress["page"] + 1)
+        if movie_list:
+            print(f"Resuming with {len(movie_list)} movies listed, from page {page}.")
+        if progress["done"]:
+            return movie_list
 
         while len(movie_list) < min_movies:
-            self.initialize_chrome_driver()
             url = base_url + str(page)
             print(f"Crawling page {page}: {url}")
 
-            try:
-                self.browser.get(url)
-                WebDriverWait(self.browser, 20).until(
-                    EC.presence_of_element_located(
-                        (By.CLASS_NAME, "c-finderProductCard_container")
-                    )
-                )
-            except Exception as e:
-                print(f"Error loading page {page}: {e}. Retrying in 10 seconds...")
-                time.sleep(10)
-                self.browser.get(url)
-                WebDriverWait(self.browser, 20).until(
-                    EC.presence_of_element_located(
-                        (By.CLASS_NAME, "c-finderProductCard_container")
-                    )
-                )
-
-            soup = BeautifulSoup(self.browser.page_source, "lxml")
-            poster_cards = soup.find_all("a", class_="c-finderProductCard_container")
-
-            new_movies_count = 0
-            for poster_card in poster_cards:
-                if poster_card and poster_card.find(
-                    "div", class_="c-siteReviewScore_background"
-                ):
-                    href_value = "https://www.metacritic.com" + poster_card["href"]
-                    title_elem = poster_card.find("h3")
-                    if title_elem:
-                        spans = title_elem.find_all("span")
-                        if len(spans) > 1:
-                            title = spans[1].text.strip()
-                        else:
-                            title = spans[0].text.strip()
-                        if title not in movie_list:  # Avoid duplicates
-                            movie_list[title] = href_value
-                            new_movies_count += 1
-                            print(f"Title: {title}, Link: {href_value}")
-                            if(len(movie_list) >= min_movies):
-                                break
-
-            self.close_browser()
+            # Trang danh sách là HTML tĩnh; chỉ mở browser khi HTTP không dùng được
+            movie_page = self.fetcher.page(
+                url,
+                "movie_list",
+                usable=lambda page: first(MOVIE_CARDS, page) is not None,
+                load_in_browser=lambda: self.load_in_browser(url, "c-finderProductCard_container"),
+            )
+            new_movies_count = self.extract_movies(movie_page, movie_list, min_movies)
+
             print(
                 f"Found {new_movies_count} new movies on page {page}. Total so far: {len(movie_list)}"
             )
 
             if new_movies_count == 0:  # No new movies found, end of list
                 print(f"No new movies found on page {page}. Stopping crawl.")
+                self.checkpoint.update_listing(base_url, page, movie_list, done=True)
                 break
 
+            # Trang dừng giữa chừng vì đủ min_movies chưa được đọc hết, lần resume sau đọc lại trang đó
+            self.checkpoint.update_listing(base_url, page if len(movie_list) < min_movies else page - 1, movie_list)
             page += 1  # Move to the next page
 
+        self.checkpoint.save(force=True)
         print(f"Finished crawling. Total movies collected: {len(movie_list)}")
         return movie_list
 
@@ -122,60 +153,43 @@ class MetacriticCrawler:
                 
         return res
 
-    def get_reviews(self, review_url: str, role: str) -> list:
-        """Fetch critic reviews for a specific movie from Metacritic."""
-        self.initialize_chrome_driver()
+    def newest_first_url(self, review_url: str, role: str) -> str:
+        """Sort a review listing by date, newest first, using the site's own sort option."""
+        sort_by = "Publication%20Date" if role == "critic" else "Recently%20Added"
+        return f"{review_url.split('?')[0]}?sort-by={sort_by}"
 
-        word_split = "critic-reviews" if role == "critic" else "user-reviews"
-        movie_url = review_url.split(word_split)[0]
-        print(f"Crawling reviews for: {movie_url}")
+    def is_reviews_page(self, page: HtmlElement) -> bool:
+        """Whether a page has the movie header and either review cards or the 'no reviews yet' message."""
+        return first(MOVIE_NAME, page) is not None and (
+            first(REVIEW_CARDS, page) is not None or first(NO_REVIEWS_MESSAGE, page) is not None
+        )
 
-        try:
-            self.browser.get(review_url)
-            WebDriverWait(self.browser, 20).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "c-siteReview_main"))
-            )
-        except Exception as e:
-            if WebDriverWait(self.browser, 20).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "c-pageProductReviews_message"))
-            ):
-                print(f"There are no {role} reviews yet")
-                self.close_browser()
-                return []
-
-        soup = BeautifulSoup(self.browser.page_source, "lxml")
-        movie_name = soup.find("a", class_="c-productSubpageHeader_back").text.strip()
+    def extract_reviews(self, page: HtmlElement, review_url: str, role: str) -> list:
+        """Extract review dicts from a parsed Metacritic reviews page."""
+        movie_url = review_url.split("critic-reviews" if role == "critic" else "user-reviews")[0]
+        movie_name_elem = first(MOVIE_NAME, page)
+        if movie_name_elem is None:
+            raise ValueError(f"No movie header on {review_url}")
+        movie_name = text(movie_name_elem)
+        author_role = "critic" if role == "critic" else "user"
         reviews = []
-        review_cards = soup.find_all("div", class_="c-siteReview")
+        review_cards = REVIEW_CARDS(page)
 
         if not review_cards:
             print(f"No reviews found for '{movie_name}'.")
-            self.close_browser()
             return reviews
 
         for review_card in review_cards:
-            body = review_card.find("div", class_="c-siteReview_main")
-            score_card = body.find("div", class_="c-siteReviewHeader_reviewScore")
-            score = score_card.find("span").text.strip() if score_card else "N/A"
-
-            comment_card = body.find("div", class_="c-siteReview_quote")
-            comment = (
-                comment_card.find("span").text.strip()
-                if comment_card
-                else "No review text"
-            )
+            body = first(REVIEW_BODY, review_card)
+            score = text(first(FIRST_SPAN, first(REVIEW_SCORE, body)), "N/A")
+            comment = text(first(FIRST_SPAN, first(REVIEW_QUOTE, body)), "No review text")
+            date = text(first(REVIEW_DATE, body))
+
+            author_elem = first(AUTHOR_LINK[author_role], review_card)
+            if author_elem is None:
+                author_elem = first(AUTHOR_SPAN[author_role], review_card)
+            author = text(author_elem, "")[3:]
 
-            date = body.find("div", class_="c-siteReviewHeader").find("div", class_="c-siteReviewHeader_reviewDate").text.strip()
-            
-            try:
-                author = review_card.find(
-                    "a", class_="c-siteReview_criticName" if role == "critic" else "c-siteReviewHeader_username"
-                ).text.strip()[3:]
-            except AttributeError:
-                author = review_card.find(
-                    "span", class_="c-siteReview_criticName" if role == "critic" else "c-siteReviewHeader_username"
-                ).text.strip()[3:]
-                
             review = {
                 "movie_name": movie_name,
                 "review": comment,
@@ -190,9 +204,52 @@ class MetacriticCrawler:
                 f"Review for '{movie_name}': Score={score}, Comment={comment}, Link={review_url}, Author={author}, Date={date}"
             )
 
-        self.close_browser()
         return reviews
 
+    def get_reviews(self, review_url: str, role: str, stop_when=None) -> list:
+        """
+        Fetch critic reviews for a specific movie from Metacritic.
+
+        If stop_when is given, the listing should be sorted newest first (see newest_first_url):
+        only the reviews listed before the first one for which stop_when returns True are returned.
+        """
+        word_split = "critic-reviews" if role == "critic" else "user-reviews"
+        movie_url = review_url.split(word_split)[0]
+        print(f"Crawling reviews for: {movie_url}")
+
+        # Trang review của Metacritic có đủ nội dung trong HTML, không cần JavaScript
+        page = self.fetcher.get(review_url, "reviews", self.is_reviews_page, role=role)
+        if page is None:
+            # Chỉ giữ browser trong lúc tải trang; phân tích HTML không cần đến nó
+            with self.pool.lease() as browser:
+                waits = PageWaits(browser, f"Metacritic {role} reviews {movie_url}")
+                try:
+                    waits.get(review_url)
+                    waits.until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "c-siteReview_main"))
+                    )
+                except Exception as e:
+                    if waits.until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "c-pageProductReviews_message"))
+                    ):
+                        print(f"There are no {role} reviews yet")
+                        return []
+                page_source = browser.page_source
+                waits.done()
+            page = parse_html(page_source)
+            if self.is_reviews_page(page):
+                self.fetcher.remember(review_url, "reviews", BROWSER)
+                self.fetcher.archive_page(review_url, page_source, "reviews", role, BROWSER)
+        elif first(REVIEW_CARDS, page) is None:
+            print(f"There are no {role} reviews yet")
+            return []
+
+        return take_until_known(self.extract_reviews(page, review_url, role), stop_when)
+
+    def iter_reviews(self, review_url: str, role: str, stop_when=None):
+        """Yield the reviews of get_reviews; a Metacritic listing is one page, so they all come from one load."""
+        yield from self.get_reviews(review_url, role, stop_when)
+
 
 if __name__ == "__main__":
     crawler = MetacriticCrawler()
@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+INDEX_FILE = "index.jsonl"
+
+
+class PageArchive:
+    """
+    Keep every page the crawlers parse, gzip-compressed and addressed by content, for re-parsing offline.
+
+    Layout under root:
+
+        pages/3f/3f9a...e1.html.gz   the page, named by the sha256 of its HTML
+        index.jsonl                  one line per fetch: {"sha256", "url", "kind", "role", "mode", "fetched_at"}
+
+    A page fetched again unchanged is stored once and only gets another index line. kind is
+    the page type of PageFetcher ("reviews", "film_list", "movie_list"), mode is how it was
+    fetched ("http" or "browser"). Pages are written to a temporary file that replaces the
+    final one, so the archive stays readable if the crawler dies mid-write.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "pages"), exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, "pages", digest[:2], f"{digest}.html.gz")
+
+    def store(self, url, html, kind, role=None, mode="http") -> str:
+        """Archive html fetched from url; returns its sha256."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        entry = {
+            "sha256": digest, "url": url, "kind": kind, "role": role, "mode": mode,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            with open(os.path.join(self.root, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return digest
+
+    def read(self, digest) -> str:
+        with gzip.open(self._path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def entries(self, kind=None, latest=True) -> list:
+        """
+        Index entries, oldest first, optionally of one kind only.
+
+        With latest, only the most recent fetch of each (url, role) is kept.
+        """
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return []
+        entries = {}
+        with open(path, encoding="utf-8") as f:
+            for position, line in enumerate(f):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if kind and entry["kind"] != kind:
+                    continue
+                key = (entry["url"], entry["role"]) if latest else position
+                entries.pop(key, None)
+                entries[key] = entry
+        return list(entries.values())
+
+    def export(self, directory, kind=None) -> list:
+        """
+        Write the latest archived pages as directory/<host>/<url path>/index.html, the layout of
+        movie_crawler/fixtures, so a page a crawler failed on can become a test fixture.
+
+        Returns:
+            list: Paths written.
+        """
+        paths = []
+        for entry in self.entries(kind):
+            parts = urlsplit(entry["url"])
+            path = os.path.join(directory, parts.netloc, *[part for part in parts.path.split("/") if part], "index.html")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.read(entry["sha256"]))
+            paths.append(path)
+        return paths
+
+
+def shared_page_archive():
+    """The archive under PAGE_ARCHIVE_DIR, or None when pages are not archived (the default)."""
+    root = os.getenv("PAGE_ARCHIVE_DIR")
+    return PageArchive(root) if root else None
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+
+
+class DomainRateLimiter:
+    """
+    Space out requests to each domain so that at most `rate` per second start, from any thread.
+
+    `rates` overrides the rate of some domains, e.g. {"www.imdb.com": 2.0}. Every caller
+    reserves the next free slot of the domain, so concurrent crawl tasks on the same site
+    queue up instead of bursting.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, rates=None):
+        self.rate = rate
+        self.rates = rates or {}
+        self._next_slot = {}
+        self._waited = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url) -> float:
+        """Block until a request to the domain of url may start; returns the seconds waited."""
+        domain = urlsplit(url).netloc
+        rate = self.rates.get(domain, self.rate)
+        if not rate or rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + 1 / rate
+            delay = slot - now
+            self._waited[domain] = self._waited.get(domain, 0.0) + delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def metrics(self):
+        """Seconds spent waiting for a slot, per domain."""
+        with self._lock:
+            return {domain: round(seconds, 2) for domain, seconds in self._waited.items()}
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+def shared_rate_limiter() -> DomainRateLimiter:
+    """The process-wide limiter shared by the HTTP fetcher and the browser pool; CRAWL_RATE_PER_DOMAIN requests/s (default 1)."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = DomainRateLimiter(
+                rate=float(os.getenv("CRAWL_RATE_PER_DOMAIN", str(DEFAULT_REQUESTS_PER_SECOND)))
+            )
+        return _shared_limiter
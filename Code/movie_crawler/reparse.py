@@ -0,0 +1,134 @@
+"""
+Rerun the crawlers' extraction over pages kept in a PageArchive, without network.
+
+Run from the Code directory:
+    python -m movie_crawler.reparse archive/ --output reparsed.jsonl
+    python manage.py ingest_reviews reparsed.jsonl
+
+Pages are parsed in parallel worker processes with the current extract_* methods of each
+site's crawler, so a fix to a selector can be checked against, and applied to, every page
+crawled so far. The reviews are written as JSON lines that ingest_reviews loads.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from .html_parse import parse_html
+from .imdb_crawler import IMDBCrawler
+from .metacritic_crawler import MetacriticCrawler
+from .page_archive import PageArchive
+from .rotten_crawler import RottenTomatoesCrawler
+
+CRAWLERS = {"imdb": IMDBCrawler, "rotten": RottenTomatoesCrawler, "metacritic": MetacriticCrawler}
+SOURCE_HOSTS = {"www.imdb.com": "imdb", "www.rottentomatoes.com": "rotten", "www.metacritic.com": "metacritic"}
+# Số trang mỗi lần gửi cho một process
+REPARSE_CHUNK_SIZE = 16
+
+# Mỗi process tạo crawler và mở archive một lần
+_crawlers = {}
+_archives = {}
+
+
+def source_of(url):
+    return SOURCE_HOSTS.get(urlsplit(url).netloc)
+
+
+def extract_page(source, kind, url, role, page) -> list:
+    """
+    Run the extraction of source's crawler on one parsed page.
+
+    Returns:
+        list: Raw reviews (with their role) for "reviews" pages, {"title", "link"} dicts for film lists.
+    """
+    crawler = _crawlers.get(source)
+    if crawler is None:
+        # Không mở browser hay kết nối nào: chỉ dùng các hàm extract_*
+        crawler = _crawlers[source] = CRAWLERS[source](state_file=None)
+    if kind == "reviews":
+        if source == "imdb":
+            reviews = crawler.extract_reviews(page, url)
+        else:
+            reviews = crawler.extract_reviews(page, url, role)
+        return [dict(review, role=role or review.get("role") or "user") for review in reviews]
+    films = {}
+    if source == "metacritic":
+        crawler.extract_movies(page, films, sys.maxsize)
+    else:
+        crawler.extract_films(page, films, sys.maxsize)
+    return [{"title": title, "link": link} for link, title in films.items()]
+
+
+def reparse_entry(root, entry, source=None) -> dict:
+    """Re-parse one archived page; a page the extraction fails on gets an error instead of items."""
+    source = source or source_of(entry["url"])
+    result = {
+        "url": entry["url"], "kind": entry["kind"], "role": entry["role"], "sha256": entry["sha256"],
+        "source": source, "items": [], "error": None,
+    }
+    if source not in CRAWLERS:
+        result["error"] = "unknown source"
+        return result
+    try:
+        archive = _archives.get(root) or _archives.setdefault(root, PageArchive(root))
+        page = parse_html(archive.read(entry["sha256"]))
+        result["items"] = extract_page(source, entry["kind"], entry["url"], entry["role"], page)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _quiet_worker():
+    # Các hàm extract_* in từng review; bỏ đi để log chỉ còn phần tóm tắt
+    sys.stdout = open(os.devnull, "w")
+
+
+def reparse_archive(root, kind="reviews", source=None, workers=None):
+    """
+    Yield the reparse_entry result of the latest archived fetch of every page of a kind, in archive order.
+
+    Args:
+        source (str): Crawler to use for every page; by default it follows the host of each URL.
+        workers (int): Worker processes, by default one per CPU.
+    """
+    entries = PageArchive(root).entries(kind)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as executor:
+        yield from executor.map(
+            functools.partial(reparse_entry, root, source=source), entries, chunksize=REPARSE_CHUNK_SIZE
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse archived pages with the current crawler extraction, offline.")
+    parser.add_argument("archive", help="Archive directory (PAGE_ARCHIVE_DIR of the crawl)")
+    parser.add_argument("--kind", default="reviews", choices=("reviews", "film_list", "movie_list"), help="Type of pages to re-parse")
+    parser.add_argument("--source", choices=sorted(CRAWLERS), help="Crawler to use, instead of the one of each page's host")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output", default="reparsed.jsonl", help="JSON lines file the items are written to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pages = items = empty = 0
+    failures = []
+    with open(args.output, "w", encoding="utf-8") as f:
+        for result in reparse_archive(args.archive, args.kind, args.source, args.workers):
+            pages += 1
+            if result["error"]:
+                failures.append(result)
+            elif not result["items"]:
+                empty += 1
+            for item in result["items"]:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                items += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Re-parsed {pages} pages into {items} items in {elapsed:.1f}s ({pages / elapsed if elapsed else 0:.1f} pages/s)")
+    # Trang không lỗi nhưng không ra review nào thường là dấu hiệu selector đã đổi
+    print(f"{len(failures)} pages failed, {empty} pages gave no items")
+    for result in failures[:20]:
+        print(f"  {result['url']} ({result['role'] or result['kind']}): {result['error']}")
+    print(f"Items written to {args.output}")
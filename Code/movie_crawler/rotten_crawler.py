@@ -1,8 +1,4 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import (
@@ -11,137 +7,229 @@ from selenium.common.exceptions import (
     WebDriverException,
 )
 import time
-from bs4 import BeautifulSoup
+from lxml.html import HtmlElement
 import json
 import os
 import validators
+from .browser_pool import BrowserPool, shared_browser_pool
+from .checkpoint import CrawlCheckpoint
+from .http_fetch import BROWSER, PageFetcher, shared_page_fetcher
+from .incremental import contains_known, take_until_known
+from .dom_extract import DomReviewReader
+from .html_parse import first, has_class, parse_html, selector, text
+from .seen_set import canonical_url
+from .waits import PageWaits
+
+FILM_CARD_SELECTOR = "div.flex-container"
+
+# Cùng các trường như extract_reviews, cho các thẻ review từ vị trí arguments[0] trở đi; arguments[1] là role
+ROTTEN_REVIEWS_SCRIPT = """
+var critic = arguments[1] === 'critic';
+var movieName = text(document, 'a.sidebar-title');
+if (movieName === null) { return null; }
+var cards = document.querySelectorAll(critic ? 'div.review-row' : 'div.audience-review-row');
+var nameClass = critic ? 'display-name' : 'audience-reviews__name';
+var reviews = [];
+for (var i = arguments[0]; i < cards.length; i++) {
+    var data = first(cards[i], 'div.review-data');
+    var author = text(data, 'a.' + nameClass);
+    if (author === null) { author = orElse(text(data, 'span.' + nameClass), 'No author name'); }
+    var icon = first(data, 'score-icon-critics');
+    var duration = first(cards[i], critic ? 'p.original-score-and-url' : 'p.audience-reviews__duration');
+    reviews.push({
+        author: author,
+        review: orElse(text(cards[i], critic ? 'p.review-text' : 'p.audience-reviews__review'), 'No review text'),
+        review_date: duration ? text(duration, 'span') : null,
+        sentiment: icon && icon.hasAttribute('sentiment') ? icon.getAttribute('sentiment') : 'N/A'
+    });
+}
+return {movie_name: movieName, reviews: reviews};
+"""
+
+# XPath biên dịch sẵn cho extract_*: mỗi thẻ được duyệt một lần, mỗi trường chỉ tìm trong thẻ đó
+FILM_CARDS = selector(f"//div[{has_class('flex-container')}]")
+FILM_LINK = selector("(.//a)[1]")
+FILM_SENTIMENT = selector("(.//score-icon-critics)[1]")
+FILM_TITLE = selector(f"(.//span[{has_class('p--small')}])[1]")
+MOVIE_NAME = selector(f"(//a[{has_class('sidebar-title')}])[1]")
+LOAD_MORE = selector(f"(//*[{has_class('load-more-container')}])[1]")
+REVIEW_DATA = selector(f"(.//div[{has_class('review-data')}])[1]")
+REVIEW_SENTIMENT = selector("(.//score-icon-critics)[1]")
+FIRST_SPAN = selector("(.//span)[1]")
+
+
+def review_selectors(card_class, name_class, text_class, date_class):
+    return {
+        "cards": selector(f"//div[{has_class(card_class)}]"),
+        "author_link": selector(f"(.//a[{has_class(name_class)}])[1]"),
+        "author_span": selector(f"(.//span[{has_class(name_class)}])[1]"),
+        "text": selector(f"(.//p[{has_class(text_class)}])[1]"),
+        "date": selector(f"(.//p[{has_class(date_class)}])[1]"),
+    }
+
+
+CRITIC_REVIEW = review_selectors("review-row", "display-name", "review-text", "original-score-and-url")
+USER_REVIEW = review_selectors(
+    "audience-review-row", "audience-reviews__name", "audience-reviews__review", "audience-reviews__duration"
+)
+
+
+def review_card_selector(role: str) -> str:
+    return "div.review-row" if role == "critic" else "div.audience-review-row"
 
 
 class RottenTomatoesCrawler:
     def __init__(
         self,
-        chromedriver_path: str = "D:/NLP/chromedriver-win64/chromedriver-win64/chromedriver.exe",
+        chromedriver_path: str = None,
         state_file: str = "rotten_state.json",
+        pool: BrowserPool = None,
+        fetcher: PageFetcher = None,
+        resume: bool = False,
     ):
-        """Initialize the RottenTomatoesCrawler with chromedriver path and state file."""
-        self.chromedriver_path = chromedriver_path
+        """
+        Initialize the RottenTomatoesCrawler.
+
+        Pages are fetched over plain HTTP with fetcher when possible, by default the shared one;
+        browsers are leased from pool, by default the shared pool of chromedriver_path.
+        Crawl progress is checkpointed to state_file; with resume, the previous run's progress is picked up.
+        """
         self.state_file = state_file
-        self.browser = None
-
-    def initialize_chrome_driver(self) -> webdriver.Chrome:
-        """Initialize and return a Chrome WebDriver."""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument('--ignore-certificate-errors')
-        chrome_options.add_argument('--ignore-ssl-errors')
-        # chrome_options.add_argument('--tls-v1.2')
-        # chrome_options.add_argument("--proxy-server=http://138.197.102.119:80")
-        # chrome_options.add_argument("--headless")  # Uncomment for headless mode
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
-
-        self.browser = webdriver.Chrome(
-            service=Service(self.chromedriver_path), options=chrome_options
-        )
-        return self.browser
-
-    def close_browser(self):
-        """Close the browser if it’s open."""
-        if self.browser:
-            self.browser.quit()
-            self.browser = None
+        self.checkpoint = CrawlCheckpoint(state_file, resume=resume)
+        self.pool = pool or shared_browser_pool(chromedriver_path)
+        self.fetcher = fetcher or shared_page_fetcher()
+
+    def extract_films(self, page: HtmlElement, film_list: dict, target_films: int) -> int:
+        """
+        Add the films of a parsed browse page to film_list ({link: title}), up to target_films; returns how many were new.
+
+        Films are told apart by canonical link, so two films with the same title are both kept.
+        """
+        new_films_count = 0
+        known = {canonical_url(link) for link in film_list}
+        for poster_card in FILM_CARDS(page):
+            title_elem = first(FILM_LINK, poster_card)
+            if title_elem is not None:
+                sentiment_elem = first(FILM_SENTIMENT, title_elem)
+                if sentiment_elem is not None and sentiment_elem.get("sentiment") == "empty":
+                    print("Skipping empty sentiment film.")
+                    continue
+                full_title = text(first(FILM_TITLE, title_elem))
+                if full_title is None:
+                    continue
+                href_value = "https://www.rottentomatoes.com" + title_elem.get("href")
+                if canonical_url(href_value) not in known:
+                    known.add(canonical_url(href_value))
+                    film_list[href_value] = full_title
+                    new_films_count += 1
+                    print(f"Title: {full_title}, Link: {href_value}")
+                    if len(film_list) >= target_films:
+                        break
+        return new_films_count
 
     def get_film_list(self, base_url: str, target_films: int = 100) -> dict:
-        """Fetch at least target_films films from Rotten Tomatoes by clicking 'Load More' until the target is met."""
-        self.initialize_chrome_driver()
-
-        # Load the initial page
-        flag = False
-        while not flag:
-            try:
-                self.browser.get(base_url)
-                WebDriverWait(self.browser, 20).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "flex-container"))
-                )
-                flag = True
-            except Exception as e:
-                print(f"Error loading page: {e}. Retrying in 5 seconds...")
-                time.sleep(5)
-
-        # Initialize film list (no state loading)
-        film_list = {}
-        load_count = 0
-        print(
-            f"Starting fresh: {len(film_list)} films, clicked 'Load More' {load_count} times."
-        )
-
-        while len(film_list) < target_films:
-            # Parse current page content
-            soup = BeautifulSoup(self.browser.page_source, "lxml")
-            poster_cards = soup.find_all("div", class_="flex-container")
-
-            new_films_count = 0
-            for poster_card in poster_cards:
-                title_elem = poster_card.find("a")
-                if title_elem:
-                    sentiment_elem = title_elem.find("score-icon-critics")
-                    if sentiment_elem and sentiment_elem.get("sentiment") == "empty":
-                        print("Skipping empty sentiment film.")
-                        continue
-                    full_title = title_elem.find("span", class_="p--small").text.strip()
-                    href_value = "https://www.rottentomatoes.com" + title_elem["href"]
-                    if full_title not in film_list:
-                        film_list[full_title] = href_value
-                        new_films_count += 1
-                        print(f"Title: {full_title}, Link: {href_value}")
-                        if len(film_list) >= target_films:
-                            break
-
-            print(
-                f"Load {load_count}: Added {new_films_count} new films. Total so far: {len(film_list)}"
-            )
-
+        """
+        Fetch at least target_films films from Rotten Tomatoes by clicking 'Load More' until the target is met.
+
+        Films found by an earlier run are kept in the checkpoint; a resumed run only loads more
+        if they are not enough.
+        """
+        progress = self.checkpoint.listing(base_url)
+        film_list = progress["films"]
+        if len(film_list) >= target_films or progress["done"]:
+            print(f"Resuming: {len(film_list)} films already listed.")
+            return film_list
+
+        # Trang đầu có sẵn trong HTML; chỉ cần browser để bấm "Load More"
+        page = self.fetcher.get(base_url, "film_list", lambda page: first(FILM_CARDS, page) is not None)
+        if page is not None:
+            new_films_count = self.extract_films(page, film_list, target_films)
+            print(f"Load 0: Added {new_films_count} new films. Total so far: {len(film_list)}")
+            self.checkpoint.update_listing(base_url, 0, film_list)
             if len(film_list) >= target_films:
-                break
+                self.checkpoint.save(force=True)
+                print(f"Finished crawling. Total films collected: {len(film_list)}")
+                return film_list
+            print("More films are loaded with JavaScript, opening the browser.")
+
+        exhausted = False
+
+        with self.pool.lease() as browser:
+            waits = PageWaits(browser, "Rotten Tomatoes film list")
 
-            # Try to load more films by clicking the "Load More" button
-            try:
-                load_more_button = WebDriverWait(self.browser, 20).until(
-                    EC.element_to_be_clickable(
-                        (By.XPATH, "//button[@data-qa='dlp-load-more-button']")
+            # Load the initial page
+            flag = False
+            while not flag:
+                try:
+                    waits.get(base_url)
+                    waits.until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "flex-container"))
                     )
+                    flag = True
+                except Exception as e:
+                    print(f"Error loading page: {e}. Retrying in 5 seconds...")
+                    time.sleep(5)
+
+            load_count = 0
+            if progress["films"]:
+                # "Load More" không nhảy thẳng tới lần tải trước được; phim đã có chỉ không bị thêm lại
+                print(f"Resuming with {len(progress['films'])} films listed after {progress['page']} loads.")
+            else:
+                print(
+                    f"Starting fresh: {len(film_list)} films, clicked 'Load More' {load_count} times."
                 )
-                self.browser.execute_script(
-                    "arguments[0].scrollIntoView(true);", load_more_button
+
+            while len(film_list) < target_films:
+                # Parse current page content
+                new_films_count = self.extract_films(
+                    parse_html(browser.page_source), film_list, target_films
                 )
-                self.browser.execute_script("arguments[0].click();", load_more_button)
-                print(f"Clicked 'Load More' (Load {load_count + 1})...")
-                time.sleep(15)  # Wait for content to load
 
-                # Scroll to bottom to ensure all content is loaded
-                last_height = self.browser.execute_script(
-                    "return document.body.scrollHeight"
+                print(
+                    f"Load {load_count}: Added {new_films_count} new films. Total so far: {len(film_list)}"
                 )
-                while True:
-                    self.browser.execute_script(
-                        "window.scrollTo(0, document.body.scrollHeight);"
+                self.checkpoint.update_listing(base_url, load_count, film_list)
+
+                if len(film_list) >= target_films:
+                    break
+
+                # Try to load more films by clicking the "Load More" button
+                try:
+                    load_more_button = waits.until(
+                        EC.element_to_be_clickable(
+                            (By.XPATH, "//button[@data-qa='dlp-load-more-button']")
+                        )
                     )
-                    time.sleep(5)
-                    new_height = self.browser.execute_script(
-                        "return document.body.scrollHeight"
+                    browser.execute_script(
+                        "arguments[0].scrollIntoView(true);", load_more_button
                     )
-                    if new_height == last_height:
+                    card_count = waits.count(FILM_CARD_SELECTOR)
+                    browser.execute_script("arguments[0].click();", load_more_button)
+                    print(f"Clicked 'Load More' (Load {load_count + 1})...")
+                    # Đợi thẻ phim mới xuất hiện thay vì ngủ cố định 15 giây
+                    if waits.count_increase(FILM_CARD_SELECTOR, card_count) == card_count:
+                        print("No new films appeared after clicking 'Load More'.")
+                        exhausted = True
                         break
-                    last_height = new_height
 
-                load_count += 1
-            except Exception as e:
-                print(f"Error clicking 'Load More' or no more films to load: {e}")
-                break
+                    # Scroll to bottom to ensure all content is loaded
+                    waits.scroll_to_end()
+
+                    load_count += 1
+                except Exception as e:
+                    print(f"Error clicking 'Load More' or no more films to load: {e}")
+                    exhausted = True
+                    break
+
+            if self.fetcher.archive is not None:
+                self.fetcher.archive_page(base_url, browser.page_source, "film_list", mode=BROWSER)
+            waits.done()
 
-        self.close_browser()
+        # Trang HTTP có đọc được thì vẫn cần browser để tải thêm: lần sau đi thẳng vào browser
+        if film_list:
+            self.fetcher.remember(base_url, "film_list", BROWSER)
+        self.checkpoint.update_listing(base_url, load_count, film_list, done=exhausted)
+        self.checkpoint.save(force=True)
         print(f"Finished crawling. Total films collected: {len(film_list)}")
         return film_list
 
@@ -153,22 +241,105 @@ class RottenTomatoesCrawler:
             res.append({"href": href + "reviews?type=user"})
         return res
 
-    def get_reviews(self, review_url: str, role: str = "critic") -> list:
-        """Fetch reviews for a specific movie from Rotten Tomatoes."""
+    def extract_reviews(self, page: HtmlElement, review_url: str, role: str) -> list:
+        """Extract review dicts from a parsed Rotten Tomatoes reviews page."""
+        movie_name_elem = first(MOVIE_NAME, page)
+        if movie_name_elem is None:
+            raise ValueError(f"No movie title on {review_url}")
+        movie_name = text(movie_name_elem)
+        selectors = CRITIC_REVIEW if role == "critic" else USER_REVIEW
+        reviews = []
+        review_cards = selectors["cards"](page)
+
+        if not review_cards:
+            print(f"No reviews found for '{movie_name}'.")
+            return reviews
+
+        for review_card in review_cards:
+            review_data = first(REVIEW_DATA, review_card)
+            name_elem = first(selectors["author_link"], review_data)
+            if name_elem is None:
+                name_elem = first(selectors["author_span"], review_data)
+            user_name = text(name_elem, "No author name")
+
+            sentiment_elem = first(REVIEW_SENTIMENT, review_data)
+            sentiment = sentiment_elem.get("sentiment", "N/A") if sentiment_elem is not None else "N/A"
+            comment = text(first(selectors["text"], review_card), "No review text")
+            date_elem = first(selectors["date"], review_card)
+            review_date = text(first(FIRST_SPAN, date_elem)) if date_elem is not None else None
+            review = {
+                "movie_name": movie_name,
+                "author": user_name,
+                "review": comment,
+                "link": review_url.split("reviews")[0],
+                "review_date": review_date,
+                "sentiment": sentiment,
+                "role": role,
+            }
+            reviews.append(review)
+        return reviews
+
+    def review_from_record(self, record: dict, movie_name: str, review_url: str, role: str) -> dict:
+        """Build the same review dict as extract_reviews from a record of ROTTEN_REVIEWS_SCRIPT."""
+        return {
+            "movie_name": movie_name,
+            "author": record["author"],
+            "review": record["review"],
+            "link": review_url.split("reviews")[0],
+            "review_date": record["review_date"],
+            "sentiment": record["sentiment"],
+            "role": role,
+        }
+
+    def read_new_reviews(self, browser, reader: DomReviewReader, review_url: str, role: str, read_before: int) -> list:
+        """
+        The reviews added to the page since the previous read, the first read_before being read already.
+
+        Falls back to parsing the whole page with extract_reviews if in-browser extraction fails.
+        """
+        records = reader.read()
+        if records is None:
+            return self.extract_reviews(parse_html(browser.page_source), review_url, role)[read_before:]
+        if not read_before and not records:
+            print(f"No reviews found for '{reader.movie_name}'.")
+        return [self.review_from_record(record, reader.movie_name, review_url, role) for record in records]
+
+    def is_reviews_page(self, page: HtmlElement) -> bool:
+        """Whether a page has the movie title that extract_reviews needs."""
+        return first(MOVIE_NAME, page) is not None
+
+    def iter_reviews(self, review_url: str, role: str = "critic", stop_when=None):
+        """
+        Yield the reviews of a movie on Rotten Tomatoes as they are loaded, so they can be saved while more load.
+
+        Rotten Tomatoes lists reviews newest first. If stop_when is given, loading stops at the
+        first review for which stop_when returns True, which is not yielded.
+        """
         if not validators.url(review_url):
             print(f"Invalid URL provided: {review_url}")
-            return []
+            return
 
-        self.initialize_chrome_driver()
         print(f"Crawling reviews: {review_url}")
 
-        try:
+        # Trang đầu đủ khi không còn "Load More" hoặc khi lần crawl lại đã gặp review cũ ngay trên đó
+        page = self.fetcher.get(review_url, "reviews", self.is_reviews_page, role=role)
+        if page is not None:
+            reviews = self.extract_reviews(page, review_url, role)
+            if first(LOAD_MORE, page) is None or contains_known(reviews, stop_when):
+                yield from take_until_known(reviews, stop_when)
+                return
+            print("More reviews are loaded with JavaScript, opening the browser.")
+
+        card_selector = review_card_selector(role)
+        read_count = 0
+        with self.pool.lease() as browser:
+            waits = PageWaits(browser, f"Rotten Tomatoes {role} reviews {review_url}")
             # Load the page with retry logic
             max_retries = 10
             for attempt in range(max_retries):
                 try:
-                    self.browser.get(review_url)
-                    WebDriverWait(self.browser, 20).until(
+                    waits.get(review_url)
+                    waits.until(
                         EC.presence_of_element_located(
                             (
                                 By.CLASS_NAME,
@@ -193,149 +364,77 @@ class RottenTomatoesCrawler:
                 print(
                     f"Failed to load review page after {max_retries} attempts."
                 )
-                return []
+                return
 
-            # Load more reviews
-            previous_review_count = 0
+            # Load more reviews; the reviews of each load are passed on right away
+            reader = DomReviewReader(browser, ROTTEN_REVIEWS_SCRIPT, role)
+            previous_review_count = waits.count(card_selector)
             max_clicks = 50
             click_count = 0
-
-            while click_count < max_clicks:
+            have_more_reviews = True
+
+            while True:
+                new_reviews = self.read_new_reviews(browser, reader, review_url, role, read_count)
+                read_count += len(new_reviews)
+                for review in new_reviews:
+                    if stop_when is not None and stop_when(review):
+                        print("Reached reviews saved by a previous crawl, stop loading more.")
+                        have_more_reviews = False
+                        break
+                    yield review
+                if not have_more_reviews or click_count >= max_clicks:
+                    break
                 try:
-                    load_more = WebDriverWait(self.browser, 10).until(
+                    load_more = waits.until(
                         EC.element_to_be_clickable(
                             (By.CLASS_NAME, "load-more-container")
                         )
                     )
                     if not load_more.is_displayed() or not load_more.is_enabled():
                         print(f"No more reviews to load.")
-                        break
+                        have_more_reviews = False
+                        continue
 
-                    ActionChains(self.browser).move_to_element(
+                    ActionChains(browser).move_to_element(
                         load_more
                     ).click().perform()
-                    time.sleep(5)
-                    soup = BeautifulSoup(self.browser.page_source, "lxml")
-
-                    current_review_count = len(
-                        soup.find_all(
-                            "div",
-                            class_="review-row"
-                            if role == "critic"
-                            else "audience-review-row",
-                        )
+                    # Đếm trực tiếp trong DOM, không cần parse lại cả trang sau mỗi lần bấm
+                    current_review_count = waits.count_increase(
+                        card_selector, previous_review_count
                     )
                     if current_review_count == previous_review_count:
                         print(
                             f"No new reviews loaded after {click_count + 1} clicks."
                         )
-                        break
+                        have_more_reviews = False
+                        continue
                     previous_review_count = current_review_count
                     click_count += 1
                 except (TimeoutException, ElementNotInteractableException):
                     print(
                         f"No more reviews to loadafter {click_count} clicks."
                     )
-                    break
-
-            # Extract reviews
-            soup = BeautifulSoup(self.browser.page_source, "lxml")
-            movie_name = soup.find("a", class_="sidebar-title").text.strip()
-            reviews = []
-            review_cards = soup.find_all(
-                "div",
-                class_="review-row" if role == "critic" else "audience-review-row",
-            )
-
-            if not review_cards:
-                print(f"No reviews found for '{movie_name}'.")
-                return reviews
-
-            for review_card in review_cards:
-                review_data = review_card.find(
-                    "div",
-                    class_="review-data"
-                )
-                
-                user_name = None
-                
-                try:
-                    user_name = (
-                        review_data.find(
-                            "a",
-                            class_="display-name"
-                            if role == "critic"
-                            else "audience-reviews__name",
-                        ).text.strip()
-                    ) 
-                except AttributeError:
-                    user_name = (
-                        review_data.find(
-                            "span",
-                            class_="display-name"
-                            if role == "critic"
-                            else "audience-reviews__name",
-                        )
-                    )
-                    
-                    if user_name:
-                        user_name = user_name.text.strip()
-                    else:
-                        user_name = "No author name"
-                        
-                sentiment_elem = (
-                    review_data.find("score-icon-critics") if review_data else None
-                )
-                sentiment = (
-                    sentiment_elem["sentiment"]
-                    if sentiment_elem and "sentiment" in sentiment_elem.attrs
-                    else "N/A"
-                )
-                comment = (
-                    review_card.find(
-                        "p",
-                        class_="review-text"
-                        if role == "critic"
-                        else "audience-reviews__review",
-                    ).text.strip()
-                    if review_card.find(
-                        "p",
-                        class_="review-text"
-                        if role == "critic"
-                        else "audience-reviews__review",
-                    )
-                    else "No review text"
-                )
-                review_date = (
-                    review_card.find(
-                        "p",
-                        class_="original-score-and-url"
-                        if role == "critic"
-                        else "audience-reviews__duration",
-                    ).find("span").text.strip() 
-                    if review_card.find(
-                        "p",
-                        class_="original-score-and-url"
-                        if role == "critic"
-                        else "audience-reviews__duration",
-                    )
-                    else None
-                )
-                review = {
-                    "movie_name": movie_name,
-                    "author": user_name,
-                    "review": comment,
-                    "link": review_url.split("reviews")[0],
-                    "review_date": review_date,
-                    "sentiment": sentiment,
-                    "role": role,
-                }
-                
-                print(review)
-                reviews.append(review)
-
-        finally:
-            self.close_browser()
+                    have_more_reviews = False
+
+            if self.fetcher.archive is not None:
+                self.fetcher.archive_page(review_url, browser.page_source, "reviews", role, BROWSER)
+            waits.done()
+
+        # Trang HTTP có đọc được thì vẫn cần browser để tải thêm: lần sau đi thẳng vào browser
+        if read_count:
+            self.fetcher.remember(review_url, "reviews", BROWSER)
+
+    def get_reviews(self, review_url: str, role: str = "critic", stop_when=None) -> list:
+        """
+        Fetch reviews for a specific movie from Rotten Tomatoes.
+
+        Rotten Tomatoes lists reviews newest first. If stop_when is given, loading stops once
+        a review for which stop_when returns True is on the page, and only the reviews listed
+        before it are returned.
+        """
+        reviews = list(self.iter_reviews(review_url, role, stop_when))
+        for review in reviews:
+            print(review)
 
         return reviews
 
@@ -0,0 +1,229 @@
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+LINK = "link"
+REVIEW = "review"
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.01
+# Header của file bloom: magic, số bit, số hàm băm, sức chứa
+BLOOM_HEADER = struct.Struct("<4sQII")
+BLOOM_MAGIC = b"BLM1"
+ADD_CHUNK_SIZE = 10_000
+# Tăng khi cách tạo review_key đổi; set cũ phải được dựng lại từ review store
+REVIEW_KEY_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS seen_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def canonical_url(url: str) -> str:
+    """
+    The same link for every way a site writes it: lowercase scheme and host, no query,
+    fragment or trailing slash (IMDb adds ?ref_=... that depends on where the link was found).
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), path, "", ""))
+
+
+def review_key(movie_link: str, fingerprint: str, score) -> str:
+    """
+    Key of a review with its score: fingerprints are unique per movie, not across movies, and
+    leave out the score, so a review whose score changed gets a key not seen yet.
+    """
+    return f"{canonical_url(movie_link)} {fingerprint} {score}"
+
+
+class BloomFilter:
+    """
+    A Bloom filter whose bit array is a memory-mapped file, so opening it costs nothing and only
+    the pages touched are held in memory.
+
+    Sized for capacity keys at error_rate false positives; bits of a key come from the two halves
+    of its blake2b digest (double hashing).
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.path = path
+        if not os.path.exists(path):
+            bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            hashes = max(1, round(bits / capacity * math.log(2)))
+            with open(path, "wb") as f:
+                f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, bits, hashes, capacity))
+                f.truncate(BLOOM_HEADER.size + (bits + 7) // 8)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.bits, self.hashes, self.capacity = BLOOM_HEADER.unpack_from(self._map, 0)
+        if magic != BLOOM_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Bloom filter file")
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            index = BLOOM_HEADER.size + position // 8
+            self._map[index] |= 1 << (position % 8)
+
+    def __contains__(self, key):
+        return all(
+            self._map[BLOOM_HEADER.size + position // 8] & (1 << (position % 8)) for position in self._positions(key)
+        )
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class SeenSet:
+    """
+    Links and reviews already crawled, kept on disk across crawl runs.
+
+    Membership is asked of a Bloom filter first; most keys never seen are answered there without
+    touching the disk, and only the keys it may have seen are confirmed in an exact SQLite index.
+    Opening the set maps the filter and opens the database, so startup does not grow with the
+    number of entries, and memory stays at the pages of the filter in use (about 1.2 MB per
+    million entries at a 1% error rate).
+
+    Keys are kinds LINK (canonical_url of a film) and REVIEW (review_key of a movie link, a
+    review fingerprint and its score). Bits are set before the rows are committed, so after a crash the filter
+    can only have extra bits, never miss a stored key. When the entries outgrow the capacity of
+    the filter, it is rebuilt from the index at (at least) twice the capacity. Thread-safe.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.path = path
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._counts = {"checks": 0, "filtered": 0, "lookups": 0, "false_positives": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.count = self.get_meta("count")
+        self.bloom = None
+        if self.count and not os.path.exists(self.bloom_path):
+            # File bloom bị mất: dựng lại từ index
+            self._rebuild_bloom(max(capacity, self.count * 2))
+        else:
+            self.bloom = BloomFilter(self.bloom_path, max(capacity, self.count * 2), error_rate)
+
+    @property
+    def bloom_path(self):
+        return f"{self.path}.bloom"
+
+    def get_meta(self, name, default=0):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM seen_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO seen_meta (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+            self._conn.commit()
+
+    def contains(self, kind, key) -> bool:
+        with self._lock:
+            self._counts["checks"] += 1
+            if f"{kind} {key}" not in self.bloom:
+                self._counts["filtered"] += 1
+                return False
+            self._counts["lookups"] += 1
+            found = self._conn.execute("SELECT 1 FROM seen WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if found is None:
+                self._counts["false_positives"] += 1
+            return found is not None
+
+    def add(self, kind, keys) -> int:
+        """Add keys of one kind; returns how many were not in the set yet."""
+        added = 0
+        keys = list(keys)
+        for start in range(0, len(keys), ADD_CHUNK_SIZE):
+            chunk = keys[start:start + ADD_CHUNK_SIZE]
+            with self._lock:
+                for key in chunk:
+                    self.bloom.add(f"{kind} {key}")
+                cursor = self._conn.executemany("INSERT OR IGNORE INTO seen (kind, key) VALUES (?, ?)", [(kind, key) for key in chunk])
+                added += cursor.rowcount
+                self.count += cursor.rowcount
+                self._conn.execute(
+                    "INSERT INTO seen_meta (name, value) VALUES ('count', ?) ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    (self.count,),
+                )
+                self._conn.commit()
+                if self.count > self.bloom.capacity:
+                    self._grow_bloom()
+        return added
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen")
+            self._conn.execute("DELETE FROM seen_meta")
+            self._conn.commit()
+            self.count = 0
+            self._rebuild_bloom(self.bloom.capacity)
+
+    def _grow_bloom(self):
+        capacity = self.bloom.capacity * 2
+        while capacity < self.count:
+            capacity *= 2
+        print(f"Seen set {self.path}: {self.count} entries, growing the Bloom filter to {capacity}")
+        self._rebuild_bloom(capacity)
+
+    def _rebuild_bloom(self, capacity):
+        """Fill a filter of capacity from the index beside the current one, then swap it in, so a crash never leaves a partial filter."""
+        tmp_path = f"{self.bloom_path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        bloom = BloomFilter(tmp_path, capacity, self.error_rate)
+        cursor = self._conn.execute("SELECT kind, key FROM seen")
+        while True:
+            rows = cursor.fetchmany(ADD_CHUNK_SIZE)
+            if not rows:
+                break
+            for kind, key in rows:
+                bloom.add(f"{kind} {key}")
+        bloom.flush()
+        bloom.close()
+        if self.bloom is not None:
+            self.bloom.close()
+        os.replace(tmp_path, self.bloom_path)
+        self.bloom = BloomFilter(self.bloom_path)
+
+    def metrics(self):
+        """Membership checks, those answered by the filter alone, exact lookups, and lookups the filter sent in vain."""
+        with self._lock:
+            return dict(self._counts, entries=self.count)
+
+    def close(self):
+        with self._lock:
+            if self.bloom is None:
+                return
+            self.bloom.flush()
+            self.bloom.close()
+            self.bloom = None
+            self._conn.close()
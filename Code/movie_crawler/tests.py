@@ -0,0 +1,467 @@
+import functools
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+from .browser_pool import BrowserPool
+from .checkpoint import CrawlCheckpoint
+from .dom_extract import DomReviewReader
+from .html_parse import parse_html
+from .http_fetch import BROWSER, HTTP, PageFetcher
+from .imdb_crawler import IMDB_REVIEWS_SCRIPT, IMDBCrawler
+from .metacritic_crawler import REVIEW_CARDS, MetacriticCrawler
+from .page_archive import PageArchive
+from .rate_limit import DomainRateLimiter
+from .reparse import reparse_archive
+from .seen_set import LINK, REVIEW, SeenSet, canonical_url, review_key
+from .waits import DEFAULT_WAIT_TIMEOUT, MAX_WAIT_TIMEOUT, MIN_WAIT_TIMEOUT, PageWaits, adaptive_timeout
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        self.server.requested.append(self.path)
+
+
+class BrowserNeeded(Exception):
+    pass
+
+
+class NoBrowserPool:
+    """Stands in for BrowserPool and fails any lease, so a test sees when a crawler needed Chrome."""
+
+    def __init__(self):
+        self.leases = 0
+
+    @contextmanager
+    def lease(self, timeout=300):
+        self.leases += 1
+        raise BrowserNeeded()
+        yield
+
+
+class FakeDriver:
+    """Stands in for a Chrome WebDriver: pages load at once and scripts answer until kill()."""
+
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+        self.pages = []
+        self.elements = []
+        self.run_script = None  # Hàm (script, *args) giả lập kết quả của execute_script
+        self.scripts_run = 0
+
+    def kill(self):
+        self.alive = False
+
+    def get(self, url):
+        self.execute_script("return 1")
+        self.pages.append(url)
+
+    def execute_script(self, script, *args):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        self.scripts_run += 1
+        return self.run_script(script, *args) if self.run_script else 1
+
+    def find_elements(self, by, value):
+        return list(self.elements)
+
+    def find_element(self, by, value):
+        if not self.elements:
+            raise NoSuchElementException(value)
+        return self.elements[0]
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FixtureServerTestCase(unittest.TestCase):
+    """Serves the saved pages in fixtures/ on a local HTTP server."""
+
+    @classmethod
+    def setUpClass(cls):
+        handler = functools.partial(FixtureRequestHandler, directory=FIXTURES_DIR)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.server.requested = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requested.clear()
+        self.fetcher = PageFetcher()
+        self.pool = NoBrowserPool()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}/{path}"
+
+
+class PageFetcherTests(FixtureServerTestCase):
+    def test_static_page_is_parsed_over_http(self):
+        url = self.url("metacritic/army-of-shadows/critic-reviews/")
+        page = self.fetcher.get(url, "reviews", REVIEW_CARDS)
+        self.assertEqual(len(REVIEW_CARDS(page)), 2)
+        self.assertEqual(self.fetcher.mode(url, "reviews"), HTTP)
+        self.assertEqual(self.fetcher.metrics()["http_pages"], 1)
+
+    def test_javascript_page_falls_back_to_browser_and_is_remembered(self):
+        shell_url = self.url("app_shell.html")
+        with open(os.path.join(FIXTURES_DIR, "metacritic/army-of-shadows/critic-reviews/index.html"), encoding="utf-8") as f:
+            rendered = f.read()
+        usable = REVIEW_CARDS
+
+        page = self.fetcher.page(shell_url, "reviews", usable, load_in_browser=lambda: rendered)
+        self.assertTrue(usable(page))
+        self.assertEqual(self.fetcher.mode(shell_url, "reviews"), BROWSER)
+        self.assertEqual(len(self.server.requested), 1)
+
+        # Trang cùng loại của site này đi thẳng vào browser, không thử HTTP nữa
+        self.fetcher.page(self.url("metacritic/army-of-shadows/critic-reviews/"), "reviews", usable, lambda: rendered)
+        self.assertEqual(len(self.server.requested), 1)
+        self.assertEqual(self.fetcher.mode(shell_url, "film_list"), HTTP)
+
+    def test_missing_page_does_not_change_mode(self):
+        url = self.url("imdb/tt404/reviews/")
+        self.assertIsNone(self.fetcher.get(url, "reviews", lambda page: True))
+        self.assertEqual(self.fetcher.mode(url, "reviews"), HTTP)
+
+    def test_modes_survive_restart_with_modes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            modes_file = os.path.join(directory, "fetch_modes.json")
+            PageFetcher(modes_file=modes_file).remember(self.url("x"), "reviews", BROWSER)
+            self.assertEqual(PageFetcher(modes_file=modes_file).mode(self.url("y"), "reviews"), BROWSER)
+
+
+class HttpFirstCrawlerTests(FixtureServerTestCase):
+    def test_metacritic_reviews_without_browser(self):
+        crawler = MetacriticCrawler(pool=self.pool, fetcher=self.fetcher)
+        reviews = crawler.get_reviews(self.url("metacritic/army-of-shadows/critic-reviews/"), "critic")
+        self.assertEqual(self.pool.leases, 0)
+        self.assertEqual([review["author_name"] for review in reviews], ["Roger Ebert", "Staff"])
+        self.assertEqual(reviews[0]["movie_name"], "Army of Shadows")
+        self.assertEqual(reviews[0]["score"], "100")
+        self.assertEqual(reviews[0]["review_date"], "Apr 28, 2006")
+        self.assertEqual(reviews[0]["link"], self.url("metacritic/army-of-shadows/"))
+
+    def test_imdb_reviews_on_one_page_without_browser(self):
+        crawler = IMDBCrawler(pool=self.pool, fetcher=self.fetcher)
+        reviews = crawler.get_reviews(self.url("imdb/tt0000001/reviews/"))
+        self.assertEqual(self.pool.leases, 0)
+        self.assertEqual([(review["author_name"], review["score"]) for review in reviews], [("tyler", "10"), ("marla", "6")])
+
+    def test_imdb_refresh_stops_on_first_page_without_browser(self):
+        crawler = IMDBCrawler(pool=self.pool, fetcher=self.fetcher)
+        reviews = crawler.get_reviews(
+            self.url("imdb/tt0000002/reviews/"), stop_when=lambda review: review["author_name"] == "marla"
+        )
+        self.assertEqual(self.pool.leases, 0)
+        self.assertEqual([review["author_name"] for review in reviews], ["tyler"])
+
+    def test_imdb_see_more_needs_browser(self):
+        crawler = IMDBCrawler(pool=self.pool, fetcher=self.fetcher)
+        with self.assertRaises(BrowserNeeded):
+            crawler.get_reviews(self.url("imdb/tt0000002/reviews/"))
+        # Browser không chạy được nên chế độ của site không đổi
+        self.assertEqual(self.fetcher.mode(self.url("imdb/tt0000002/reviews/"), "reviews"), HTTP)
+
+    def test_imdb_see_more_in_browser_is_remembered(self):
+        driver = FakeDriver()
+        driver.elements = ["card"]
+        records = [{"review": "Better", "score": "9", "author_name": "bob", "review_date": "May 1, 2025"}]
+        driver.run_script = lambda script, *args: (
+            {"movie_name": "Fight Club", "reviews": records[args[0]:]} if script.endswith(IMDB_REVIEWS_SCRIPT) else 0
+        )
+        pool = BrowserPool(size=1, driver_factory=lambda: driver)
+        self.addCleanup(pool.close)
+        crawler = IMDBCrawler(pool=pool, fetcher=self.fetcher)
+
+        url = self.url("imdb/tt0000002/reviews/")
+        reviews = crawler.get_reviews(url)
+        self.assertEqual([review["author_name"] for review in reviews], ["bob"])
+        # Trang HTTP đọc được nhưng phải nhờ browser mới tải hết: phim sau đi thẳng vào browser
+        self.assertEqual(self.fetcher.mode(url, "reviews"), BROWSER)
+        self.server.requested.clear()
+        crawler.get_reviews(self.url("imdb/tt0000001/reviews/"))
+        self.assertEqual(self.server.requested, [])
+
+
+class HtmlParseTests(unittest.TestCase):
+    def test_blank_and_xml_declared_pages_parse(self):
+        crawler = MetacriticCrawler(pool=NoBrowserPool(), fetcher=PageFetcher())
+        self.assertFalse(crawler.is_reviews_page(parse_html("")))
+        with open(os.path.join(FIXTURES_DIR, "metacritic/army-of-shadows/critic-reviews/index.html"), encoding="utf-8") as f:
+            html = '<?xml version="1.0" encoding="utf-8"?>\n' + f.read()
+        reviews = crawler.extract_reviews(parse_html(html), "https://www.metacritic.com/movie/army-of-shadows/critic-reviews/", "critic")
+        self.assertEqual([review["author_name"] for review in reviews], ["Roger Ebert", "Staff"])
+
+
+class DomainRateLimiterTests(unittest.TestCase):
+    def test_requests_to_a_domain_are_spaced_across_threads(self):
+        limiter = DomainRateLimiter(rate=20.0, rates={"www.imdb.com": 0})
+        starts = []
+        lock = threading.Lock()
+
+        def request():
+            limiter.wait("https://www.metacritic.com/movie/alien/")
+            with lock:
+                starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 5 request ở 20/s: request cuối bắt đầu sau ít nhất 4 khoảng 0.05s
+        self.assertGreaterEqual(max(starts) - min(starts), 0.19)
+        # Giới hạn là theo từng domain; rate 0 tắt giới hạn
+        self.assertEqual(limiter.wait("https://www.imdb.com/title/tt0137523/"), 0.0)
+        self.assertGreater(limiter.metrics()["www.metacritic.com"], 0)
+
+
+class BrowserPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.drivers = []
+
+    def pool(self, **kwargs):
+        def start():
+            self.drivers.append(FakeDriver())
+            return self.drivers[-1]
+
+        pool = BrowserPool(driver_factory=start, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_driver_is_reused_then_recycled_after_max_pages(self):
+        pool = self.pool(size=1, max_pages=3)
+        for i in range(4):
+            with pool.lease() as browser:
+                browser.get(f"https://www.imdb.com/title/tt{i}/")
+        # 3 trang đầu trên cùng một driver, driver thứ hai bắt đầu từ trang thứ tư
+        self.assertEqual([len(driver.pages) for driver in self.drivers], [3, 1])
+        self.assertEqual(self.drivers[0].quit_calls, 1)
+        metrics = pool.metrics()
+        self.assertEqual((metrics["drivers_started"], metrics["drivers_recycled"], metrics["pages_loaded"]), (2, 1, 4))
+        self.assertEqual(len(pool.recent_page_loads()), 4)
+
+    def test_dead_driver_is_replaced(self):
+        pool = self.pool(size=1)
+        with pool.lease() as browser:
+            browser.get("https://www.imdb.com/title/tt1/")
+        self.drivers[0].kill()
+        # Driver chết khi nằm trong pool: lần lease sau kiểm tra sức khỏe rồi khởi động driver mới
+        with pool.lease() as browser:
+            self.assertIs(browser.driver, self.drivers[1])
+        self.assertEqual(self.drivers[0].quit_calls, 1)
+
+        # Lỗi trong lease chỉ làm thay driver khi nó không còn phản hồi
+        with self.assertRaises(TimeoutError):
+            with pool.lease():
+                raise TimeoutError("element not found")
+        with self.assertRaises(WebDriverException):
+            with pool.lease() as browser:
+                self.drivers[1].kill()
+                browser.get("https://www.imdb.com/title/tt2/")
+        self.assertEqual(len(self.drivers), 2)
+        self.assertEqual(pool.metrics()["drivers_live"], 0)
+        with pool.lease() as browser:
+            self.assertIs(browser.driver, self.drivers[2])
+
+    def test_lease_waits_for_a_free_driver(self):
+        pool = self.pool(size=1)
+        with pool.lease():
+            with self.assertRaises(TimeoutError):
+                with pool.lease(timeout=0.1):
+                    pass
+        with pool.lease():
+            pass
+        self.assertEqual(len(self.drivers), 1)
+
+
+class PageWaitsTests(unittest.TestCase):
+    def test_adaptive_timeout_is_clamped(self):
+        self.assertEqual(adaptive_timeout([0.5] * 4), DEFAULT_WAIT_TIMEOUT)
+        self.assertEqual(adaptive_timeout([0.5] * 20), MIN_WAIT_TIMEOUT)
+        self.assertEqual(adaptive_timeout([2.0] * 19 + [4.0]), 12.0)
+        self.assertEqual(adaptive_timeout([2.0] * 10 + [60.0]), MAX_WAIT_TIMEOUT)
+
+    def test_waits_follow_pool_page_loads_and_count_as_waiting(self):
+        pool = BrowserPool(size=1, driver_factory=FakeDriver)
+        self.addCleanup(pool.close)
+        for _ in range(10):
+            pool.record_page_load(0.1)
+        with pool.lease() as browser:
+            waits = PageWaits(browser, "reviews")
+            self.assertEqual(waits.timeout(), MIN_WAIT_TIMEOUT)
+            waits.get("https://www.imdb.com/title/tt1/reviews/")
+
+            browser.driver.elements = ["card"] * 3
+            self.assertEqual(waits.count_increase("article.user-review-item", 2), 3)
+            # Không có thẻ mới: trả về số hiện tại khi hết thời gian chờ
+            started = time.monotonic()
+            self.assertEqual(waits.count_increase("article.user-review-item", 3, timeout=0.3), 3)
+            self.assertLess(time.monotonic() - started, 2)
+            split = waits.done()
+        self.assertGreaterEqual(split["wait_s"], 0.2)
+        metrics = pool.metrics()
+        self.assertEqual((metrics["pages_instrumented"], metrics["wait_s_total"]), (1, split["wait_s"]))
+
+
+class DomReviewReaderTests(unittest.TestCase):
+    def test_each_read_returns_only_the_cards_added_since(self):
+        driver = FakeDriver()
+        cards = [{"review": "Great"}, {"review": "Fine"}]
+        calls = []
+
+        def page(script, offset, role):
+            calls.append((offset, role))
+            return {"movie_name": "Fight Club", "reviews": cards[offset:]}
+
+        driver.run_script = page
+        reader = DomReviewReader(driver, "return null;", "critic")
+        self.assertEqual(reader.read(), [{"review": "Great"}, {"review": "Fine"}])
+        cards.append({"review": "Slow"})
+        self.assertEqual(reader.read(), [{"review": "Slow"}])
+        self.assertEqual(reader.read(), [])
+        self.assertEqual(calls, [(0, "critic"), (2, "critic"), (3, "critic")])
+        self.assertEqual((reader.movie_name, reader.offset), ("Fight Club", 3))
+
+    def test_failed_read_falls_back_for_good(self):
+        def unexpected_page(script, offset):
+            return None
+
+        def crashed(script, offset):
+            raise WebDriverException("javascript error")
+
+        for script in (unexpected_page, crashed):
+            with self.subTest(script=script.__name__):
+                driver = FakeDriver()
+                driver.run_script = script
+                reader = DomReviewReader(driver, "return null;")
+                self.assertIsNone(reader.read())
+                self.assertIsNone(reader.read())
+                self.assertTrue(reader.failed)
+                self.assertEqual(driver.scripts_run, 1)
+
+
+class CrawlCheckpointTests(FixtureServerTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state_file = os.path.join(directory.name, "metacritic_state.json")
+
+    def test_progress_is_written_at_intervals_and_resumed(self):
+        checkpoint = CrawlCheckpoint(self.state_file, interval=60)
+        checkpoint.update_listing("list", 2, {"Alien": "https://www.metacritic.com/movie/alien/"})
+        checkpoint.update_film("https://www.metacritic.com/movie/alien/", "critic", 40, done=True)
+        # Chưa tới lúc ghi: file chỉ xuất hiện khi save(force=True)
+        self.assertFalse(os.path.exists(self.state_file))
+        checkpoint.update_film("https://www.metacritic.com/movie/alien/", "user", 200)
+        checkpoint.save(force=True)
+        self.assertFalse(os.path.exists(self.state_file + ".tmp"))
+
+        resumed = CrawlCheckpoint(self.state_file, resume=True)
+        self.assertEqual(resumed.listing("list")["page"], 2)
+        self.assertEqual(resumed.done_roles("https://www.metacritic.com/movie/alien/"), {"critic"})
+        self.assertFalse(resumed.film_done("https://www.metacritic.com/movie/alien/"))
+        self.assertEqual(CrawlCheckpoint(self.state_file).listing("list"), {"page": 0, "films": {}, "done": False})
+
+    def test_resumed_movie_list_skips_pages_already_read(self):
+        base_url = self.url("metacritic/browse?page=")
+        checkpoint = CrawlCheckpoint(self.state_file)
+        checkpoint.update_listing(base_url, 4, {self.url("metacritic/army-of-shadows/"): "Army of Shadows"}, done=True)
+
+        crawler = MetacriticCrawler(state_file=self.state_file, pool=self.pool, fetcher=self.fetcher, resume=True)
+        movies = crawler.get_movie_list(base_url, min_movies=10)
+        self.assertEqual(list(movies.values()), ["Army of Shadows"])
+        self.assertEqual(self.server.requested, [])
+
+
+class PageArchiveTests(FixtureServerTestCase):
+    def test_fetched_pages_are_archived_once_and_reparsed_offline(self):
+        with tempfile.TemporaryDirectory() as root:
+            archive = PageArchive(root)
+            crawler = MetacriticCrawler(pool=self.pool, fetcher=PageFetcher(archive=archive))
+            url = self.url("metacritic/army-of-shadows/critic-reviews/")
+            reviews = crawler.get_reviews(url, "critic")
+            crawler.get_reviews(url, "critic")
+
+            # Trang không đổi chỉ lưu một lần, mỗi lần fetch thêm một dòng index
+            self.assertEqual(len(archive.entries(latest=False)), 2)
+            self.assertEqual([(entry["url"], entry["role"], entry["kind"]) for entry in archive.entries()], [(url, "critic", "reviews")])
+            self.assertEqual(len(os.listdir(os.path.join(root, "pages"))), 1)
+
+            requested = len(self.server.requested)
+            results = list(reparse_archive(root, source="metacritic", workers=2))
+            self.assertEqual(len(self.server.requested), requested)
+            self.assertEqual([result["error"] for result in results], [None])
+            self.assertEqual(results[0]["items"], reviews)
+
+            exported = archive.export(os.path.join(root, "fixtures"))
+            with open(exported[0], encoding="utf-8") as f, open(
+                os.path.join(FIXTURES_DIR, "metacritic/army-of-shadows/critic-reviews/index.html"), encoding="utf-8"
+            ) as original:
+                self.assertEqual(f.read(), original.read())
+
+
+class SeenSetTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "crawl_seen.sqlite3")
+
+    def open(self, **kwargs):
+        seen = SeenSet(self.path, **kwargs)
+        self.addCleanup(seen.close)
+        return seen
+
+    def test_keys_survive_reopen_and_a_lost_filter(self):
+        seen = self.open()
+        link = canonical_url("https://www.imdb.com/title/tt0137523/?ref_=sr_t_1")
+        self.assertEqual(link, "https://www.imdb.com/title/tt0137523")
+        self.assertEqual(seen.add(LINK, [link, link]), 1)
+        seen.add(REVIEW, [review_key(link, "ab12", "8")])
+        self.assertTrue(seen.contains(LINK, canonical_url("HTTPS://WWW.IMDB.COM/title/tt0137523/")))
+        # Cùng fingerprint ở phim khác là review khác, đổi score thì chưa thấy
+        self.assertFalse(seen.contains(REVIEW, review_key("https://www.imdb.com/title/tt0000001/", "ab12", "8")))
+        self.assertFalse(seen.contains(REVIEW, review_key(link, "ab12", "9")))
+        self.assertFalse(seen.contains(LINK, "https://www.imdb.com/title/tt0000001"))
+        seen.close()
+
+        os.remove(self.path + ".bloom")
+        seen = self.open()
+        self.assertEqual(seen.count, 2)
+        self.assertTrue(seen.contains(REVIEW, review_key(link, "ab12", "8")))
+        self.assertEqual(seen.metrics()["lookups"], 1)
+
+    def test_filter_grows_past_its_capacity(self):
+        seen = self.open(capacity=10)
+        links = [f"https://www.metacritic.com/movie/film-{i}" for i in range(100)]
+        self.assertEqual(seen.add(LINK, links), 100)
+        self.assertGreaterEqual(seen.bloom.capacity, 100)
+        self.assertTrue(all(seen.contains(LINK, link) for link in links))
+        misses = sum(seen.contains(LINK, f"https://www.metacritic.com/movie/other-{i}") for i in range(1000))
+        self.assertEqual(misses, 0)
+        self.assertLess(seen.metrics()["false_positives"], 50)
+
+    def test_films_with_the_same_title_are_both_listed(self):
+        crawler = IMDBCrawler(state_file=None, pool=NoBrowserPool(), fetcher=PageFetcher())
+        page = parse_html(
+            '<a class="ipc-title-link-wrapper" href="/title/tt1/?ref_=sr_t_1"><h3>1. Crash</h3></a>'
+            '<a class="ipc-title-link-wrapper" href="/title/tt2/?ref_=sr_t_2"><h3>2. Crash</h3></a>'
+            '<a class="ipc-title-link-wrapper" href="/title/tt1/?ref_=sr_t_3"><h3>3. Crash</h3></a>'
+        )
+        films = {}
+        self.assertEqual(crawler.extract_films(page, films, 10), 2)
+        self.assertEqual(list(films), ["https://www.imdb.com/title/tt1/?ref_=sr_t_1", "https://www.imdb.com/title/tt2/?ref_=sr_t_2"])
@@ -0,0 +1,136 @@
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+DEFAULT_WAIT_TIMEOUT = 20  # Khi chưa đủ số liệu tải trang để ước lượng
+MIN_WAIT_TIMEOUT = 5
+MAX_WAIT_TIMEOUT = 30
+TIMEOUT_MULTIPLIER = 3
+MIN_TIMING_SAMPLES = 5
+POLL_SECONDS = 0.1
+NETWORK_IDLE_SECONDS = 0.5
+MAX_SCROLLS = 20
+
+# Số resource đã tải xong; buffer mặc định 250 mục sẽ đầy trên trang "load more" dài
+NETWORK_ACTIVITY_SCRIPT = """
+if (performance.setResourceTimingBufferSize) { performance.setResourceTimingBufferSize(100000); }
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+
+def adaptive_timeout(page_loads, multiplier=TIMEOUT_MULTIPLIER, minimum=MIN_WAIT_TIMEOUT,
+                     maximum=MAX_WAIT_TIMEOUT, default=DEFAULT_WAIT_TIMEOUT) -> float:
+    """
+    Timeout in seconds for a wait, learned from recent page-load durations.
+
+    A wait is allowed `multiplier` times the p95 page load, clamped to [minimum, maximum];
+    `default` is used until MIN_TIMING_SAMPLES loads have been seen.
+    """
+    if len(page_loads) < MIN_TIMING_SAMPLES:
+        return default
+    timings = sorted(page_loads)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return min(maximum, max(minimum, p95 * multiplier))
+
+
+class PageWaits:
+    """
+    Condition-driven waits on one page, instead of fixed time.sleep calls.
+
+        waits = PageWaits(browser, "reviews of Fight Club")
+        waits.get(url)
+        count = waits.count_increase("div.review-row", count)
+        waits.done()
+
+    Timeouts adapt to the page loads recorded by the browser's pool. Time spent in waits and
+    page loads is counted as waiting, the rest as working; done() prints the split and adds
+    it to the pool metrics.
+    """
+
+    def __init__(self, browser, label=""):
+        self.browser = browser
+        self.label = label
+        self.pool = getattr(browser, "pool", None)
+        self.started = time.perf_counter()
+        self.waited = 0.0
+
+    def timeout(self, multiplier=TIMEOUT_MULTIPLIER) -> float:
+        page_loads = self.pool.recent_page_loads() if self.pool else []
+        return adaptive_timeout(page_loads, multiplier=multiplier)
+
+    @contextmanager
+    def waiting(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.waited += time.perf_counter() - started
+
+    def get(self, url):
+        with self.waiting():
+            return self.browser.get(url)
+
+    def until(self, condition, timeout=None):
+        """Wait until condition(browser) is truthy and return its value; raises TimeoutException like WebDriverWait."""
+        with self.waiting():
+            return WebDriverWait(
+                self.browser, timeout or self.timeout(), poll_frequency=POLL_SECONDS
+            ).until(condition)
+
+    def count(self, css_selector) -> int:
+        return len(self.browser.find_elements(By.CSS_SELECTOR, css_selector))
+
+    def count_increase(self, css_selector, previous, timeout=None) -> int:
+        """Wait until more than `previous` elements match css_selector; returns the count, unchanged on timeout."""
+        def increased(driver):
+            count = len(driver.find_elements(By.CSS_SELECTOR, css_selector))
+            return count if count > previous else False
+
+        try:
+            return self.until(increased, timeout)
+        except TimeoutException:
+            return self.count(css_selector)
+
+    def network_idle(self, idle=NETWORK_IDLE_SECONDS, timeout=None) -> bool:
+        """Wait until the document is loaded and no resource has finished loading for `idle` seconds."""
+        last = {"count": None, "since": None}
+
+        def settled(driver):
+            ready_state, resources = driver.execute_script(NETWORK_ACTIVITY_SCRIPT)
+            now = time.monotonic()
+            if ready_state == "loading" or resources != last["count"]:
+                last.update(count=resources, since=now)
+                return False
+            return now - last["since"] >= idle
+
+        try:
+            return self.until(settled, timeout)
+        except TimeoutException:
+            return False
+
+    def scroll_to_end(self, max_scrolls=MAX_SCROLLS):
+        """Scroll to the bottom until the page stops growing once the network is idle."""
+        last_height = self.browser.execute_script("return document.body.scrollHeight")
+        for _ in range(max_scrolls):
+            self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            self.network_idle()
+            new_height = self.browser.execute_script("return document.body.scrollHeight")
+            if new_height == last_height:
+                break
+            last_height = new_height
+
+    def done(self) -> dict:
+        """Print and return the time spent waiting vs working on this page, in seconds."""
+        elapsed = time.perf_counter() - self.started
+        split = {
+            "label": self.label,
+            "wait_s": round(self.waited, 2),
+            "work_s": round(max(0.0, elapsed - self.waited), 2),
+        }
+        if self.pool:
+            self.pool.record_page_waits(split["wait_s"], split["work_s"])
+        print(f"Page {self.label}: waited {split['wait_s']}s, worked {split['work_s']}s")
+        return split